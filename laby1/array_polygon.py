@@ -0,0 +1,449 @@
+from collections.abc import MutableMapping, Sequence
+
+import numpy as np
+from PyQt5.QtCore import QPoint
+
+from bezier_math import bezier_bounds
+from helper_classes import BezierCache, Constraint, Polygon
+from profiler import log
+
+CONTINUITY_NAMES = ['G0', 'G1', 'C1']  # index = continuity code
+CONTINUITY_CODES = {name: code for code, name in enumerate(CONTINUITY_NAMES)}
+CONSTRAINT_NAMES = [None, 'horizontal', 'vertical', 'length']  # index = constraint code, 0 = none
+CONSTRAINT_CODES = {name: code for code, name in enumerate(CONSTRAINT_NAMES) if name}
+
+
+class VertexView:
+    """Vertex-like view of one row of an ArrayPolygon."""
+    __slots__ = ('polygon', 'index')
+
+    def __init__(self, polygon, index):
+        self.polygon = polygon
+        self.index = index
+
+    @property
+    def point(self):
+        x, y = self.polygon.coords[self.index].tolist()
+        return QPoint(x, y)
+
+    @point.setter
+    def point(self, point):
+        self.polygon.coords[self.index] = (point.x(), point.y())
+        self.polygon.update_edge_bounds(((self.index - 1) % self.polygon.length, self.index))
+
+    @property
+    def continuity(self):
+        return CONTINUITY_NAMES[self.polygon.continuity[self.index]]
+
+    @continuity.setter
+    def continuity(self, value):
+        self.polygon.continuity[self.index] = CONTINUITY_CODES[value]
+
+
+class BezierView:
+    """BezierSegment-like view of the control points stored for one edge."""
+    __slots__ = ('polygon', 'edge')
+
+    def __init__(self, polygon, edge):
+        self.polygon = polygon
+        self.edge = edge
+
+    @property
+    def start_vertex(self):
+        return self.edge
+
+    @property
+    def end_vertex(self):
+        return (self.edge + 1) % self.polygon.length
+
+    @property
+    def control1(self):
+        x, y = self.polygon.controls[self.edge, 0].tolist()
+        return QPoint(x, y)
+
+    @control1.setter
+    def control1(self, point):
+        self.polygon.controls[self.edge, 0] = (point.x(), point.y())
+        self.polygon.update_edge_bounds((self.edge,))
+
+    @property
+    def control2(self):
+        x, y = self.polygon.controls[self.edge, 1].tolist()
+        return QPoint(x, y)
+
+    @control2.setter
+    def control2(self, point):
+        self.polygon.controls[self.edge, 1] = (point.x(), point.y())
+        self.polygon.update_edge_bounds((self.edge,))
+
+
+class VertexArray(Sequence):
+    def __init__(self, polygon):
+        self.polygon = polygon
+
+    def __len__(self):
+        return self.polygon.length
+
+    def __getitem__(self, index):
+        n = self.polygon.length
+        if not -n <= index < n:
+            raise IndexError(index)
+        return VertexView(self.polygon, index % n)
+
+
+class ConstraintMap(MutableMapping):
+    """Edge index -> Constraint view over the packed constraint arrays."""
+
+    def __init__(self, polygon):
+        self.polygon = polygon
+
+    def __contains__(self, edge):
+        return isinstance(edge, (int, np.integer)) and 0 <= edge < self.polygon.length \
+            and self.polygon.constraint_type[edge] != 0
+
+    def __getitem__(self, edge):
+        if edge not in self:
+            raise KeyError(edge)
+        type = CONSTRAINT_NAMES[self.polygon.constraint_type[edge]]
+        value = int(self.polygon.constraint_value[edge]) if type == 'length' else None
+        return Constraint(type, value)
+
+    def __setitem__(self, edge, constraint):
+        self.polygon.constraint_type[edge] = CONSTRAINT_CODES[constraint.type]
+        self.polygon.constraint_value[edge] = constraint.value or 0
+
+    def __delitem__(self, edge):
+        if edge not in self:
+            raise KeyError(edge)
+        self.polygon.constraint_type[edge] = 0
+
+    def __iter__(self):
+        return iter(np.flatnonzero(self.polygon.constraint_type[:self.polygon.length]).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.polygon.constraint_type[:self.polygon.length]))
+
+
+class BezierMap(MutableMapping):
+    """Edge index -> BezierView over the packed control point arrays."""
+
+    def __init__(self, polygon):
+        self.polygon = polygon
+
+    def __contains__(self, edge):
+        return isinstance(edge, (int, np.integer)) and 0 <= edge < self.polygon.length \
+            and bool(self.polygon.has_bezier[edge])
+
+    def __getitem__(self, edge):
+        if edge not in self:
+            raise KeyError(edge)
+        return BezierView(self.polygon, int(edge))
+
+    def __setitem__(self, edge, bezier):
+        self.polygon.has_bezier[edge] = True
+        self.polygon.controls[edge] = ((bezier.control1.x(), bezier.control1.y()),
+                                       (bezier.control2.x(), bezier.control2.y()))
+        self.polygon.update_edge_bounds((edge,))
+
+    def __delitem__(self, edge):
+        if edge not in self:
+            raise KeyError(edge)
+        self.polygon.has_bezier[edge] = False
+        self.polygon.update_edge_bounds((edge,))
+
+    def __iter__(self):
+        return iter(np.flatnonzero(self.polygon.has_bezier[:self.polygon.length]).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.polygon.has_bezier[:self.polygon.length]))
+
+
+class ArrayPolygon(Polygon):
+    """Polygon stored as contiguous NumPy arrays instead of Vertex/QPoint objects.
+
+    Every per-vertex field lives in its own array indexed by vertex (and, for
+    constraints and Bezier segments, by the edge starting at that vertex):
+
+        coords            (n, 2) int32      vertex positions
+        continuity        (n,)   uint8      code into CONTINUITY_NAMES
+        constraint_type   (n,)   uint8      code into CONSTRAINT_NAMES, 0 = none
+        constraint_value  (n,)   int32      length for 'length' constraints
+        has_bezier        (n,)   bool       edge is a Bezier segment
+        controls          (n, 2, 2) int32   control1, control2 of that segment
+
+    vertices, constraints and bezier_segments are views with the same
+    interface as the list/dict based Polygon, so Canvas and MainWindow work
+    on either. The arrays keep spare capacity so appends are amortized O(1).
+
+    Hit tests and culling scan (n, 2) arrays of edge bounding boxes. These
+    are built on the first query and then kept up to date by single edits
+    (moves, curves added or removed, inserts and removes); bulk edits drop
+    them to be rebuilt once on the next query.
+    """
+
+    def __init__(self, capacity=16):
+        self.length = 0
+        self.coords = np.zeros((capacity, 2), dtype=np.int32)
+        self.continuity = np.zeros(capacity, dtype=np.uint8)
+        self.constraint_type = np.zeros(capacity, dtype=np.uint8)
+        self.constraint_value = np.zeros(capacity, dtype=np.int32)
+        self.has_bezier = np.zeros(capacity, dtype=bool)
+        self.controls = np.zeros((capacity, 2, 2), dtype=np.int32)
+        self.vertices = VertexArray(self)
+        self.constraints = ConstraintMap(self)
+        self.bezier_segments = BezierMap(self)
+        self.bezier_cache = BezierCache()
+        self._hit_index = None  # Hit tests scan the arrays directly instead
+        self._edge_bounds = None  # (low, high) of every edge's bounding box, built on the first query
+        self._positions = None
+        self.offset = QPoint(0, 0)
+        self.touched_edges = None
+        self.moved_from = None
+
+    COLUMNS = ('coords', 'continuity', 'constraint_type', 'constraint_value', 'has_bezier', 'controls')
+
+    @classmethod
+    def from_arrays(cls, coords, continuity=None, constraint_type=None, constraint_value=None,
+                    has_bezier=None, controls=None):
+        """Build a polygon from whole arrays at once; omitted fields start empty."""
+        polygon = cls(capacity=max(len(coords), 1))
+        polygon.length = len(coords)
+        polygon.coords[:len(coords)] = coords
+        for name, values in (('continuity', continuity), ('constraint_type', constraint_type),
+                             ('constraint_value', constraint_value), ('has_bezier', has_bezier),
+                             ('controls', controls)):
+            if values is not None:
+                getattr(polygon, name)[:len(coords)] = values
+        return polygon
+
+    @classmethod
+    def from_storage(cls, length, columns):
+        """Use the given column arrays (e.g. memory maps) as the storage as they are, without copying."""
+        polygon = cls(capacity=0)
+        for name in cls.COLUMNS:
+            setattr(polygon, name, columns[name])
+        polygon.length = length
+        return polygon
+
+    @classmethod
+    def from_polygon(cls, polygon):
+        """Copy a list/dict based Polygon into array storage."""
+        result = cls.from_arrays(polygon.coordinates())
+        for i, vertex in enumerate(polygon.vertices):
+            if vertex.continuity != 'G0':
+                result.continuity[i] = CONTINUITY_CODES[vertex.continuity]
+        for edge, constraint in polygon.constraints.items():
+            result.constraints[edge] = constraint
+        for edge, bezier in polygon.bezier_segments.items():
+            result.bezier_segments[edge] = bezier
+        return result
+
+    def reserve(self, size):
+        """Grow every column to hold at least `size` rows, doubling the capacity."""
+        capacity = len(self.coords)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.length] = old[:self.length]
+            setattr(self, name, new)
+
+    def add_vertex(self, x, y):
+        self.reserve(self.length + 1)
+        self.coords[self.length] = (x, y)
+        self.length += 1
+        self._edge_bounds = None
+
+    def add_vertices(self, coords):
+        coords = np.asarray(coords)
+        self.reserve(self.length + len(coords))
+        self.coords[self.length:self.length + len(coords)] = coords
+        self.length += len(coords)
+        self._edge_bounds = None
+
+    def add_beziers(self, edges, controls):
+        self.has_bezier[edges] = True
+        self.controls[edges] = controls
+        self.bezier_cache.clear()
+        self._edge_bounds = None
+
+    def insert_vertex_at_position(self, index, x, y):
+        """Insert a vertex at the specified list index."""
+        if 0 <= index <= self.length:
+            self.reserve(self.length + 1)
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                column[index + 1:self.length + 1] = column[index:self.length]
+                column[index] = 0
+            self.coords[index] = (x, y)
+            self.length += 1
+            if self._edge_bounds is not None:
+                self._edge_bounds = tuple(np.insert(corner, index, 0, axis=0) for corner in self._edge_bounds)
+                self.update_edge_bounds(((index - 1) % self.length, index))
+
+    def insert_vertex(self, edge_index, x, y):
+        """Insert a vertex at the specified edge."""
+        # The split edge loses its constraint and curve; later edges shift with their vertices
+        self.constraint_type[edge_index] = 0
+        self.has_bezier[edge_index] = False
+        self.insert_vertex_at_position(edge_index + 1, x, y)
+
+    def remove_vertex(self, index):
+        log.debug("Removing vertex at index %d", index)
+        if 0 <= index < self.length:
+            n = self.length
+            before_index = (index - 1) % n
+            after_index = (index + 1) % n
+            self.constraint_type[[index, before_index]] = 0
+            self.has_bezier[[index, before_index]] = False
+            self.continuity[[before_index, index, after_index]] = 0
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                column[index:n - 1] = column[index + 1:n]
+            self.length -= 1
+            if self._edge_bounds is not None:
+                self._edge_bounds = tuple(np.delete(corner, index, axis=0) for corner in self._edge_bounds)
+                if self.length:
+                    self.update_edge_bounds(((index - 1) % self.length,))
+
+    def apply_edits(self, inserts=(), removes=(), moves=()):
+        """Apply many vertex inserts, removes and moves in one vectorized pass; see Polygon.apply_edits."""
+        inserts, removes, moves, removed = self.validate_edits(inserts, removes, moves)
+        n = self.length
+        self.coords[moves[:, 0]] = moves[:, 1:]
+        dropped = self.dropped_edges(inserts, removes)
+        self.constraint_type[dropped] = 0
+        self.has_bezier[dropped] = False
+        self.continuity[(removes - 1) % max(n, 1)] = 0
+        self.continuity[(removes + 1) % max(n, 1)] = 0
+
+        mapping = self.edit_mapping(inserts, removed)
+        # New vertices on edge e follow the new position of e, in the order given
+        order = np.argsort(inserts[:, 0], kind='stable')
+        edges = inserts[order, 0]
+        rank = np.arange(len(edges)) - np.searchsorted(edges, edges)
+        targets = mapping[edges] + 1 + rank
+
+        size = n - len(removes) + len(inserts)
+        kept = np.flatnonzero(~removed)
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros((max(size, len(old)),) + old.shape[1:], dtype=old.dtype)
+            new[mapping[kept]] = old[kept]
+            setattr(self, name, new)
+        self.coords[targets] = inserts[order, 1:]
+        self.length = size
+        self.bezier_cache.clear()
+        self._edge_bounds = None
+        return mapping
+
+    def coordinates(self):
+        """Vertex positions as an (n, 2) float array."""
+        return self.coords[:self.length].astype(float)
+
+    def get_edges(self):
+        points = [QPoint(x, y) for x, y in self.coords[:self.length].tolist()]
+        return list(zip(points, points[1:] + points[:1]))
+
+    def bake_offset(self):
+        """Apply the pending offset to the coordinate arrays and reset it."""
+        delta = self.offset
+        if delta.isNull():
+            return
+        self.coords[:self.length] += (delta.x(), delta.y())
+        self.controls[:self.length] += (delta.x(), delta.y())
+        self.offset = QPoint(0, 0)
+        self.bezier_cache.clear()
+        if self._edge_bounds is not None:
+            for corner in self._edge_bounds:
+                corner += (delta.x(), delta.y())
+
+    def all_bezier_control_points(self):
+        """Edge indices and an (n, 4, 2) array with the control polygons of all Bezier segments."""
+        edges = np.flatnonzero(self.has_bezier[:self.length])
+        control_points = np.empty((len(edges), 4, 2))
+        control_points[:, 0] = self.coords[edges]
+        control_points[:, 1:3] = self.controls[edges]
+        control_points[:, 3] = self.coords[(edges + 1) % self.length]
+        return edges.tolist(), control_points
+
+    def index_of(self, vertex):
+        return vertex.index
+
+    def find_vertex(self, x, y, radius):
+        """Index of the vertex nearest to (x, y) within `radius`, or None."""
+        if self.length == 0:
+            return None
+        offset = self.coords[:self.length] - (x, y)
+        distances = np.hypot(offset[:, 0], offset[:, 1])
+        nearest = int(np.argmin(distances))
+        return nearest if distances[nearest] < radius else None
+
+    def bounds_of_edges(self, edges):
+        """(low, high) corners of the bounding boxes of the given edges, as (k, 2) float arrays."""
+        n = self.length
+        starts = self.coords[edges]
+        ends = self.coords[(edges + 1) % n]
+        low = np.minimum(starts, ends).astype(float)
+        high = np.maximum(starts, ends).astype(float)
+        curved = np.flatnonzero(self.has_bezier[edges])
+        if len(curved):
+            control_points = np.empty((len(curved), 4, 2))
+            control_points[:, 0] = starts[curved]
+            control_points[:, 1:3] = self.controls[edges[curved]]
+            control_points[:, 3] = ends[curved]
+            bounds = bezier_bounds(control_points)
+            low[curved] = bounds[:, :2]
+            high[curved] = bounds[:, 2:]
+        return low, high
+
+    def edge_bounds(self):
+        """(n, 2) arrays of the low and high corners of every edge's bounding box."""
+        if self._edge_bounds is None:
+            self._edge_bounds = self.bounds_of_edges(np.arange(self.length))
+        return self._edge_bounds
+
+    def update_edge_bounds(self, edges):
+        """Recompute the cached bounding boxes of a few edges after they changed."""
+        if self._edge_bounds is None:
+            return
+        edges = np.asarray(edges, dtype=np.int64)
+        low, high = self.bounds_of_edges(edges)
+        self._edge_bounds[0][edges] = low
+        self._edge_bounds[1][edges] = high
+
+    def find_edges(self, x, y, radius):
+        """Sorted indices of the edges whose bounding boxes come within `radius` of (x, y)."""
+        low, high = self.edge_bounds()
+        near = ((low[:, 0] - radius <= x) & (x <= high[:, 0] + radius)
+                & (low[:, 1] - radius <= y) & (y <= high[:, 1] + radius))
+        return np.flatnonzero(near).tolist()
+
+    def find_in_rect(self, min_x, min_y, max_x, max_y):
+        """(vertex indices, edge indices) of the vertices and edge bounding boxes in the rectangle."""
+        coords = self.coords[:self.length]
+        inside = ((min_x <= coords[:, 0]) & (coords[:, 0] <= max_x)
+                  & (min_y <= coords[:, 1]) & (coords[:, 1] <= max_y))
+        low, high = self.edge_bounds()
+        overlap = ((low[:, 0] <= max_x) & (min_x <= high[:, 0])
+                   & (low[:, 1] <= max_y) & (min_y <= high[:, 1]))
+        return np.flatnonzero(inside).tolist(), np.flatnonzero(overlap).tolist()
+
+    def count_in_rect(self, min_x, min_y, max_x, max_y):
+        low, high = self.edge_bounds()
+        return int(np.count_nonzero((low[:, 0] <= max_x) & (min_x <= high[:, 0])
+                                    & (low[:, 1] <= max_y) & (min_y <= high[:, 1])))
+
+    def find_control(self, x, y, radius):
+        """(control name, BezierView) of the control point nearest to (x, y) within `radius`, or None."""
+        edges = np.flatnonzero(self.has_bezier[:self.length])
+        if len(edges) == 0:
+            return None
+        offset = self.controls[edges] - (x, y)
+        distances = np.hypot(offset[..., 0], offset[..., 1])  # (segments, 2)
+        nearest = np.unravel_index(np.argmin(distances), distances.shape)
+        if distances[nearest] >= radius:
+            return None
+        return ('control1', 'control2')[nearest[1]], BezierView(self, int(edges[nearest[0]]))
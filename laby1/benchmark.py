@@ -0,0 +1,991 @@
+"""Benchmarks for the polygon editor core.
+
+Run from this directory without a display, e.g.:
+    python benchmark.py            # every benchmark
+    python benchmark.py bezier     # just the selected ones
+"""
+import os
+import gc
+import io
+import sys
+import types
+import contextlib
+import math
+import time
+import tempfile
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QPoint, QPointF
+from PyQt5.QtGui import QImage, QPainter
+
+from helper_classes import Polygon, BezierSegment, Constraint
+from array_polygon import ArrayPolygon
+from canvas_widget import Canvas
+from constraint_solver import ConstraintSolver
+import continuity
+from rasterizer import Framebuffer, bresenham_lines
+from painter_utils import LabelCache
+from scene_file import load_scene, save_scene
+from scene import Scene
+import scene_file
+import path_io
+
+
+def make_polygon(n_vertices, bezier_every=1, radius=None):
+    """Regular n-gon centred in the default window with a Bezier on every `bezier_every`-th edge."""
+    polygon = Polygon()
+    radius = radius or 350
+    for i in range(n_vertices):
+        angle = 2 * math.pi * i / n_vertices
+        polygon.add_vertex(int(600 + radius * math.cos(angle)), int(400 + radius * math.sin(angle)))
+    if bezier_every:
+        for i in range(0, n_vertices, bezier_every):
+            start = polygon.vertices[i].point
+            end = polygon.vertices[(i + 1) % n_vertices].point
+            polygon.add_bezier(i, BezierSegment(
+                start_vertex=i,
+                end_vertex=(i + 1) % n_vertices,
+                control1=QPoint(start.x() + 20, start.y() - 20),
+                control2=QPoint(end.x() - 20, end.y() + 20),
+            ))
+    return polygon
+
+
+def make_canvas(polygon):
+    canvas = Canvas()
+    canvas.resize(1200, 800)
+    canvas.set_polygon(polygon)
+    canvas.zoom, canvas.pan = 1.0, QPointF(0, 0)
+    return canvas
+
+
+def best_of(fn, repeat=3):
+    """Best wall-clock time of `repeat` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def legacy_bezier_points(polygon, bezier, steps=100):
+    """The original per-t loop from Canvas.calculate_bezier_points, kept as the baseline."""
+    start_vertex = polygon.vertices[bezier.start_vertex].point
+    end_vertex = polygon.vertices[bezier.end_vertex].point
+
+    P0 = np.array([start_vertex.x(), start_vertex.y()])
+    P1 = np.array([bezier.control1.x(), bezier.control1.y()])
+    P2 = np.array([bezier.control2.x(), bezier.control2.y()])
+    P3 = np.array([end_vertex.x(), end_vertex.y()])
+
+    points = []
+    for t in np.linspace(0, 1, steps):
+        point = (1-t)**3 * P0 + 3*(1-t)**2 * t * P1 + 3*(1-t)*t**2 * P2 + t**3 * P3
+        points.append(tuple(point.astype(int)))
+    return points
+
+
+def bench_bezier():
+    print("Bezier evaluation, 100 steps per segment")
+    print(f"{'segments':>10} {'legacy loop':>14} {'per segment':>14} {'batched':>12} {'speedup':>9}")
+    for n in (10, 1_000, 50_000):
+        polygon = make_polygon(n)
+        canvas = make_canvas(polygon)
+        beziers = list(polygon.bezier_segments.values())
+
+        # The legacy loop is far too slow to run 50k times; time a sample and scale it up.
+        sample = beziers[:2_000]
+        legacy = best_of(lambda: [legacy_bezier_points(polygon, b) for b in sample], repeat=1)
+        legacy *= len(beziers) / len(sample)
+        single = best_of(lambda: [canvas.calculate_bezier_points(b) for b in sample], repeat=1)
+        single *= len(beziers) / len(sample)
+        batched = best_of(lambda: canvas.calculate_all_bezier_points(steps=100))
+
+        print(f"{n:>10} {legacy * 1e3:>11.2f} ms {single * 1e3:>11.2f} ms "
+              f"{batched * 1e3:>9.2f} ms {legacy / batched:>8.0f}x")
+
+
+def bench_flatten():
+    print("Adaptive flattening vs fixed 100 steps (tolerance 0.25 px)")
+    print(f"{'scene':>22} {'fixed samples':>14} {'adaptive':>10} {'min/median/max':>16} "
+          f"{'fixed':>10} {'adaptive':>10}")
+    scenes = {
+        "predefined": Canvas().polygon,
+        "8 large curves": make_polygon(8, radius=380),
+        "1k short curves": make_polygon(1_000),
+        "50k tiny curves": make_polygon(50_000),
+    }
+    for name, polygon in scenes.items():
+        canvas = make_canvas(polygon)
+        _, counts, _ = canvas.flatten_all_bezier_points()
+        fixed = best_of(lambda: canvas.calculate_all_bezier_points(steps=100))
+        adaptive = best_of(lambda: canvas.flatten_all_bezier_points())
+        spread = f"{counts.min()}/{int(np.median(counts))}/{counts.max()}"
+        print(f"{name:>22} {100 * len(counts):>14} {counts.sum():>10} {spread:>16} "
+              f"{fixed * 1e3:>7.2f} ms {adaptive * 1e3:>7.2f} ms")
+
+
+def bench_paint():
+    print("Offscreen paintEvent into a 1200x800 QImage, library line mode")
+    print(f"{'vertices':>10} {'beziers':>10} {'frame':>12} {'fps':>10}")
+    image = QImage(1200, 800, QImage.Format_ARGB32_Premultiplied)
+    for n in (100, 1_000, 10_000, 50_000):
+        for bezier_every in (0, 4):
+            canvas = make_canvas(make_polygon(n, bezier_every=bezier_every))
+            canvas.render(image)  # warm the curve cache
+            frame = best_of(lambda: canvas.render(image))
+            print(f"{n:>10} {len(canvas.polygon.bezier_segments):>10} "
+                  f"{frame * 1e3:>9.2f} ms {1 / frame:>10.1f}")
+
+
+def check_bresenham(canvas, starts, ends):
+    """Fail loudly unless the framebuffer backend matches bresenham_line pixel for pixel."""
+    xs, ys = bresenham_lines(starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1])
+    expected = [p for (x0, y0), (x1, y1) in zip(starts.tolist(), ends.tolist())
+                for p in canvas.bresenham_line(x0, y0, x1, y1)]
+    assert list(zip(xs.tolist(), ys.tolist())) == expected, "pixel lists differ"
+
+    reference = QImage(1200, 800, QImage.Format_ARGB32_Premultiplied)
+    reference.fill(0)
+    painter = QPainter(reference)
+    for (x0, y0), (x1, y1) in zip(starts.tolist(), ends.tolist()):
+        canvas.draw_bresenham(painter, QPoint(x0, y0), QPoint(x1, y1))
+    painter.end()
+    framebuffer = Framebuffer(1200, 800)
+    framebuffer.draw_lines(starts, ends)
+    pointer = reference.constBits()
+    pointer.setsize(reference.sizeInBytes())
+    drawn = np.frombuffer(pointer, dtype=np.uint32).reshape(800, 1200)
+    assert np.array_equal(drawn, framebuffer.pixels), "framebuffer differs from drawPoint output"
+
+
+def bench_bresenham():
+    canvas = make_canvas(Polygon())
+    rng = np.random.default_rng(0)
+    # Includes off-screen endpoints, zero-length and axis-aligned lines
+    starts = rng.integers(-100, 1300, size=(2_000, 2))
+    ends = rng.integers(-100, 1300, size=(2_000, 2))
+    ends[:50] = starts[:50]
+    ends[50:100, 0] = starts[50:100, 0]
+    ends[100:150, 1] = starts[100:150, 1]
+    check_bresenham(canvas, starts, ends)
+    print("Bresenham backend matches bresenham_line pixel for pixel on 2000 random lines")
+
+    print("Bresenham edges: drawPoint per pixel vs NumPy framebuffer + one blit")
+    print(f"{'vertices':>10} {'drawPoint':>12} {'framebuffer':>13} {'speedup':>9}")
+    image = QImage(1200, 800, QImage.Format_ARGB32_Premultiplied)
+    for n in (4, 100, 1_000, 10_000):
+        polygon = make_polygon(n, bezier_every=0)
+        canvas = make_canvas(polygon)
+        ring = polygon.coordinates().astype(np.int64)
+        starts, ends = ring, np.roll(ring, -1, axis=0)
+        edges = polygon.get_edges()
+
+        def per_pixel():
+            painter = QPainter(image)
+            for start, end in edges:
+                canvas.draw_bresenham(painter, start, end)
+            painter.end()
+
+        def batched():
+            painter = QPainter(image)
+            canvas.draw_bresenham_edges(painter, starts, ends)
+            painter.end()
+
+        slow = best_of(per_pixel)
+        fast = best_of(batched)
+        print(f"{n:>10} {slow * 1e3:>9.2f} ms {fast * 1e3:>10.2f} ms {slow / fast:>8.1f}x")
+
+
+def linear_clicked_vertex(polygon, pos):
+    """The original linear scan from Canvas.get_clicked_vertex, kept as the baseline."""
+    for i, vertex in enumerate(polygon.vertices):
+        if math.hypot(pos.x() - vertex.point.x(), pos.y() - vertex.point.y()) < 10:
+            return i
+    return None
+
+
+def linear_clicked_edge(canvas, pos):
+    """The original linear scan from Canvas.get_clicked_edge, kept as the baseline.
+
+    Like the original is_near_edge it measures the distance to the infinite line.
+    """
+    x0, y0 = pos.x(), pos.y()
+    for i, (start, end) in enumerate(canvas.polygon.get_edges()):
+        x1, y1 = start.x(), start.y()
+        x2, y2 = end.x(), end.y()
+        denominator = math.hypot(y2 - y1, x2 - x1)
+        if denominator == 0:
+            continue
+        if abs((y2 - y1)*x0 - (x2 - x1)*y0 + x2*y1 - y2*x1) / denominator <= canvas.edge_threshold:
+            return i
+    return None
+
+
+def bench_hit_test():
+    print("Hit testing: linear scan vs spatial grid (vertices spaced ~6 px apart)")
+    print(f"{'vertices':>10} {'build':>10} {'scan vertex':>12} {'grid vertex':>12} "
+          f"{'scan edge':>12} {'grid edge':>12} {'drag update':>12}")
+    rng = np.random.default_rng(0)
+    for n in (1_000, 100_000, 1_000_000):
+        polygon = make_polygon(n, bezier_every=0, radius=n)
+        canvas = make_canvas(polygon)
+        build = best_of(polygon.hit_index, repeat=1)
+        picks = rng.integers(0, n, size=20)
+        clicks = [polygon.vertices[i].point + QPoint(2, 1) for i in picks]
+        scan_clicks = clicks[:3]
+
+        scan_vertex = best_of(lambda: [linear_clicked_vertex(polygon, p) for p in scan_clicks], 1)
+        grid_vertex = best_of(lambda: [polygon.find_vertex(p.x(), p.y(), 10) for p in clicks])
+        scan_edge = best_of(lambda: [linear_clicked_edge(canvas, p) for p in scan_clicks], 1)
+        grid_edge = best_of(lambda: [canvas.get_clicked_edge(p) for p in clicks])
+        drag = best_of(lambda: [polygon.move_vertex(i, polygon.vertices[i].point + QPoint(1, 1))
+                                for i in picks])
+        us = 1e6
+        print(f"{n:>10} {build * 1e3:>7.0f} ms {scan_vertex / 3 * us:>9.0f} us "
+              f"{grid_vertex / 20 * us:>9.1f} us {scan_edge / 3 * us:>9.0f} us "
+              f"{grid_edge / 20 * us:>9.1f} us {drag / 20 * us:>9.1f} us")
+
+
+def resident_bytes():
+    """Resident set size of this process, or 0 where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def measure_memory(build):
+    """(traced Python/NumPy bytes, resident bytes) allocated by build(); keeps the result alive."""
+    gc.collect()
+    rss_before = resident_bytes()
+    tracemalloc.start()
+    result = build()
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, traced, resident_bytes() - rss_before
+
+
+def bench_memory():
+    print("Memory per vertex: Vertex/QPoint objects vs ArrayPolygon columns "
+          "(Bezier on every 4th edge, constraint on every 8th)")
+    print("traced = Python heap incl. NumPy buffers; RSS also counts the C++ side of each QPoint")
+    print(f"{'vertices':>10} {'class':>14} {'traced B/vertex':>16} {'RSS B/vertex':>14}")
+    for n in (10_000, 1_000_000):
+        def build_arrays():
+            polygon = ArrayPolygon.from_arrays(np.zeros((n, 2), dtype=np.int32))
+            polygon.has_bezier[:n:4] = True
+            polygon.constraint_type[1:n:8] = 3
+            return polygon
+
+        def build_objects():
+            polygon = make_polygon(n, bezier_every=4, radius=n)
+            for i in range(1, n, 8):
+                polygon.constraints[i] = Constraint('length', 100)
+            return polygon
+
+        for name, build in (("ArrayPolygon", build_arrays), ("Polygon", build_objects)):
+            polygon, traced, rss = measure_memory(build)
+            print(f"{n:>10} {name:>14} {traced / n:>16.1f} {rss / n:>14.1f}")
+            del polygon
+
+
+class LegacyPolygon:
+    """The original dict-rebuilding insert_vertex/remove_vertex (minus prints), as the baseline."""
+
+    def __init__(self, polygon):
+        self.vertices = [types.SimpleNamespace(point=v.point, continuity=v.continuity)
+                         for v in polygon.vertices]
+        self.constraints = dict(polygon.constraints.items())
+        self.bezier_segments = {i: types.SimpleNamespace(start_vertex=b.start_vertex, end_vertex=b.end_vertex)
+                                for i, b in polygon.bezier_segments.items()}
+        self.length = len(self.vertices)
+
+    def get_edges(self):
+        n = len(self.vertices)
+        return [(self.vertices[i].point, self.vertices[(i + 1) % n].point) for i in range(n)]
+
+    def remove_vertex(self, index):
+        before_index = (index - 1) % self.length
+        after_index = (index + 1) % self.length
+        for edge in (index, before_index):
+            self.constraints.pop(edge, None)
+            self.bezier_segments.pop(edge, None)
+        for i in (before_index, index, after_index):
+            self.vertices[i].continuity = "G0"
+        del self.vertices[index]
+        self.length -= 1
+        local_constraints = {}
+        local_beziers = {}
+        for i in range(index + 1):
+            if self.constraints.get(i):
+                local_constraints[i] = self.constraints.get(i)
+            if self.bezier_segments.get(i):
+                local_beziers[i] = self.bezier_segments.get(i)
+        for i in range(index + 1, len(self.get_edges())):
+            item = self.constraints.get(i)
+            if item:
+                local_constraints[i-1] = item
+            item = self.bezier_segments.get(i)
+            if item:
+                item.start_vertex = (item.start_vertex - 1) % self.length
+                item.end_vertex = (item.end_vertex - 1) % self.length
+                local_beziers[i-1] = item
+        self.constraints = local_constraints
+        self.bezier_segments = local_beziers
+
+    def insert_vertex(self, edge_index, x, y):
+        self.vertices.insert(edge_index + 1, types.SimpleNamespace(point=QPoint(x, y), continuity='G0'))
+        self.length += 1
+        self.constraints.pop(edge_index, None)
+        self.bezier_segments.pop(edge_index, None)
+        local_constraints = {}
+        local_beziers = {}
+        for i in range(edge_index + 1):
+            if self.constraints.get(i):
+                local_constraints[i] = self.constraints.get(i)
+            if self.bezier_segments.get(i):
+                local_beziers[i] = self.bezier_segments.get(i)
+        for i in reversed(range(edge_index + 1, len(self.get_edges()))):
+            item = self.constraints.get(i - 1)
+            if item:
+                local_constraints[i] = item
+            item = self.bezier_segments.get(i - 1)
+            if item:
+                item.start_vertex = (item.start_vertex + 1) % self.length
+                item.end_vertex = (item.end_vertex + 1) % self.length
+                local_beziers[i] = item
+        self.constraints = local_constraints
+        self.bezier_segments = local_beziers
+
+
+def bench_topology():
+    print("10k sequential inserts, then 10k removes, on a 100k-vertex polygon "
+          "(Bezier on every 4th edge, constraint on every 8th)")
+    n, edits = 100_000, 10_000
+    rng = np.random.default_rng(0)
+    polygon = make_polygon(n, bezier_every=4, radius=n)
+    for i in range(1, n, 8):
+        polygon.constraints[i] = Constraint('length', 100)
+    legacy = LegacyPolygon(polygon)
+    some_bezier = polygon.bezier_segments[4]
+
+    sample = 20  # The legacy edits are O(n) each; time a few and scale up
+    insert_at = rng.integers(0, n, size=edits).tolist()
+    remove_at = rng.integers(0, n, size=edits).tolist()
+    legacy_insert = best_of(lambda: [legacy.insert_vertex(i, 0, 0) for i in insert_at[:sample]], 1)
+    legacy_remove = best_of(lambda: [legacy.remove_vertex(i) for i in remove_at[:sample]], 1)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        insert = best_of(lambda: [polygon.insert_vertex(i, 0, 0) for i in insert_at], 1)
+        remove = best_of(lambda: [polygon.remove_vertex(i) for i in remove_at], 1)
+        # Same again, but resolving a curve's index after every edit as paint/drag code would
+        lookups = best_of(lambda: [(polygon.insert_vertex(i, 0, 0), some_bezier.start_vertex)
+                                   for i in insert_at], 1)
+
+    scale = edits / sample
+    print(f"{'':>22} {'10k inserts':>12} {'10k removes':>12}")
+    print(f"{'legacy (extrapolated)':>22} {legacy_insert * scale:>10.1f} s {legacy_remove * scale:>10.1f} s")
+    print(f"{'stable edge ids':>22} {insert * 1e3:>9.1f} ms {remove * 1e3:>9.1f} ms")
+    print(f"{'  + index lookup':>22} {lookups * 1e3:>9.1f} ms")
+
+
+def bench_bulk_edit():
+    print("10k inserts + 10k removes + 10k moves on a 100k-vertex polygon: one call each vs one batch")
+    n, edits = 100_000, 10_000
+    rng = np.random.default_rng(0)
+    removes = rng.choice(n, size=edits, replace=False)
+    removed = np.zeros(n, dtype=bool)
+    removed[removes] = True
+    free_edges = np.flatnonzero(~removed & ~np.roll(removed, -1))
+    inserts = [(int(e), 0, 0) for e in rng.choice(free_edges, size=edits)]
+    moves = [(int(i), 1, 1) for i in rng.choice(np.flatnonzero(~removed), size=edits, replace=False)]
+    removes = removes.tolist()
+
+    def one_by_one(polygon):
+        # Translate the batch's old indices through vertex ids as the edits shift things around
+        ids = [v.id for v in polygon.vertices]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, x, y in moves:
+                polygon.move_vertex(i, QPoint(x, y))
+            for edge, x, y in inserts:
+                polygon.insert_vertex(polygon.position_of(ids[edge]), x, y)
+            for i in removes:
+                polygon.remove_vertex(polygon.position_of(ids[i]))
+
+    print(f"{'':>28} {'time':>10}")
+    polygon = make_polygon(n, bezier_every=4, radius=n)
+    sequential = best_of(lambda: one_by_one(polygon), 1)
+    print(f"{'Polygon, one call per edit':>28} {sequential * 1e3:>7.1f} ms")
+    polygon = make_polygon(n, bezier_every=4, radius=n)
+    batch = best_of(lambda: polygon.apply_edits(inserts, removes, moves), 1)
+    print(f"{'Polygon.apply_edits':>28} {batch * 1e3:>7.1f} ms")
+    arrays = ArrayPolygon.from_polygon(make_polygon(n, bezier_every=4, radius=n))
+    batch = best_of(lambda: arrays.apply_edits(inserts, removes, moves), 1)
+    print(f"{'ArrayPolygon.apply_edits':>28} {batch * 1e3:>7.1f} ms")
+
+
+def make_staircase(n_steps, step=4):
+    """Closed rectilinear staircase of 4 * n_steps + 2 edges, each one horizontal or vertical."""
+    upper = []
+    for i in range(n_steps):
+        upper += [(i * step, i * step), ((i + 1) * step, i * step)]
+    upper.append((n_steps * step, n_steps * step))
+    lower = [(x, y + 2 * step) for x, y in reversed(upper)]
+    polygon = Polygon()
+    for x, y in upper + lower:
+        polygon.add_vertex(x, y)
+    return polygon
+
+
+def constrain_all(polygon):
+    """Constrain every edge to what it is now: horizontal, vertical, or its current length."""
+    for i, (start, end) in enumerate(polygon.get_edges()):
+        if start.y() == end.y():
+            polygon.constraints[i] = Constraint('horizontal')
+        elif start.x() == end.x():
+            polygon.constraints[i] = Constraint('vertical')
+        else:
+            polygon.constraints[i] = Constraint('length', round(math.hypot(
+                end.x() - start.x(), end.y() - start.y())))
+
+
+def bench_drag_solver():
+    print("Dragging one vertex of a fully constrained 10k-edge polygon, 60 events (1 s at 60 Hz)")
+    frame = 1 / 60
+    print(f"{'':>12} {'mean':>9} {'p99':>9} {'max':>9} {'over 60Hz':>10} "
+          f"{'pending':>8} {'finish':>9}")
+    scenes = {
+        "rectilinear": make_staircase(2500),
+        "lengths": make_polygon(10_000, bezier_every=0, radius=20_000),
+    }
+    for name, polygon in scenes.items():
+        constrain_all(polygon)
+        solver = ConstraintSolver(time_budget=0.004)
+        index = len(polygon.vertices) // 2
+        origin = polygon.vertices[index].point
+        times, pending = [], 0
+        for k in range(60):
+            angle = 2 * math.pi * k / 60
+            point = QPoint(origin.x() + round(300 * math.cos(angle)) - 300,
+                           origin.y() + round(300 * math.sin(angle)))
+            start = time.perf_counter()
+            done = solver.drag_vertex(polygon, index, point)
+            times.append(time.perf_counter() - start)
+            pending += not done
+        finish = best_of(lambda: solver.finish(polygon), 1)
+
+        edges = polygon.get_edges()
+        for i, constraint in polygon.constraints.items():
+            if i == (index - 1) % len(polygon.vertices):
+                continue  # Edge closing the loop back onto the pinned vertex
+            start, end = edges[i]
+            assert solver.satisfy(constraint, start, end) is None, (name, i)
+        times = np.array(times)
+        print(f"{name:>12} {times.mean() * 1e3:>6.2f} ms {np.percentile(times, 99) * 1e3:>6.2f} ms "
+              f"{times.max() * 1e3:>6.2f} ms {int((times > frame).sum()):>10} "
+              f"{pending:>8} {finish * 1e3:>6.1f} ms")
+
+
+def legacy_neighbour_beziers(polygon, bezier):
+    """The old per-event scan for the curves either side of a dragged control point."""
+    start_vertex = bezier.start_vertex
+    end_vertex = bezier.end_vertex
+    before_start_vertex = (start_vertex - 1) % polygon.length
+    after_end_vertex = (end_vertex + 1) % polygon.length
+    before_bezier = after_bezier = None
+    for bez in polygon.bezier_segments.values():
+        if bez.start_vertex == before_start_vertex and bez.end_vertex == start_vertex:
+            before_bezier = bez
+        elif bez.start_vertex == end_vertex and bez.end_vertex == after_end_vertex:
+            after_bezier = bez
+    return before_bezier, after_bezier
+
+
+def bench_continuity():
+    print("Dragging a control point on a 10k-edge polygon of C1 curves, 60 events")
+    polygon = make_polygon(10_000, bezier_every=1)
+    for vertex in polygon.vertices:
+        vertex.continuity = 'C1'
+    bezier = polygon.bezier_segments[5000]
+    origin = QPoint(bezier.control1)
+    points = [origin + QPoint(round(20 * math.cos(k / 10)), round(20 * math.sin(k / 10)))
+              for k in range(60)]
+
+    legacy = best_of(lambda: [legacy_neighbour_beziers(polygon, bezier) for _ in points], 1) / len(points)
+    drag = best_of(lambda: [continuity.drag_control(polygon, bezier, 'control1', p) for p in points],
+                   1) / len(points)
+    before = polygon.bezier_segments[4999]
+    center = polygon.vertices[5000].point
+    out = bezier.control1 - center
+    back = before.control2 - center
+    assert (out.x(), out.y()) == (-back.x(), -back.y()), "C1 not kept"
+    print(f"{'linear neighbour scan':>24} {legacy * 1e3:>8.3f} ms/event")
+    print(f"{'adjacency + continuity':>24} {drag * 1e3:>8.3f} ms/event")
+
+
+def bench_translate():
+    print("Dragging the whole polygon: one translate + one vertex hit test per event")
+    print(f"{'vertices':>10} {'offset':>12} {'baked (old)':>12}")
+    for n in (4, 10_000, 1_000_000):
+        polygon = make_polygon(n, bezier_every=4, radius=max(n, 350))
+        polygon.find_vertex(0, 0, 10)  # Build the hit index up front
+        target = polygon.vertices[0].point
+
+        def drag(bake):
+            for _ in range(10):
+                polygon.translate(QPoint(1, 1))
+                if bake:
+                    polygon.bake_offset()
+                local = polygon.to_local(target + polygon.offset)
+                assert polygon.find_vertex(local.x(), local.y(), 1) == 0
+
+        offset = best_of(lambda: drag(False), 1) / 10
+        baked = best_of(lambda: drag(True), 1) / 10
+        print(f"{n:>10} {offset * 1e6:>9.1f} us {baked * 1e3:>9.2f} ms")
+
+
+def bench_dirty_repaint():
+    print("Dragging one vertex of a 10k-vertex polygon in a shown 1200x800 canvas, 60 events")
+    from PyQt5.QtGui import QMouseEvent
+    from PyQt5.QtCore import QEvent, Qt
+    app = QApplication.instance()
+
+    def mouse(kind, point):
+        return QMouseEvent(kind, point, Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+
+    for partial in (False, True):
+        polygon = make_polygon(10_000, bezier_every=4)
+        canvas = make_canvas(polygon)
+        canvas.partial_updates = partial
+        canvas.show()
+        app.processEvents()
+        target = polygon.vertices[0].point
+        with contextlib.redirect_stdout(io.StringIO()):
+            canvas.mousePressEvent(mouse(QEvent.MouseButtonPress, target))
+        canvas.frame_times.clear()
+        start = time.perf_counter()
+        for k in range(60):
+            point = target + QPoint(round(40 * math.cos(k / 5)) - 40, round(40 * math.sin(k / 5)))
+            canvas.mouseMoveEvent(mouse(QEvent.MouseMove, point))
+            app.processEvents()
+        elapsed = time.perf_counter() - start
+        label = "update(rect) + static layer" if partial else "full repaint"
+        print(f"{label:>28}: {canvas.frame_time_report()}; {elapsed / 60 * 1e3:.2f} ms/event overall")
+        canvas.mouseReleaseEvent(mouse(QEvent.MouseButtonRelease, point))
+        canvas.close()
+
+
+def bench_coalesce():
+    print("1000 Hz mouse (16 moves per 60 Hz frame) dragging a vertex of a length-constrained 10k ring, 60 frames")
+    from PyQt5.QtGui import QMouseEvent
+    from PyQt5.QtCore import QEvent, Qt
+
+    def mouse(kind, point):
+        return QMouseEvent(kind, point, Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+
+    print(f"{'':>12} {'received':>9} {'applied':>8} {'model time/frame':>17}")
+    for coalesce in (False, True):
+        polygon = make_polygon(10_000, bezier_every=0, radius=20_000)
+        constrain_all(polygon)
+        canvas = make_canvas(polygon)
+        canvas.coalesce_moves = coalesce
+        canvas.partial_updates = False
+        target = polygon.vertices[0].point
+        with contextlib.redirect_stdout(io.StringIO()):
+            canvas.mousePressEvent(mouse(QEvent.MouseButtonPress, target))
+        start = time.perf_counter()
+        for frame in range(60):
+            for k in range(16):
+                step = frame * 16 + k
+                canvas.mouseMoveEvent(mouse(QEvent.MouseMove, target - QPoint(step // 4, step // 8)))
+            if coalesce:
+                canvas.apply_pending_move()  # What the frame timer does on its tick
+        elapsed = time.perf_counter() - start
+        canvas.mouseReleaseEvent(mouse(QEvent.MouseButtonRelease, target))
+        label = "coalesced" if coalesce else "every event"
+        print(f"{label:>12} {canvas.moves_received:>9} {canvas.moves_applied:>8} "
+              f"{elapsed / 60 * 1e3:>14.2f} ms")
+
+
+def bench_lod():
+    print("Painting dense outlines (regular n-gon of radius 350 px) with and without level of detail")
+    print(f"{'vertices':>10} {'storage':>12} {'full':>10} {'LOD first':>10} {'LOD':>10} "
+          f"{'outline':>8} {'handles':>8} {'labels':>7}")
+    image = QImage(1200, 800, QImage.Format_ARGB32_Premultiplied)
+    for n, storage in ((100_000, Polygon), (100_000, ArrayPolygon), (1_000_000, ArrayPolygon)):
+        polygon = make_polygon(n, bezier_every=0)
+        if storage is ArrayPolygon:
+            polygon = ArrayPolygon.from_polygon(polygon)
+        canvas = make_canvas(polygon)
+
+        def paint():
+            painter = QPainter(image)
+            canvas.render(painter)
+            painter.end()
+
+        full = float("nan")
+        if n <= 100_000:
+            canvas.level_of_detail = False
+            full = best_of(paint, 1)
+            canvas.level_of_detail = True
+        first = best_of(paint, 1)  # Includes building the simplification hierarchy
+        lod = best_of(paint, 3)
+        outline = int(canvas.outline_detail(polygon.coordinates(), np.zeros(0, dtype=int)).sum())
+        handles, labels = canvas.visible_vertices()
+        print(f"{n:>10} {storage.__name__:>12} {full:>8.2f} s {first:>8.2f} s {lod * 1e3:>7.1f} ms "
+              f"{outline:>8} {len(handles) + len(labels):>8} {len(labels):>7}")
+
+
+def bench_labels():
+    print("Drawing 5000 vertex labels and 5000 constraint labels per frame")
+    image = QImage(1200, 800, QImage.Format_ARGB32_Premultiplied)
+    rng = np.random.default_rng(0)
+    xs = rng.integers(0, 1200, size=5000).tolist()
+    ys = rng.integers(0, 800, size=5000).tolist()
+    texts = [f"V{i}" for i in range(5000)] + [f"length={100 + i % 50}" for i in range(5000)]
+    cache = LabelCache()
+
+    def frame(cached, dx):
+        painter = QPainter(image)
+        cache.set_font(painter.font())
+        for i, text in enumerate(texts):
+            x, y = xs[i % 5000] + dx, ys[i % 5000]
+            if cached:
+                cache.draw(painter, x, y, text)
+            else:
+                painter.drawText(x, y, text)
+        painter.end()
+
+    plain = best_of(lambda: frame(False, 1), 3)
+    frame(True, 0)  # Lay everything out once
+    cached = best_of(lambda: frame(True, 1), 3)  # Labels moved, text unchanged
+    print(f"{'drawText':>22} {plain * 1e3:>8.1f} ms/frame")
+    print(f"{'QStaticText cache':>22} {cached * 1e3:>8.1f} ms/frame "
+          f"({cache.hits} hits, {cache.misses} misses, {len(cache.entries)} entries)")
+
+
+def bench_viewport():
+    print("Painting a zoomed-in view of a large outline (n-gon of radius n px) with and without culling")
+    print(f"{'vertices':>10} {'storage':>12} {'zoom':>5} {'visible':>8} {'no culling':>11} {'culling':>10}")
+    image = QImage(1200, 800, QImage.Format_ARGB32_Premultiplied)
+    for n, storage in ((100_000, Polygon), (1_000_000, ArrayPolygon)):
+        polygon = make_polygon(n, bezier_every=16, radius=n)
+        if storage is ArrayPolygon:
+            polygon = ArrayPolygon.from_polygon(polygon)
+        canvas = make_canvas(polygon)
+        anchor = polygon.vertices[0].point
+        for zoom in (1.0, 4.0):
+            canvas.zoom = zoom
+            canvas.pan = QPointF(600 - anchor.x() * zoom, 400 - anchor.y() * zoom)
+
+            def paint():
+                painter = QPainter(image)
+                canvas.render(painter)
+                painter.end()
+
+            canvas.culling = False
+            plain = best_of(paint, 1)
+            canvas.culling = True
+            culled = best_of(paint, 3)
+            rect = canvas.view_transform().inverted()[0].mapRect(canvas.rect())
+            visible = polygon.count_in_rect(rect.left(), rect.top(), rect.right(), rect.bottom())
+            print(f"{n:>10} {storage.__name__:>12} {zoom:>5.1f} {visible:>8} "
+                  f"{plain * 1e3:>8.1f} ms {culled * 1e3:>7.1f} ms")
+
+
+def check_scene_round_trip(polygon, loaded):
+    """Fail loudly unless `loaded` holds the same geometry, continuity, constraints and curves."""
+    assert np.array_equal(loaded.coordinates(), polygon.coordinates()), "vertices differ"
+    assert [v.continuity for v in loaded.vertices] == [v.continuity for v in polygon.vertices], \
+        "continuity differs"
+    assert sorted((i, c.type, c.value) for i, c in loaded.constraints.items()) == \
+        sorted((i, c.type, c.value) for i, c in polygon.constraints.items()), "constraints differ"
+    assert sorted((i, b.control1, b.control2) for i, b in loaded.bezier_segments.items()) == \
+        sorted((i, b.control1, b.control2) for i, b in polygon.bezier_segments.items()), "curves differ"
+
+
+def bench_scene_file():
+    print("Binary scene files: 1M vertices, Bezier on every 16th edge, constraint on every 8th")
+    path = os.path.join(tempfile.mkdtemp(), "scene.gksc")
+    n = 1_000_000
+    polygon = make_polygon(n, bezier_every=16, radius=n)
+    for i in range(1, n, 8):
+        polygon.constraints[i] = Constraint('length', 100) if i % 16 == 1 else Constraint('vertical')
+    for i in range(0, n, 16):
+        polygon.vertices[i].continuity = 'G1' if i % 32 else 'C1'
+    arrays = ArrayPolygon.from_polygon(polygon)
+
+    save_objects = best_of(lambda: save_scene(path, polygon), 1)
+    save_arrays = best_of(lambda: save_scene(path, arrays), 1)
+    megabytes = os.path.getsize(path) / 1e6
+    opened = best_of(lambda: load_scene(path))
+    loaded = load_scene(path)
+    first_touch = best_of(lambda: loaded.coordinates().sum(), 1)
+    check_scene_round_trip(polygon, loaded)
+    print(f"Round trip through {megabytes:.1f} MB matches the Polygon")
+    print(f"{'save Polygon':>22} {save_objects * 1e3:>8.0f} ms {megabytes / save_objects:>8.0f} MB/s")
+    print(f"{'save ArrayPolygon':>22} {save_arrays * 1e3:>8.0f} ms {megabytes / save_arrays:>8.0f} MB/s")
+    print(f"{'open (memory map)':>22} {opened * 1e3:>8.2f} ms")
+    print(f"{'first pass over coords':>22} {first_touch * 1e3:>8.1f} ms")
+    os.remove(path)
+
+
+def bench_path_io():
+    print("SVG paths and point lists: 1M vertices, Bezier on every 16th edge")
+    directory = tempfile.mkdtemp()
+    n = 1_000_000
+    polygon = make_polygon(n, bezier_every=16, radius=n)
+    arrays = ArrayPolygon.from_polygon(polygon)
+    print(f"{'':>24} {'time':>11} {'MB/s':>8}")
+    for name, export, load in (("svg", path_io.export_svg, path_io.import_svg),
+                               ("csv", path_io.export_points, path_io.import_points)):
+        path = os.path.join(directory, "outline." + name)
+        exported = best_of(lambda: export(path, arrays), 1)
+        export_objects = best_of(lambda: export(path, polygon), 1)
+        megabytes = os.path.getsize(path) / 1e6
+        imported = best_of(lambda: load(path), 1)
+        import_objects = best_of(lambda: load(path, Polygon), 1)
+        loaded = load(path)
+        assert np.array_equal(loaded.coordinates(), polygon.coordinates()), f"{name}: vertices differ"
+        if name == "svg":
+            assert sorted((i, b.control1, b.control2) for i, b in loaded.bezier_segments.items()) == \
+                sorted((i, b.control1, b.control2) for i, b in polygon.bezier_segments.items()), "svg: curves differ"
+        for label, seconds in ((f"{name} export Polygon", export_objects),
+                               (f"{name} export ArrayPolygon", exported),
+                               (f"{name} import Polygon", import_objects),
+                               (f"{name} import ArrayPolygon", imported)):
+            print(f"{label:>24} {seconds * 1e3:>8.0f} ms {megabytes / seconds:>8.0f}")
+        print(f"{'':>24} {megabytes:.1f} MB, round trip matches")
+        os.remove(path)
+
+
+def make_scene(shapes, vertices, spacing=100):
+    """Square grid of `shapes` n-gons of radius 40, each with a Bezier on every 16th edge."""
+    side = math.ceil(math.sqrt(shapes))
+    scene = Scene()
+    polygons = []
+    for k in range(shapes):
+        polygon = make_polygon(vertices, bezier_every=16, radius=40)
+        polygon.translate(QPoint((k % side) * spacing - 600, (k // side) * spacing - 400))
+        polygons.append(polygon)
+    build = best_of(lambda: scene.add_many(polygons), 1)
+    return scene, build
+
+
+def bench_scene():
+    shapes, vertices = 10_000, 100
+    print(f"Scene of {shapes} shapes x {vertices} vertices on a 100 px grid")
+    scene, build = make_scene(shapes, vertices)
+    print(f"{'add shapes':>28} {build * 1e3:>9.1f} ms")
+    canvas = Canvas()
+    canvas.resize(1200, 800)
+    canvas.set_scene(scene)
+    image = QImage(1200, 800, QImage.Format_ARGB32_Premultiplied)
+
+    def paint():
+        painter = QPainter(image)
+        canvas.render(painter)
+        painter.end()
+
+    def paint_all_shapes():
+        # What painting costs without the scene index: every shape goes through draw_shapes
+        painter = QPainter(image)
+        canvas.draw_shapes(painter, [i for i in scene if i != canvas.shape_id])
+        painter.end()
+
+    for label, zoom in (("fitted", None), ("1:1", 1.0), ("4:1", 4.0)):
+        if zoom is None:
+            canvas.fit_to_content()
+        else:
+            canvas.zoom, canvas.pan = zoom, QPointF(600 - 5000 * zoom, 400 - 5000 * zoom)
+        visible = len(canvas.visible_shapes(canvas.rect()))
+        culled = best_of(paint, 3)
+        plain = best_of(paint_all_shapes, 1)
+        print(f"{'paint ' + label:>28} {culled * 1e3:>9.1f} ms  ({visible} shapes visible; "
+              f"{plain * 1e3:.0f} ms drawing every shape)")
+
+    # Clicks on random vertices of random shapes must be routed to those shapes
+    canvas.zoom, canvas.pan = 1.0, QPointF(600 - 5000, 400 - 5000)
+    rng = np.random.default_rng(0)
+    targets = [(int(k), int(i)) for k, i in zip(rng.integers(0, shapes, 200), rng.integers(0, vertices, 200))]
+    clicks = [canvas.view_transform(scene[k]).map(QPointF(scene[k].vertices[i].point)) for k, i in targets]
+    for (k, i), click in zip(targets, clicks):
+        shape_id, _, vertex = canvas.hit_test(click)
+        assert (shape_id, vertex) == (k, i), f"click on vertex {i} of shape {k} went to {shape_id}/{vertex}"
+    routed = best_of(lambda: [canvas.hit_test(click) for click in clicks]) / len(clicks)
+
+    def hit_every_shape(click):
+        for k in scene:
+            polygon = scene[k]
+            pos = canvas.to_local(click, polygon)
+            if canvas.get_clicked_vertex(pos, polygon) is not None:
+                return k
+
+    naive = best_of(lambda: [hit_every_shape(click) for click in clicks[:10]], 1) / 10
+    print(f"{'click routing':>28} {routed * 1e6:>9.1f} us  ({naive * 1e3:.1f} ms asking every shape)")
+
+    moves = best_of(lambda: [scene.translate(7, QPoint(1, 1)) for _ in range(1000)]) / 1000
+    print(f"{'move one shape':>28} {moves * 1e6:>9.1f} us")
+
+
+def history_session(window, polygon):
+    """Every kind of edit the history records, done through the window and canvas as a user would.
+
+    Returns the state digest after each action.
+    """
+    from collections import deque
+    from PyQt5.QtGui import QMouseEvent
+    from PyQt5.QtCore import QEvent, Qt
+    from input_trace import state_digest
+
+    canvas = window.canvas
+
+    def mouse(kind, point):
+        point = canvas.view_transform().map(QPointF(point)).toPoint()
+        return QMouseEvent(kind, point, Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+
+    def drag(start, steps):
+        canvas.mousePressEvent(mouse(QEvent.MouseButtonPress, start))
+        for k in range(1, steps + 1):
+            canvas.mouseMoveEvent(mouse(QEvent.MouseMove, start + QPoint(3 * k, -2 * k)))
+        canvas.mouseReleaseEvent(mouse(QEvent.MouseButtonRelease, start + QPoint(3 * steps, -2 * steps)))
+
+    def answer(*answers):
+        window.replay_answers = deque(answers)
+
+    def midpoint(edge):
+        a, b = polygon.vertices[edge].point, polygon.vertices[edge + 1].point
+        return (a + b) / 2
+
+    actions = [
+        lambda: window.add_vertex_on_edge(5, midpoint(5)),
+        lambda: (answer((0, True)), window.add_constraint(10, None)),
+        lambda: (answer((2, True), (150, True)), window.add_constraint(11, None)),
+        lambda: window.add_bezier_curve(20),
+        lambda: (answer((2, True)), window.add_vertex_continuity(21)),
+        lambda: (answer((1, True)), window.add_vertex_continuity(24)),
+        lambda: drag(polygon.vertices[11].point, 20),  # Pulls the constrained neighbours along
+        lambda: drag(polygon.vertices[24].point, 10),  # Carries the curve handles at a G1 vertex
+        lambda: drag(polygon.bezier_segments[20].control1, 10),
+        lambda: drag(QPoint(600, 400), 15),  # Inside the outline: the whole shape
+        lambda: window.remove_vertex(21),
+        lambda: window.remove_vertex(0),
+        lambda: window.remove_bezier_curve(16),
+        lambda: window.remove_constraint(10),
+    ]
+    digests = [state_digest(canvas.scene)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for action in actions:
+            action()
+            digests.append(state_digest(canvas.scene))
+    window.replay_answers = None
+    return digests
+
+
+def bench_history():
+    from PyQt5.QtGui import QMouseEvent
+    from PyQt5.QtCore import QEvent, Qt
+    from main import MainWindow
+    from input_trace import state_digest
+    from history import History, SetContinuity, RECORD_BYTES
+
+    LEFT_BUTTON = (Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+
+    print("Undo/redo: command records instead of snapshots")
+    window = MainWindow()
+    canvas = window.canvas
+    canvas.resize(1200, 800)
+    canvas.coalesce_moves = False
+    for polygon in (make_polygon(400, bezier_every=16, radius=3000),
+                    ArrayPolygon.from_polygon(make_polygon(400, bezier_every=16, radius=3000))):
+        canvas.set_polygon(polygon)
+        canvas.zoom, canvas.pan = 1.0, QPointF(-2400, 0)
+        digests = history_session(window, polygon)
+        assert len(set(digests)) == len(digests), "an action left the polygon unchanged"
+        assert len(canvas.history) == len(digests) - 1, "drags should be one entry each"
+        for expected in reversed(digests[:-1]):
+            canvas.undo()
+            assert state_digest(canvas.scene) == expected, "undo did not restore the previous state"
+        for expected in digests[1:]:
+            canvas.redo()
+            assert state_digest(canvas.scene) == expected, "redo did not repeat the edit"
+        print(f"{type(polygon).__name__:>12}: {len(digests) - 1} actions undone and redone exactly, "
+              f"{canvas.history.memory / (len(digests) - 1):.0f} bytes per entry")
+
+    # Undo and redo cost the size of the edit, not of the polygon
+    row_bytes = sum(dtype.itemsize * int(np.prod(shape, dtype=int)) for _, dtype, shape in scene_file.COLUMNS)
+    print(f"{'vertices':>10} {'insert undo+redo':>17} {'drag undo+redo':>15} {'drag entry':>11} "
+          f"{'snapshot':>9}  (snapshot: one copy as packed columns)")
+    for n in (10_000, 1_000_000):
+        polygon = make_polygon(n, bezier_every=16, radius=n)
+        middle = n // 2
+        for i in range(middle - 500, middle + 500):  # A chain of constraints for the drag to pull along
+            polygon.constraints[i] = Constraint('length', 6)
+        canvas.set_polygon(polygon)
+        window.add_vertex_on_edge(1, polygon.vertices[1].point + QPoint(0, 5))
+        insert = best_of(lambda: (canvas.undo(), canvas.redo()), 5)
+        canvas.zoom, canvas.pan = 1.0, QPointF(600, 400) - QPointF(polygon.vertices[middle].point)
+        canvas.mousePressEvent(QMouseEvent(QEvent.MouseButtonPress, QPoint(600, 400), *LEFT_BUTTON))
+        canvas.mouseMoveEvent(QMouseEvent(QEvent.MouseMove, QPoint(640, 380), *LEFT_BUTTON))
+        canvas.mouseReleaseEvent(QMouseEvent(QEvent.MouseButtonRelease, QPoint(640, 380), *LEFT_BUTTON))
+        _, commands, entry_bytes = canvas.history.undo_entries[-1]
+        drag = best_of(lambda: (canvas.undo(), canvas.redo()), 5)
+        print(f"{n:>10} {insert * 1e6:>14.0f} us {drag * 1e3:>12.2f} ms {entry_bytes / 1e3:>8.1f} kB "
+              f"{n * row_bytes / 1e6:>6.1f} MB  ({len(commands[0].vertices)} vertices dragged)")
+
+    # The memory cap drops the oldest entries and keeps the newest undoable
+    scene = Scene([make_polygon(100, bezier_every=0)])
+    history = History(memory_limit=10 * RECORD_BYTES)
+    for i in range(100):
+        command = SetContinuity(scene[0], i, 'G1')
+        scene[0].add_vertex_continuity(i, 'G1')
+        history.push(0, [command])
+    assert history.memory <= history.memory_limit and history.evicted == 90, "memory cap not kept"
+    while history.undo(scene) is not None:
+        pass
+    continuities = [v.continuity for v in scene[0].vertices]
+    assert continuities == ['G1'] * 90 + ['G0'] * 10, "undo past the cap must stop at the oldest kept entry"
+    print(f"Memory cap of {history.memory_limit} bytes: {history.evicted} oldest of 100 entries evicted")
+
+
+BENCHMARKS = {
+    "bezier": bench_bezier,
+    "flatten": bench_flatten,
+    "paint": bench_paint,
+    "bresenham": bench_bresenham,
+    "hit_test": bench_hit_test,
+    "memory": bench_memory,
+    "topology": bench_topology,
+    "bulk_edit": bench_bulk_edit,
+    "drag_solver": bench_drag_solver,
+    "continuity": bench_continuity,
+    "translate": bench_translate,
+    "dirty_repaint": bench_dirty_repaint,
+    "coalesce": bench_coalesce,
+    "lod": bench_lod,
+    "labels": bench_labels,
+    "viewport": bench_viewport,
+    "scene_file": bench_scene_file,
+    "path_io": bench_path_io,
+    "scene": bench_scene,
+    "history": bench_history,
+}
+
+
+def main(argv):
+    app = QApplication(sys.argv[:1])
+    names = argv or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,345 @@
+"""Parameterized benchmark suite for the editor core, with JSON results.
+
+Every case runs on regular n-gons of each size and Bezier density and
+reports seconds per operation. Save a run, then compare a later commit
+against it; cases that got slower than the threshold fail the run:
+
+    python benchmark_suite.py --output before.json
+    python benchmark_suite.py --baseline before.json --threshold 0.2
+    python benchmark_suite.py --quick paint_library hit_edge     # small sizes, two cases
+
+Runs headless under the offscreen Qt platform. Each case is warmed up
+first and compared by its fastest run, the least noisy statistic, and
+cases that look slower are measured again before they count as
+regressions.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime, timezone
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QEvent, QPoint, QPointF, Qt, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt5.QtGui import QImage, QMouseEvent
+
+from benchmark import make_polygon, make_canvas
+
+FORMAT_VERSION = 1
+SIZES = (4, 100, 10_000, 100_000, 1_000_000)
+QUICK_SIZES = (4, 100, 10_000)
+DENSITIES = (0, 16, 1)  # Bezier on every n-th edge; 0 for none
+NOISE_FLOOR = 5e-6  # Seconds per op; smaller differences are timer and scheduler noise, never regressions
+RECHECKS = 2  # Times a case that looks slower is measured again before it fails the run
+
+
+def measure(fn, min_time=0.2, max_runs=200, min_runs=5):
+    """Per-run wall-clock times of `fn`, after one untimed warm-up run.
+
+    Repeats until `min_time` has passed and at least `min_runs` ran (but
+    stops after a single run of a case slower than `min_time`). The garbage
+    collector is off while timing, so its pauses do not land on random runs.
+    """
+    fn()
+    times = []
+    total = 0.0
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(times) < max_runs and (total < min_time or len(times) < min_runs):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            times.append(elapsed)
+            total += elapsed
+            if elapsed >= min_time:
+                break
+    finally:
+        if enabled:
+            gc.enable()
+    return times
+
+
+def mouse(kind, pos, button=Qt.LeftButton):
+    buttons = Qt.NoButton if kind == QEvent.MouseButtonRelease else button
+    return QMouseEvent(kind, QPointF(pos), button, buttons, Qt.NoModifier)
+
+
+def sample_indices(n, count, seed=0):
+    return np.random.default_rng(seed).integers(0, n, size=min(n, count)).tolist()
+
+
+def case_paint(canvas, bresenham):
+    """One offscreen paintEvent into a window-sized QImage, zoomed out to the whole polygon."""
+    image = QImage(canvas.width(), canvas.height(), QImage.Format_ARGB32_Premultiplied)
+    canvas.bresenham = bresenham
+    canvas.fit_to_content()
+    canvas.render(image)  # Warm the curve and level-of-detail caches
+    return lambda: canvas.render(image), 1
+
+
+def case_bezier(canvas):
+    """calculate_bezier_points on up to 1000 curves."""
+    beziers = list(canvas.polygon.bezier_segments.values())[:1000]
+    if not beziers:
+        return None
+    return lambda: [canvas.calculate_bezier_points(b) for b in beziers], len(beziers)
+
+
+def case_bresenham_line(canvas):
+    """bresenham_line along up to 1000 edges."""
+    polygon = canvas.polygon
+    n = len(polygon.vertices)
+    lines = []
+    for i in sample_indices(n, 1000):
+        start, end = polygon.vertices[i].point, polygon.vertices[(i + 1) % n].point
+        lines.append((start.x(), start.y(), end.x(), end.y()))
+    return lambda: [canvas.bresenham_line(*line) for line in lines], len(lines)
+
+
+def clicks(canvas, count=100):
+    """Points just off random vertices, in the canvas' local coordinates."""
+    polygon = canvas.polygon
+    return [polygon.vertices[i].point + QPoint(2, 1) for i in sample_indices(len(polygon.vertices), count)]
+
+
+def case_hit_vertex(canvas):
+    points = clicks(canvas)
+    canvas.get_clicked_vertex(points[0])  # Build the hit index
+    return lambda: [canvas.get_clicked_vertex(p) for p in points], len(points)
+
+
+def case_hit_edge(canvas):
+    points = clicks(canvas)
+    canvas.get_clicked_edge(points[0])
+    return lambda: [canvas.get_clicked_edge(p) for p in points], len(points)
+
+
+def case_insert_remove(canvas):
+    """insert_vertex followed by remove_vertex of the new vertex, which leaves the polygon as it was."""
+    polygon = canvas.polygon
+    edges = sample_indices(len(polygon.vertices), 100)
+
+    def run():
+        for edge in edges:
+            start = polygon.vertices[edge].point
+            polygon.insert_vertex(edge, start.x() + 1, start.y() + 1)
+            polygon.remove_vertex(edge + 1)
+
+    return run, 2 * len(edges)
+
+
+def case_drag_polygon(canvas):
+    """Dragging the whole polygon by mouse: one press, 20 moves, one release."""
+    canvas.coalesce_moves = False  # Time every move, not one per frame tick
+    center = QPointF(canvas.width() / 2, canvas.height() / 2)  # Inside the n-gon, away from its edges
+
+    def run():
+        canvas.mousePressEvent(mouse(QEvent.MouseButtonPress, center))
+        for step in range(1, 21):
+            canvas.mouseMoveEvent(mouse(QEvent.MouseMove, center + QPointF(step, step // 2)))
+        canvas.mouseReleaseEvent(mouse(QEvent.MouseButtonRelease, center + QPointF(20, 10)))
+
+    return run, 20
+
+
+CASES = {
+    "paint_library": lambda canvas: case_paint(canvas, bresenham=False),
+    "paint_bresenham": lambda canvas: case_paint(canvas, bresenham=True),
+    "bezier": case_bezier,
+    "bresenham_line": case_bresenham_line,
+    "hit_vertex": case_hit_vertex,
+    "hit_edge": case_hit_edge,
+    "insert_remove": case_insert_remove,
+    "drag_polygon": case_drag_polygon,
+}
+
+
+def case_key(case, n, bezier_every):
+    return f"{case}/n={n}/bezier_every={bezier_every}"
+
+
+def run_suite(cases, sizes, densities, min_time):
+    results = {}
+    for n in sizes:
+        for bezier_every in densities:
+            build = time.perf_counter()
+            canvas = make_suite_canvas(n, bezier_every)
+            build = time.perf_counter() - build
+            print(f"{n} vertices, Bezier every {bezier_every or '-'} (built in {build:.2f} s)")
+            for case in cases:
+                result = run_case(canvas, case, n, bezier_every, min_time)
+                if result is None:
+                    continue
+                results[case_key(case, n, bezier_every)] = result
+                print(f"  {case:>16} {format_seconds(result['median']):>10}/op "
+                      f"(min {format_seconds(result['min'])}, {result['runs']} runs)")
+            del canvas
+    return results
+
+
+def make_suite_canvas(n, bezier_every):
+    return make_canvas(make_polygon(n, bezier_every=bezier_every, radius=max(n, 350)))
+
+
+def run_case(canvas, case, n, bezier_every, min_time):
+    """Result entry of one case on the canvas' polygon, or None if it does not apply to it."""
+    canvas.zoom, canvas.pan = 1.0, QPointF(0, 0)
+    prepared = CASES[case](canvas)
+    if prepared is None:
+        return None
+    fn, ops = prepared
+    times = measure(fn, min_time)
+    per_op = np.array(times) / ops
+    return {
+        "case": case,
+        "vertices": n,
+        "bezier_every": bezier_every,
+        "ops": ops,
+        "runs": len(times),
+        "median": float(np.median(per_op)),
+        "min": float(per_op.min()),
+    }
+
+
+def recheck(keys, results, min_time):
+    """Measure the given cases again, keeping the faster of the old and new minimum."""
+    groups = {}
+    for key in keys:
+        result = results[key]
+        groups.setdefault((result["vertices"], result["bezier_every"]), []).append(result["case"])
+    for (n, bezier_every), cases in groups.items():
+        canvas = make_suite_canvas(n, bezier_every)
+        for case in cases:
+            again = run_case(canvas, case, n, bezier_every, min_time)
+            result = results[case_key(case, n, bezier_every)]
+            result["min"] = min(result["min"], again["min"])
+            result["runs"] += again["runs"]
+        del canvas
+
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "qt": QT_VERSION_STR,
+        "pyqt": PYQT_VERSION_STR,
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def save(path, results):
+    document = {
+        "version": FORMAT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=1, sort_keys=True)
+
+
+def load(path):
+    with open(path) as file:
+        document = json.load(file)
+    if document.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported results version {document.get('version')}")
+    return document["results"]
+
+
+def regressed(old, new, threshold):
+    """Whether a case went from `old` to `new` seconds per op and regressed.
+
+    Cases are compared by their fastest run per op. A case regresses when
+    it is more than `threshold` slower and also more than NOISE_FLOOR
+    slower, which matters for cases of a few microseconds.
+    """
+    return old > 0 and new / old - 1 > threshold and new - old > NOISE_FLOOR
+
+
+def find_regressions(baseline, results, threshold):
+    """Keys of the cases found in both runs that regressed, without printing anything."""
+    return [key for key in sorted(results.keys() & baseline.keys())
+            if regressed(baseline[key]["min"], results[key]["min"], threshold)]
+
+
+def compare(baseline, results, threshold):
+    """Print the change of every case found in both runs; return the keys that regressed."""
+    regressions = []
+    print(f"{'case':>48} {'baseline':>10} {'now':>10} {'change':>8}")
+    for key in sorted(results.keys() & baseline.keys()):
+        old, new = baseline[key]["min"], results[key]["min"]
+        change = new / old - 1 if old > 0 else 0.0
+        is_regression = regressed(old, new, threshold)
+        if is_regression:
+            regressions.append(key)
+        print(f"{key:>48} {format_seconds(old):>10} {format_seconds(new):>10} "
+              f"{change:>+7.0%}{'  REGRESSION' if is_regression else ''}")
+    missing = sorted(baseline.keys() - results.keys())
+    if missing:
+        print(f"{len(missing)} baseline cases were not run")
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the polygon editor core.")
+    parser.add_argument("cases", nargs="*", metavar="case",
+                        help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--sizes", type=int, nargs="+", help="vertex counts (default: 4 to 1M)")
+    parser.add_argument("--densities", type=int, nargs="+", default=list(DENSITIES),
+                        help="Bezier on every n-th edge, 0 for none (default: 0 16 1)")
+    parser.add_argument("--quick", action="store_true", help="only sizes up to 10k")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to repeat each case for")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fail when a case is this much slower than the baseline (default: 0.2)")
+    args = parser.parse_args(argv)
+    unknown = [case for case in args.cases if case not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    app = QApplication(sys.argv[:1])
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    results = run_suite(args.cases or list(CASES), sizes, args.densities, args.min_time)
+    regressions = []
+    if args.baseline:
+        baseline = load(args.baseline)
+        regressions = find_regressions(baseline, results, args.threshold)
+        for attempt in range(RECHECKS):
+            if not regressions:
+                break
+            print(f"Measuring {len(regressions)} slower cases again ({attempt + 1}/{RECHECKS})")
+            recheck(regressions, results, args.min_time)
+            regressions = find_regressions(baseline, results, args.threshold)
+        regressions = compare(baseline, results, args.threshold)
+    if args.output:
+        save(args.output, results)
+        print(f"Saved {len(results)} results to {args.output}")
+    if regressions:
+        print(f"{len(regressions)} cases regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,96 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=256)
+def bernstein_basis(steps):
+    """Cubic Bernstein basis sampled at `steps` evenly spaced t in [0, 1], shape (steps, 4)."""
+    t = np.linspace(0, 1, steps)
+    mt = 1 - t
+    basis = np.stack([mt**3, 3 * mt**2 * t, 3 * mt * t**2, t**3], axis=1)
+    basis.setflags(write=False)  # shared between callers
+    return basis
+
+
+def bernstein_row(t):
+    """Cubic Bernstein basis at a single parameter t, shape (1, 4)."""
+    mt = 1 - t
+    return np.array([[mt**3, 3 * mt**2 * t, 3 * mt * t**2, t**3]])
+
+
+def evaluate_bezier(control_points, steps):
+    """Sample cubics at `steps` evenly spaced t.
+
+    One cubic given as a (4, 2) array of P0, P1, P2, P3 gives (steps, 2);
+    many given as an (n, 4, 2) array give (n, steps, 2), in one matmul.
+    """
+    return bernstein_basis(steps) @ control_points
+
+
+def flatness_sample_counts(control_points, tolerance):
+    """Samples per cubic so that the polyline stays within `tolerance` of the curve.
+
+    Uses Wang's formula on an (n, 4, 2) array: a cubic flattened into
+    sqrt(3/4 * M / tolerance) uniform pieces deviates from the chords by at
+    most `tolerance`, where M is the largest second difference of the control
+    polygon.
+    """
+    d1 = control_points[:, 0] - 2 * control_points[:, 1] + control_points[:, 2]
+    d2 = control_points[:, 1] - 2 * control_points[:, 2] + control_points[:, 3]
+    m = np.maximum(np.hypot(d1[:, 0], d1[:, 1]), np.hypot(d2[:, 0], d2[:, 1]))
+    pieces = np.ceil(np.sqrt(0.75 * m / tolerance)).astype(int)
+    return np.maximum(pieces, 1) + 1
+
+
+def flatten_bezier(control_points, tolerance):
+    """Adaptively flatten one cubic given as a (4, 2) array -> (samples, 2)."""
+    count = flatness_sample_counts(control_points[np.newaxis], tolerance)[0]
+    return evaluate_bezier(control_points, count)
+
+
+def flatten_beziers(control_points, tolerance):
+    """Adaptively flatten an (n, 4, 2) array of cubics.
+
+    Returns the sample counts per segment and one flat (sum(counts), 2) array
+    of points; split it with np.split(points, np.cumsum(counts)[:-1]).
+    """
+    counts = flatness_sample_counts(control_points, tolerance)
+    offsets = np.cumsum(counts) - counts
+    points = np.empty((counts.sum(), 2))
+    # Segments needing the same number of samples share one cached basis and one matmul
+    for count in np.unique(counts):
+        group = np.flatnonzero(counts == count)
+        rows = offsets[group][:, np.newaxis] + np.arange(count)
+        points[rows] = evaluate_bezier(control_points[group], count)
+    return counts, points
+
+
+def bezier_bounds(control_points):
+    """Tight axis-aligned bounds of many cubics given as (n, 4, 2) -> (n, 4) of min_x, min_y, max_x, max_y.
+
+    Besides the endpoints, a cubic can only reach its extremes where a
+    coordinate's derivative is zero. Per axis the derivative is the quadratic
+    a t^2 + b t + c below (up to a factor of 3), so its roots in (0, 1) are
+    found in closed form and the curve is evaluated there.
+    """
+    p = np.asarray(control_points, dtype=float)
+    p0, p1, p2, p3 = p[:, 0], p[:, 1], p[:, 2], p[:, 3]
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 2 * (p0 - 2 * p1 + p2)
+    c = p1 - p0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sqrt_disc = np.sqrt(b * b - 4 * a * c)  # NaN when there are no real roots
+        quadratic = np.abs(a) > 1e-12
+        root1 = np.where(quadratic, (-b + sqrt_disc) / (2 * a), -c / b)
+        root2 = np.where(quadratic, (-b - sqrt_disc) / (2 * a), np.nan)
+    candidates = [p0, p3]
+    for t in (root1, root2):
+        inside = (t > 0) & (t < 1)  # NaN compares False
+        t = np.where(inside, t, 0.0)
+        mt = 1 - t
+        point = (mt**3 * p0 + 3 * mt**2 * t * p1 + 3 * mt * t**2 * p2 + t**3 * p3)
+        candidates.append(np.where(inside, point, p0))  # Outside roots fall back to an endpoint
+    stacked = np.stack(candidates)
+    return np.concatenate([stacked.min(axis=0), stacked.max(axis=0)], axis=1)
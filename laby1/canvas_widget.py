@@ -1,33 +1,107 @@
 import sys
 import math
+import time
+from collections import deque
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QPushButton, QVBoxLayout,
     QHBoxLayout, QLabel, QMessageBox, QRadioButton, QButtonGroup,
     QInputDialog
 )
-from PyQt5.QtGui import QPainter, QPen, QColor, QBrush, QMouseEvent
-from PyQt5.QtCore import Qt, QPoint, pyqtSignal
+from PyQt5.QtGui import (
+    QPainter, QPen, QColor, QBrush, QFont, QMouseEvent, QPixmap, QPolygon, QCursor, QTransform
+)
+from PyQt5.QtCore import Qt, QPoint, QPointF, QRect, QRectF, QTimer, pyqtSignal
 import numpy as np
 
 from helper_classes import Polygon, Constraint, BezierSegment, Vertex
+from painter_utils import LabelCache, array_to_polygonf, cosmetic_pen
+from rasterizer import Framebuffer, bresenham_line
+from geometry import point_in_polygon, point_segment_distances
+from simplify import DP_FLOOR, douglas_peucker_importance, thin_points
+from constraint_solver import ConstraintSolver
+from profiler import Profiler, log
+from scene import Scene
+from history import History, MovePoints, Translate
+import continuity
+from bezier_math import (
+    bernstein_row, evaluate_bezier, flatten_bezier, flatten_beziers
+)
+
+EDGE_PENS = [cosmetic_pen(Qt.black, 2), cosmetic_pen(Qt.red, 2), cosmetic_pen(Qt.blue, 3)]  # indexed by edge style
+SKIPPED_EDGE = -2  # Edge style for edges left out of a pass
+LABEL_MARGIN = 120  # How far right of its anchor a label or handle can reach, in pixels
+LOD_MIN_VERTICES = 2000  # Level of detail only kicks in for polygons at least this big
+HANDLE_SPACING = 12  # Closest two vertex handles may be drawn in LOD mode, in pixels
+LABEL_SPACING = 40  # Same for V{i} labels
+DETAIL_RADIUS = 150  # Everything within this many pixels of the cursor or selection is drawn in full
+CULL_FRACTION = 0.5  # Draw only what intersects the view once less than this share of edges is in it
+ZOOM_STEP = 1.25  # Zoom factor per wheel notch
+FRAME_INTERVAL_MS = 16  # Drag steps are applied at most this often (about 60 Hz)
+PARTIAL_UPDATE_LIMIT = 256  # Moving more edges than this in one drag repaints everything
+OVERLAY_FONT = QFont("monospace", 9)  # Profiler overlay; fixed width keeps its columns aligned
+OVERLAY_FONT.setStyleHint(QFont.TypeWriter)
+SHAPE_DOT_SIZE = 3  # Inactive shapes smaller than this on screen, in pixels, are drawn as one dot
+SHAPE_OUTLINE_SIZE = 48  # and those smaller than this as a plain outline through fewer vertices
+
 
 class Canvas(QWidget):
-    edge_clicked = pyqtSignal(int, QPoint)  # New signal
-    vertex_clicked = pyqtSignal(int, QPoint)
+    """Editor view of a Scene of polygons.
+
+    One shape at a time is active: self.polygon, under self.shape_id. It is
+    the one selections, drags and edits apply to and it is drawn on top;
+    clicking another shape activates it. The scene's cached box of the
+    active shape may lag behind its edits until activate_shape() moves on
+    from it, which is why the active shape is always drawn and hit-tested
+    on its own.
+    """
+    edge_clicked = pyqtSignal(int, int, QPoint)  # Shape id, edge index, click position
+    vertex_clicked = pyqtSignal(int, int, QPoint)  # Shape id, vertex index, click position
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.polygon = Polygon()
         self.init_predefined_scene()
+        self.scene = Scene()
+        self.shape_id = self.scene.add(self.polygon)  # Id of the active shape
         self.selected_vertex = None
         self.selected_control = None
         self.dragging = False
         self.dragging_control = False
         self.bresenham = False  # If True, use Bresenham's algorithm
+        self.framebuffer = None  # Software raster target for Bresenham mode
         self.adding_bezier = False
         self.current_bezier = None
         self.edge_threshold = 10  # Distance threshold for edge selection
         self.selected_edge_index = None
+        self.bezier_flattening = 'adaptive'  # 'adaptive' or 'fixed' (100 samples)
+        self.bezier_tolerance = 0.25  # Max distance of the polyline from the curve, in device pixels
+        self.bezier_sample_counts = {}  # key: edge index, value: samples used in the last paint
+        self.constraint_solver = ConstraintSolver(time_budget=0.004)
+        self.label_cache = LabelCache()  # Laid-out V{i}, constraint and B{i} labels
+        self.zoom = 1.0  # Widget pixels per scene unit
+        self.pan = QPointF(0, 0)  # Widget position of the scene origin
+        self.culling = True  # Only submit primitives that intersect the visible rectangle
+        self.panning = False
+        self.level_of_detail = True  # Simplify big outlines and thin out overlapping handles/labels
+        self.lod_tolerance = 0.5  # Max deviation of the simplified outline, in pixels
+        self.lod_cache = None  # (geometry key, *lod_levels()) of the last outline drawn
+        self.partial_updates = True  # Repaint only what a drag moved, over a cached static layer
+        self.static_layer = None  # QPixmap of the edges that are not moving, during a drag
+        self.dynamic_edges = set()  # Edges the current drag has moved, drawn on top of static_layer
+        self.dynamic_rect = QRect()  # Where the dynamic edges were last painted, in widget coordinates
+        self.frame_times = deque(maxlen=240)  # (seconds, repainted pixels) of recent paints
+        self.coalesce_moves = True  # Apply at most one drag step per frame, from the newest mouse position
+        self.pending_move = None  # Newest mouse position (widget coordinates) not applied yet
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setInterval(FRAME_INTERVAL_MS)
+        self.frame_timer.timeout.connect(self.apply_pending_move)
+        self.moves_received = 0  # Mouse move events seen while dragging
+        self.moves_applied = 0  # Drag steps actually applied to the model
+        self.profiler = Profiler()  # Phase timings; off until toggle_profiler()
+        self.show_profiler = False  # Draw the profiler overlay in the top-left corner
+        self.profiler_rect = QRect()  # Where the overlay was last drawn
+        self.history = History()  # Undo/redo entries of the edits to this scene
+        self.drag_offset = None  # Offset of the active shape when the current drag started
 
     def init_predefined_scene(self):
         # Initialize with a predefined polygon and constraints
@@ -47,119 +121,606 @@ class Canvas(QWidget):
             control1=control1,
             control2=control2
         )
-        self.polygon.bezier_segments[0] = bezier
+        self.polygon.add_bezier(0, bezier)
         
         # Add some constraints
-        self.polygon.constraints[1] = Constraint('horizontal')
+        self.polygon.constraints[1] = Constraint('vertical')
         self.polygon.constraints[2] = Constraint('length', 200)
         
         # Set some example continuity
         self.polygon.vertices[1].continuity = 'G1'  # Example continuity at vertex 1
 
     def paintEvent(self, event):
+        started = time.perf_counter()
+        profiler = self.profiler
+        profiler.begin_frame()
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
-
-        # Draw polygon edges
-        edges = self.polygon.get_edges()
-        for i, (start, end) in enumerate(edges):
-            pen = QPen(Qt.black, 2)
-            if i in self.polygon.constraints:
-                pen.setColor(Qt.red)
-            if i == self.selected_edge_index:
-                pen.setColor(Qt.blue)
-                pen.setWidth(3)
-            painter.setPen(pen)
-
-            # Draw the edge (either as Bezier or straight line)
-            if i in self.polygon.bezier_segments:
-                bezier = self.polygon.bezier_segments[i]
-                self.draw_bezier(painter, bezier)
+        self.label_cache.set_font(painter.font())
+        self.bezier_sample_counts = {}
+        if self.static_layer is not None and self.static_layer.size() == self.size():
+            self.paint_damaged(painter, event.rect())
+        else:
+            with profiler.phase('culling'):
+                shapes = self.visible_shapes(event.rect())
+            with profiler.phase('shapes'):
+                self.draw_shapes(painter, shapes)
+            painter.setTransform(self.view_transform())
+            with profiler.phase('culling'):
+                vertices, edges = self.visible_items(event.rect())
+            if edges is None:
+                with profiler.phase('edges'):
+                    self.draw_edges(painter)
+                with profiler.phase('labels'):
+                    self.draw_constraint_labels(painter)
+                with profiler.phase('vertices'):
+                    handles, labels = self.visible_vertices()
+                    if handles is not None:
+                        self.draw_vertices(painter, handles, labels=False)
+                    self.draw_vertices(painter, labels)
+                with profiler.phase('controls'):
+                    self.draw_controls(painter)
             else:
-                if self.bresenham:
-                    self.draw_bresenham(painter, start, end)
-                else:
-                    painter.drawLine(start, end)
+                with profiler.phase('edges'):
+                    self.draw_edge_list(painter, edges)
+                with profiler.phase('labels'):
+                    self.draw_constraint_labels(painter, edges)
+                with profiler.phase('vertices'):
+                    self.draw_vertices(painter, vertices)
+                with profiler.phase('controls'):
+                    self.draw_controls(painter, edges)
+        profiler.end_frame()
+        if self.show_profiler:
+            self.draw_profiler_overlay(painter)
+        painter.end()
+        rect = event.rect()
+        self.frame_times.append((time.perf_counter() - started, rect.width() * rect.height()))
 
-            # Draw constraint labels
-            if i in self.polygon.constraints:
-                constraint = self.polygon.constraints[i]
-                mid_x = (start.x() + end.x()) // 2
-                mid_y = (start.y() + end.y()) // 2
-                
-                # Draw constraint icon
-                painter.setBrush(QBrush(Qt.blue))
-                painter.setPen(Qt.NoPen)
-                painter.drawEllipse(QPoint(mid_x, mid_y), 5, 5)
-                
-                # Draw constraint text
-                painter.setPen(QPen(Qt.blue))
-                constraint_text = f"{constraint.type}"
-                if constraint.type == 'length':
-                    constraint_text += f"={constraint.value}"
-                painter.drawText(mid_x + 10, mid_y, constraint_text)
-
-        # Draw vertices with enhanced continuity information
-        for i, vertex in enumerate(self.polygon.vertices):
+    def paint_damaged(self, painter, rect):
+        """Repaint just `rect` while a drag is in progress.
+
+        Edges that are not moving come from the cached static layer; the
+        moving ones are drawn on top, followed by the labels, vertices and
+        handles near the rectangle, which always sit above edges.
+        """
+        profiler = self.profiler
+        painter.setClipRect(rect)
+        with profiler.phase('blit'):
+            painter.drawPixmap(rect, self.static_layer, rect)
+        painter.setTransform(self.view_transform())
+        with profiler.phase('edges'):
+            self.draw_edge_list(painter, sorted(self.dynamic_edges))
+        with profiler.phase('culling'):
+            vertices, edges = self.polygon.find_in_rect(*self.label_search_rect(rect))
+            edges = sorted(edges)
+        with profiler.phase('labels'):
+            self.draw_constraint_labels(painter, edges)
+        with profiler.phase('vertices'):
+            self.draw_vertices(painter, sorted(vertices))
+        with profiler.phase('controls'):
+            self.draw_controls(painter, edges)
+
+    def toggle_profiler(self, enabled):
+        """Start or stop timing phases, with the overlay showing FPS and the breakdown."""
+        self.profiler.enabled = enabled
+        self.show_profiler = enabled
+        self.profiler.reset()
+        self.update()
+
+    def draw_profiler_overlay(self, painter):
+        """FPS and mean/max time per phase over the recent frames, in the top-left corner."""
+        lines = self.profiler.report_lines()
+        painter.resetTransform()
+        painter.setClipping(False)
+        painter.setFont(OVERLAY_FONT)
+        self.label_cache.set_font(OVERLAY_FONT)
+        metrics = painter.fontMetrics()
+        line_height = metrics.height()
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 12
+        rect = QRect(8, 8, width, line_height * len(lines) + 8)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(0, 0, 0, 170))
+        painter.drawRect(rect)
+        painter.setPen(QPen(Qt.white))
+        for i, line in enumerate(lines):
+            self.label_cache.draw_at(painter, rect.left() + 6, rect.top() + 4 + i * line_height, line)
+        self.profiler_rect = rect
+
+    def scene_transform(self):
+        """Scene coordinates -> widget pixels: zoom and pan."""
+        transform = QTransform()
+        transform.translate(self.pan.x(), self.pan.y())
+        transform.scale(self.zoom, self.zoom)
+        return transform
+
+    def view_transform(self, polygon=None):
+        """Stored coordinates of a polygon (the active one by default) -> widget pixels: its offset, then zoom and pan."""
+        polygon = self.polygon if polygon is None else polygon
+        transform = self.scene_transform()
+        transform.translate(polygon.offset.x(), polygon.offset.y())
+        return transform
+
+    def to_local(self, widget_pos, polygon=None):
+        """Widget position -> a polygon's stored coordinates, rounded to whole units."""
+        point = self.view_transform(polygon).inverted()[0].map(QPointF(widget_pos))
+        return QPoint(round(point.x()), round(point.y()))
+
+    def to_scene(self, widget_pos):
+        return self.scene_transform().inverted()[0].map(QPointF(widget_pos))
+
+    def label_search_rect(self, rect, transform=None):
+        """Rectangle holding every vertex or edge whose labels or handles can reach widget `rect`.
+
+        In the active polygon's stored coordinates, or in those `transform`
+        maps to the widget. Labels are drawn to the right of and above their
+        anchors, so the search reaches further left and down.
+        """
+        transform = self.view_transform() if transform is None else transform
+        local = transform.inverted()[0].mapRect(QRectF(rect))
+        margin = LABEL_MARGIN / self.zoom
+        pad = 30 / self.zoom
+        return local.left() - margin, local.top() - pad, local.right() + pad, local.bottom() + pad
+
+    def visible_items(self, rect):
+        """(vertex indices, edge indices) near widget `rect`, or (None, None) to draw everything.
+
+        Culling only pays off when most of the polygon is off screen, so the
+        grid's cheap count decides first whether to collect the items at all.
+        """
+        n = len(self.polygon.vertices)
+        if not self.culling or n == 0:
+            return None, None
+        search = self.label_search_rect(rect)
+        if self.polygon.count_in_rect(*search) >= CULL_FRACTION * n:
+            return None, None
+        vertices, edges = self.polygon.find_in_rect(*search)
+        return sorted(vertices), sorted(edges)
+
+    def visible_shapes(self, rect):
+        """Ids of the shapes other than the active one that can reach widget `rect`, in drawing order."""
+        if len(self.scene) == 1:
+            return []
+        shapes = self.scene.find_in_rect(*self.label_search_rect(rect, self.scene_transform()))
+        return [shape_id for shape_id in shapes if shape_id != self.shape_id]
+
+    def set_polygon(self, polygon):
+        """Show just this polygon, dropping the current scene."""
+        self.set_scene(Scene([polygon]))
+
+    def set_scene(self, scene):
+        """Show another scene, its first shape active, dropping the selection, drag state and caches."""
+        self.frame_timer.stop()
+        self.pending_move = None
+        self.dragging = False
+        self.dragging_control = False
+        self.panning = False
+        self.static_layer = None
+        self.dynamic_edges = set()
+        self.polygon.moved_from = None
+        self.drag_offset = None
+        self.history.clear()
+        self.scene = scene
+        self.shape_id = None
+        self.activate_shape(next(iter(scene)))
+        self.fit_to_content()
+
+    def activate_shape(self, shape_id):
+        """Make another shape the one being edited, refreshing the cached box of the one left."""
+        if shape_id == self.shape_id:
+            return
+        if self.shape_id in self.scene:
+            self.scene.update_bounds(self.shape_id)
+        self.shape_id = shape_id
+        self.polygon = self.scene[shape_id]
+        self.constraint_solver = ConstraintSolver(time_budget=self.constraint_solver.time_budget)
+        self.selected_vertex = None
+        self.selected_control = None
+        self.selected_edge_index = None
+        self.lod_cache = None
+        self.update()
+
+    def add_shape(self, polygon):
+        """Add a polygon to the scene and make it the active shape; returns its id."""
+        shape_id = self.scene.add(polygon)
+        self.activate_shape(shape_id)
+        return shape_id
+
+    def fit_to_content(self, margin=40):
+        """Zoom and pan so every shape, control points included, fills the widget."""
+        self.scene.update_bounds(self.shape_id)
+        bounds = self.scene.bounds()
+        if bounds is None:
+            return
+        min_x, min_y, max_x, max_y = bounds
+        width = max(max_x - min_x, 1)
+        height = max(max_y - min_y, 1)
+        self.zoom = max(min((self.width() - 2 * margin) / width,
+                            (self.height() - 2 * margin) / height), 1e-6)
+        center_x = (min_x + max_x) / 2
+        center_y = (min_y + max_y) / 2
+        self.pan = QPointF(self.width() / 2 - center_x * self.zoom,
+                           self.height() / 2 - center_y * self.zoom)
+        self.update()
+
+    def zoom_at(self, widget_pos, factor):
+        """Zoom by `factor` keeping the scene point under `widget_pos` in place."""
+        anchor = QPointF(widget_pos)
+        scene = (anchor - self.pan) / self.zoom
+        self.zoom *= factor
+        self.pan = anchor - scene * self.zoom
+        self.update()
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.zoom_at(event.pos(), ZOOM_STEP ** steps)
+
+    def widget_pixels(self, painter, points):
+        """Local (..., 2) points -> whole widget pixels through the painter's zoom and translation."""
+        transform = painter.transform()
+        scale = np.array([transform.m11(), transform.m22()])
+        shift = np.array([transform.dx(), transform.dy()])
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return np.rint(points * scale + shift).astype(np.int64)
+
+    def draw_constraint_labels(self, painter, edges=None, polygon=None):
+        """Icon and text of every constraint, or only of those on the given edges.
+
+        Like vertex and control handles, they are drawn at a fixed size in
+        pixels: anchors are mapped through the painter's transform, which
+        is then reset.
+        """
+        polygon = self.polygon if polygon is None else polygon
+        vertices = polygon.vertices
+        n = len(vertices)
+        constraints = polygon.constraints
+        if edges is not None:
+            constraints = {i: constraints[i] for i in edges if i in constraints}
+        constraints = list(constraints.items())
+        ends = [(vertices[i].point, vertices[(i + 1) % n].point) for i, _ in constraints]
+        mids = self.widget_pixels(painter, [((a.x() + b.x()) / 2, (a.y() + b.y()) / 2) for a, b in ends])
+        painter.save()
+        painter.resetTransform()  # Icons and text keep their size in pixels at any zoom
+        for (i, constraint), (mid_x, mid_y) in zip(constraints, mids.tolist()):
+            # Draw constraint icon
+            painter.setBrush(QBrush(Qt.blue))
+            painter.setPen(Qt.NoPen)
+            painter.drawEllipse(mid_x - 5, mid_y - 5, 10, 10)
+
+            # Draw constraint text
+            painter.setPen(QPen(Qt.blue))
+            constraint_text = f"{constraint.type}"
+            if constraint.type == 'length':
+                constraint_text += f"={constraint.value}"
+            self.label_cache.draw(painter, mid_x + 10, mid_y, constraint_text)
+        painter.restore()
+
+    def draw_vertices(self, painter, indices=None, labels=True, polygon=None):
+        """Vertices with enhanced continuity information; all of them, or only the given indices."""
+        vertices = (self.polygon if polygon is None else polygon).vertices
+        if indices is None:
+            indices = range(len(vertices))
+        shown = [vertices[i] for i in indices]
+        points = self.widget_pixels(painter, [(v.point.x(), v.point.y()) for v in shown])
+        painter.save()
+        painter.resetTransform()  # Handles and labels keep their size in pixels at any zoom
+        for i, vertex, (x, y) in zip(indices, shown, points.tolist()):
             # Draw vertex circle
             painter.setBrush(QBrush(Qt.green))
             painter.setPen(QPen(Qt.black, 1))
-            painter.drawEllipse(vertex.point, 5, 5)
-            
+            painter.drawEllipse(x - 5, y - 5, 10, 10)
+            if not labels:
+                continue
+
             # Draw vertex index and continuity information
             if vertex.continuity != 'G0':
                 # Draw background for better readability
                 text = f"V{i}({vertex.continuity})"
                 painter.setPen(QPen(Qt.white))
                 painter.setBrush(QBrush(Qt.darkGreen))
-                text_rect = painter.boundingRect(
-                    vertex.point.x() - 15,
-                    vertex.point.y() - 25,
-                    50, 20,
-                    Qt.AlignLeft,
-                    text
-                )
+                text_rect = self.label_cache.bounding_rect(x - 15, y - 25, text)
                 text_rect.adjust(-2, -2, 2, 2)
                 painter.drawRect(text_rect)
                 
                 # Draw text
                 painter.setPen(QPen(Qt.white))
-                painter.drawText(
-                    vertex.point.x() - 15,
-                    vertex.point.y() - 25,
-                    50, 20,
-                    Qt.AlignLeft,
-                    text
-                )
+                self.label_cache.draw_at(painter, x - 15, y - 25, text)
             else:
                 # Just draw vertex index for G0 vertices
                 painter.setPen(QPen(Qt.black))
-                painter.drawText(
-                    vertex.point.x() - 15,
-                    vertex.point.y() - 10,
-                    f"V{i}"
-                )
-
-        # Draw control points for Bezier curves
-        for edge_idx, bezier in self.polygon.bezier_segments.items():
+                self.label_cache.draw(painter, x - 15, y - 10, f"V{i}")
+        painter.restore()
+
+    def draw_controls(self, painter, edges=None, polygon=None):
+        """Control points, handle lines and labels of every Bezier curve, or only of the given edges."""
+        polygon = self.polygon if polygon is None else polygon
+        beziers = polygon.bezier_segments
+        if edges is not None:
+            beziers = {i: beziers[i] for i in edges if i in beziers}
+        beziers = list(beziers.items())
+        tolerance = self.curve_tolerance()
+        # Start, control1, control2, end and label anchor of each curve
+        anchors = self.widget_pixels(painter, [
+            polygon.bezier_key(bezier) + polygon.flattened_bezier(bezier, tolerance).label_pos
+            for _, bezier in beziers])
+        painter.save()
+        painter.resetTransform()  # Handles and labels keep their size in pixels at any zoom
+        for (edge_idx, _), (start, control1, control2, end, label) in zip(
+                beziers, anchors.reshape(-1, 5, 2).tolist()):
             painter.setBrush(QBrush(Qt.blue))
             painter.setPen(QPen(Qt.black, 1))
             
             # Draw control points
-            painter.drawEllipse(bezier.control1, 3, 3)
-            painter.drawEllipse(bezier.control2, 3, 3)
+            painter.drawEllipse(control1[0] - 3, control1[1] - 3, 6, 6)
+            painter.drawEllipse(control2[0] - 3, control2[1] - 3, 6, 6)
             
             # Draw control lines
-            start_vertex = self.polygon.vertices[bezier.start_vertex].point
-            end_vertex = self.polygon.vertices[bezier.end_vertex].point
             painter.setPen(QPen(Qt.gray, 1, Qt.DashLine))
-            painter.drawLine(start_vertex, bezier.control1)
-            painter.drawLine(end_vertex, bezier.control2)
+            painter.drawLine(*start, *control1)
+            painter.drawLine(*end, *control2)
             
             # Draw Bezier curve index
-            mid_point = self.calculate_bezier_point(bezier, 0.5)
             painter.setPen(QPen(Qt.darkMagenta))
-            painter.drawText(mid_point[0], mid_point[1], f"B{edge_idx}")
+            self.label_cache.draw(painter, label[0], label[1], f"B{edge_idx}")
+        painter.restore()
+
+    def edge_styles(self, polygon=None):
+        """Pen style per edge: 0 plain, 1 constrained, 2 selected, -1 Bezier (drawn with its own pen).
+
+        Only the active polygon has a selected edge.
+        """
+        polygon = self.polygon if polygon is None else polygon
+        styles = np.zeros(len(polygon.vertices), dtype=np.int8)
+        if polygon.constraints:
+            styles[list(polygon.constraints)] = 1
+        selected = self.selected_edge_index
+        if polygon is self.polygon and selected is not None and selected < len(styles):
+            styles[selected] = 2
+        if polygon.bezier_segments:
+            styles[list(polygon.bezier_segments)] = -1
+        return styles
+
+    def draw_edges(self, painter, skip=()):
+        """Draw all edges but `skip`, submitting each run of straight edges with the same pen as one polyline."""
+        n = len(self.polygon.vertices)
+        if n == 0:
+            return
+        styles = self.edge_styles()
+        styles[list(skip)] = SKIPPED_EDGE
+        ring = self.polygon.coordinates()
+        breaks = np.flatnonzero(np.diff(styles)) + 1
+        # Vertices inside runs of plain edges that the simplified outline can do without
+        keep = self.outline_detail(ring, breaks)
+        starts, ends = self.draw_edge_runs(painter, self.polygon, ring, styles, breaks, keep)
+        if self.bresenham:
+            self.draw_bresenham_edges(painter, starts, ends)
+
+    def draw_edge_runs(self, painter, polygon, ring, styles, breaks, keep):
+        """Draw the edges of `polygon` run by run; `breaks` are where `styles` change.
+
+        Plain edges only go through the vertices in `keep`. In Bresenham
+        mode the straight edges are returned as (starts, ends) int arrays for
+        the caller to rasterize instead.
+        """
+        n = len(ring)
+        ring = np.vstack([ring, ring[:1]])  # edge i runs from ring[i] to ring[i + 1]
+        keep = np.append(keep, True)
+        for run_start, run_end in zip(np.r_[0, breaks].tolist(), np.r_[breaks, n].tolist()):
+            style = styles[run_start]
+            if style == SKIPPED_EDGE:
+                continue
+            if style < 0:
+                with self.profiler.phase('beziers'):
+                    for i in range(run_start, run_end):
+                        self.draw_bezier(painter, polygon.bezier_segments[i], polygon)
+            elif not self.bresenham:
+                points = ring[run_start:run_end + 1]
+                if style == 0:
+                    points = points[keep[run_start:run_end + 1]]
+                painter.setPen(EDGE_PENS[style])
+                painter.drawPolyline(array_to_polygonf(points))
+        if not self.bresenham:
+            return None, None
+        ring = ring.astype(np.int64)
+        # Plain edges go from each kept vertex to the next; the others are drawn one by one
+        kept = np.flatnonzero(keep)
+        plain = kept[:-1][styles[kept[:-1]] == 0]
+        following = kept[1:][styles[kept[:-1]] == 0]
+        other = np.flatnonzero(styles > 0)
+        starts = np.concatenate([plain, other])
+        ends = np.concatenate([following, other + 1])
+        return ring[starts], ring[ends]
+
+    def draw_shapes(self, painter, shape_ids):
+        """Draw shapes other than the active one, with as much detail as their size on screen allows.
+
+        Shapes smaller than SHAPE_DOT_SIZE pixels become a dot. Up to
+        SHAPE_OUTLINE_SIZE they are a plain polyline about two pixels per
+        segment, curves cut short to chords. Bigger shapes whose handles
+        would crowd closer than HANDLE_SPACING get their real outline, and
+        the rest are drawn in full, like the active polygon. In Bresenham
+        mode the straight edges of all of them are rasterized in one pass at
+        the end.
+        """
+        scene = self.scene
+        zoom = self.zoom
+        dots = []
+        outlines = []  # Scene coordinates of the simplified outlines
+        lines = []  # (starts, ends) in widget pixels, for Bresenham mode
+        for shape_id in shape_ids:
+            min_x, min_y, max_x, max_y = scene.boxes[shape_id]
+            width, height = (max_x - min_x) * zoom, (max_y - min_y) * zoom
+            if max(width, height) < SHAPE_DOT_SIZE:
+                dots.append(((min_x + max_x) / 2, (min_y + max_y) / 2))
+                continue
+            polygon = scene[shape_id]
+            ring = scene.outlines[shape_id]
+            if max(width, height) < SHAPE_OUTLINE_SIZE:
+                step = max(1, len(ring) // max(int(width + height), 3))
+                offset = (polygon.offset.x(), polygon.offset.y())
+                outlines.append(np.vstack([ring[::step], ring[:1]]) + offset)
+                continue
+            transform = self.view_transform(polygon)
+            painter.setTransform(transform)
+            styles = self.edge_styles(polygon)
+            breaks = np.flatnonzero(np.diff(styles)) + 1
+            starts, ends = self.draw_edge_runs(painter, polygon, ring, styles, breaks,
+                                               np.ones(len(ring), dtype=bool))
+            if starts is not None:
+                shift = np.array([transform.dx(), transform.dy()])
+                lines.append((starts * zoom + shift, ends * zoom + shift))
+            if len(ring) < LOD_MIN_VERTICES and 2 * (width + height) >= HANDLE_SPACING * len(ring):
+                self.draw_constraint_labels(painter, polygon=polygon)
+                self.draw_vertices(painter, polygon=polygon)
+                self.draw_controls(painter, polygon=polygon)
+        painter.setTransform(self.scene_transform())
+        if dots:
+            painter.setPen(cosmetic_pen(Qt.black))
+            painter.drawPoints(array_to_polygonf(np.array(dots)))
+        if outlines and not self.bresenham:
+            painter.setPen(EDGE_PENS[0])
+            for points in outlines:
+                painter.drawPolyline(array_to_polygonf(points))
+        elif outlines:
+            shift = np.array([self.pan.x(), self.pan.y()])
+            lines += [(points[:-1] * zoom + shift, points[1:] * zoom + shift) for points in outlines]
+        if lines:
+            painter.resetTransform()
+            self.draw_bresenham_edges(painter, np.concatenate([a for a, _ in lines]),
+                                      np.concatenate([b for _, b in lines]))
+
+    def lod_active(self):
+        return self.level_of_detail and len(self.polygon.vertices) >= LOD_MIN_VERTICES
+
+    def detail_points(self):
+        """Local points around which everything is drawn in full: the cursor and the selection."""
+        polygon = self.polygon
+        n = len(polygon.vertices)
+        points = [self.to_local(self.mapFromGlobal(QCursor.pos()))]
+        if isinstance(self.selected_vertex, int) and self.selected_vertex < n:
+            points.append(polygon.vertices[self.selected_vertex].point)
+        if self.selected_edge_index is not None and self.selected_edge_index < n:
+            points.append(polygon.vertices[self.selected_edge_index].point)
+            points.append(polygon.vertices[(self.selected_edge_index + 1) % n].point)
+        return np.array([(p.x(), p.y()) for p in points], dtype=float)
+
+    def near_detail(self, coords):
+        near = np.zeros(len(coords), dtype=bool)
+        for x, y in self.detail_points():
+            near |= np.hypot(coords[:, 0] - x, coords[:, 1] - y) <= DETAIL_RADIUS / self.zoom
+        return near
+
+    def outline_detail(self, coords, breaks):
+        """Mask of the vertices the outline needs at the current screen-space tolerance.
+
+        Uses the polygon's Douglas-Peucker hierarchy, computed once per
+        geometry, and always keeps vertices where the edge style changes and
+        those near the cursor or selection. During a drag the hierarchy is
+        the one from before it, so the vertices the drag moved are kept too.
+        """
+        if not self.lod_active():
+            return np.ones(len(coords), dtype=bool)
+        importance, _, _ = self.lod_levels(coords)
+        tolerance = self.lod_tolerance / self.zoom
+        keep = importance >= tolerance
+        if tolerance < DP_FLOOR:
+            keep |= importance == 0  # Runs the hierarchy left unsplit deviate by up to DP_FLOOR
+        keep[breaks] = True
+        keep[0] = True
+        keep |= self.near_detail(coords)
+        moved = self.polygon.moved_from
+        if moved:
+            keep[[key for key in moved if not isinstance(key, tuple)]] = True
+        return keep
+
+    def lod_levels(self, coords):
+        """(Douglas-Peucker importance, thinned handle mask, thinned label mask), cached per geometry.
+
+        While a drag is under way (the polygon's moved_from log is open) the
+        importance of the geometry from before it is reused rather than
+        rebuilt every frame; the first paint after the drag rebuilds it.
+        """
+        if (self.polygon.moved_from is not None and self.lod_cache is not None
+                and self.lod_cache[0][0] == len(coords)):
+            key = self.lod_cache[0][:2] + (self.zoom,)
+        else:
+            key = (len(coords), hash(coords.tobytes()), self.zoom)
+        if self.lod_cache is None or self.lod_cache[0] != key:
+            handles = np.zeros(len(coords), dtype=bool)
+            handles[thin_points(coords, HANDLE_SPACING / self.zoom)] = True
+            labels = np.zeros(len(coords), dtype=bool)
+            labels[thin_points(coords, LABEL_SPACING / self.zoom)] = True
+            importance = None
+            if self.lod_cache is not None and self.lod_cache[0][:2] == key[:2]:
+                importance = self.lod_cache[1]  # Same geometry, new zoom: only the thinning changes
+            if importance is None:
+                importance = douglas_peucker_importance(coords)
+            self.lod_cache = (key, importance, handles, labels)
+        return self.lod_cache[1:]
+
+    def visible_vertices(self):
+        """(indices drawn as bare handles, indices drawn with labels); (None, None) for all of them.
+
+        In LOD mode, handles closer than HANDLE_SPACING and labels closer
+        than LABEL_SPACING are thinned out to one per grid cell of that size,
+        except near the cursor and selection.
+        """
+        if not self.lod_active():
+            return None, None
+        coords = self.polygon.coordinates()
+        _, handles, labels = self.lod_levels(coords)
+        labels = labels | self.near_detail(coords)
+        handles = handles & ~labels
+        return np.flatnonzero(handles).tolist(), np.flatnonzero(labels).tolist()
+
+    def draw_edge_list(self, painter, edges):
+        """Draw just the given edges, one call each; for the few edges that move during a drag."""
+        polygon = self.polygon
+        n = len(polygon.vertices)
+        straight = []
+        with self.profiler.phase('beziers'):
+            for i in edges:
+                bezier = polygon.bezier_segments.get(i)
+                if bezier is not None:
+                    self.draw_bezier(painter, bezier)
+                else:
+                    straight.append(i)
+        if not straight:
+            return
+        if self.bresenham:
+            points = [(polygon.vertices[i].point, polygon.vertices[(i + 1) % n].point) for i in straight]
+            starts = np.array([(a.x(), a.y()) for a, _ in points], dtype=np.int64)
+            ends = np.array([(b.x(), b.y()) for _, b in points], dtype=np.int64)
+            self.draw_bresenham_edges(painter, starts, ends)
+            return
+        # Consecutive edges with the same pen go out as one polyline, joined as draw_edges joins them
+        runs = []
+        for i in straight:
+            style = 2 if i == self.selected_edge_index else 1 if i in polygon.constraints else 0
+            if runs and runs[-1][0] == style and runs[-1][1][-1] == i - 1:
+                runs[-1][1].append(i)
+            else:
+                runs.append((style, [i]))
+        for style, run in runs:
+            ring = [polygon.vertices[i].point for i in run] + [polygon.vertices[(run[-1] + 1) % n].point]
+            painter.setPen(EDGE_PENS[style])
+            painter.drawPolyline(QPolygon(ring))
+
+    def draw_bresenham_edges(self, painter, starts, ends):
+        """Rasterize straight edges into the NumPy framebuffer and blit it with one drawImage."""
+        # The framebuffer is in widget pixels, so map the edges through the painter's zoom and translation
+        starts = self.widget_pixels(painter, starts)
+        ends = self.widget_pixels(painter, ends)
+        if (self.framebuffer is None or self.framebuffer.width != self.width()
+                or self.framebuffer.height != self.height()):
+            self.framebuffer = Framebuffer(self.width(), self.height())
+        else:
+            self.framebuffer.clear()
+        self.framebuffer.draw_lines(starts, ends)
+        painter.save()
+        painter.resetTransform()
+        painter.drawImage(0, 0, self.framebuffer.image)
+        painter.restore()
 
     def draw_bresenham(self, painter, start, end):
         # Implement Bresenham's line algorithm
@@ -173,207 +734,335 @@ class Canvas(QWidget):
 
     def bresenham_line(self, x0, y0, x1, y1):
         """Generate points on a line using Bresenham's algorithm."""
-        points = []
-        dx = abs(x1 - x0)
-        dy = abs(y1 - y0)
-        x, y = x0, y0
-        sx = -1 if x0 > x1 else 1
-        sy = -1 if y0 > y1 else 1
-        if dy <= dx:
-            err = dx / 2.0
-            while x != x1:
-                points.append((x, y))
-                err -= dy
-                if err < 0:
-                    y += sy
-                    err += dx
-                x += sx
+        return bresenham_line(x0, y0, x1, y1)
+
+    def draw_bezier(self, painter, bezier, polygon=None):
+        # Flatten the curve in one vectorised pass: adaptively to the zoom, or at 100 fixed samples
+        painter.setPen(cosmetic_pen(Qt.darkMagenta, 2, Qt.DashLine))
+        polygon = self.polygon if polygon is None else polygon
+        if self.bezier_flattening == 'adaptive':
+            points = polygon.flattened_bezier(bezier, self.curve_tolerance()).points
         else:
-            err = dy / 2.0
-            while y != y1:
-                points.append((x, y))
-                err -= dx
-                if err < 0:
-                    x += sx
-                    err += dy
-                y += sy
-        points.append((x1, y1))
-        return points
-
-    def draw_bezier(self, painter, bezier):
-        # Draw the Bezier curve incrementally
-        pen = QPen(Qt.darkMagenta, 2, Qt.DashLine)
-        painter.setPen(pen)
-        points = self.calculate_bezier_points(bezier, steps=100)
-        for i in range(len(points) - 1):
-            painter.drawLine(QPoint(*points[i]), QPoint(*points[i+1]))
+            points = evaluate_bezier(polygon.bezier_control_points(bezier), 100).astype(int).astype(float)
+        if polygon is self.polygon:
+            self.bezier_sample_counts[bezier.start_vertex] = len(points)
+        # One polyline per curve, built straight from the sample array
+        painter.drawPolyline(array_to_polygonf(points))
+
+    def curve_tolerance(self):
+        """bezier_tolerance, which is in pixels, as a distance in scene units at the current zoom."""
+        return self.bezier_tolerance / self.zoom
 
     def calculate_bezier_points(self, bezier, steps=100):
-        # Retrieve the actual QPoint objects from the polygon's vertices using indices
-        start_vertex = self.polygon.vertices[bezier.start_vertex].point
-        end_vertex = self.polygon.vertices[bezier.end_vertex].point
-
-        P0 = np.array([start_vertex.x(), start_vertex.y()])
-        P1 = np.array([bezier.control1.x(), bezier.control1.y()])
-        P2 = np.array([bezier.control2.x(), bezier.control2.y()])
-        P3 = np.array([end_vertex.x(), end_vertex.y()])
-        
-        points = []
-        for t in np.linspace(0, 1, steps):
-            point = (1-t)**3 * P0 + 3*(1-t)**2 * t * P1 + 3*(1-t)*t**2 * P2 + t**3 * P3
-            points.append(tuple(point.astype(int)))
-        return points
+        # One matmul against the cached Bernstein basis instead of a per-t loop
+        points = evaluate_bezier(self.polygon.bezier_control_points(bezier), steps)
+        return [tuple(point) for point in points.astype(int).tolist()]
+
+    def calculate_all_bezier_points(self, steps=100):
+        """Evaluate every Bezier segment of the polygon at once -> (edge indices, (n, steps, 2) array)."""
+        edge_indices, control_points = self.polygon.all_bezier_control_points()
+        return edge_indices, evaluate_bezier(control_points, steps)
+
+    def flatten_bezier_points(self, bezier, tolerance=None):
+        """Sample the curve just densely enough to stay within the flatness tolerance."""
+        tolerance = tolerance or self.curve_tolerance()
+        points = flatten_bezier(self.polygon.bezier_control_points(bezier), tolerance)
+        return [tuple(point) for point in points.astype(int).tolist()]
+
+    def flatten_all_bezier_points(self, tolerance=None):
+        """Adaptively flatten every Bezier segment -> (edge indices, sample counts, list of (k, 2) arrays)."""
+        tolerance = tolerance or self.curve_tolerance()
+        edge_indices, control_points = self.polygon.all_bezier_control_points()
+        if not edge_indices:
+            return edge_indices, np.zeros(0, dtype=int), []
+        counts, points = flatten_beziers(control_points, tolerance)
+        return edge_indices, counts, np.split(points, np.cumsum(counts)[:-1])
 
     def calculate_bezier_point(self, bezier, t):
         """Calculate a single point on the Bezier curve at parameter t."""
-        start_vertex = self.polygon.vertices[bezier.start_vertex].point
-        end_vertex = self.polygon.vertices[bezier.end_vertex].point
-        
-        P0 = np.array([start_vertex.x(), start_vertex.y()])
-        P1 = np.array([bezier.control1.x(), bezier.control1.y()])
-        P2 = np.array([bezier.control2.x(), bezier.control2.y()])
-        P3 = np.array([end_vertex.x(), end_vertex.y()])
-        
-        point = (1-t)**3 * P0 + 3*(1-t)**2 * t * P1 + 3*(1-t)*t**2 * P2 + t**3 * P3
-        return tuple(point.astype(int))
+        point = bernstein_row(t) @ self.polygon.bezier_control_points(bezier)
+        return tuple(point[0].astype(int).tolist())
+
+    def begin_drag_updates(self):
+        """Start tracking what a vertex or control drag moves, so frames only repaint that."""
+        if not self.partial_updates:
+            return
+        self.polygon.touched_edges = set()
+        self.dynamic_edges = set()
+        self.static_layer = None
+
+    def end_drag_updates(self):
+        self.polygon.touched_edges = None
+        self.dynamic_edges = set()
+        self.static_layer = None
+        self.update()
+
+    def update_dragged(self):
+        """Schedule a repaint of only what the last drag event moved."""
+        touched = self.polygon.touched_edges
+        if touched is None:
+            self.update()
+            return
+        self.polygon.touched_edges = set()
+        if self.static_layer is not None and touched <= self.dynamic_edges:
+            rect = self.edges_rect(self.dynamic_edges)
+            self.update(rect.united(self.dynamic_rect))
+            self.dynamic_rect = rect
+            if self.show_profiler:
+                self.update(self.profiler_rect)
+            return
+        # The drag reached edges baked into the static layer: re-render it without them
+        self.dynamic_edges |= touched
+        if len(self.dynamic_edges) > PARTIAL_UPDATE_LIMIT:
+            self.end_drag_updates()
+            return
+        self.render_static_layer()
+        self.dynamic_rect = self.edges_rect(self.dynamic_edges)
+        self.update()
+
+    def render_static_layer(self):
+        pixmap = QPixmap(self.size())
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        with self.profiler.phase('static layer'):
+            self.draw_shapes(painter, self.visible_shapes(self.rect()))
+            painter.setTransform(self.view_transform())
+            self.draw_edges(painter, skip=self.dynamic_edges)
+        painter.end()
+        self.static_layer = pixmap
+
+    def edges_rect(self, edges):
+        """Widget rectangle covering the given edges with their curves, handles and labels."""
+        polygon = self.polygon
+        n = len(polygon.vertices)
+        points = []
+        for i in edges:
+            points += [polygon.vertices[i].point, polygon.vertices[(i + 1) % n].point]
+            bezier = polygon.bezier_segments.get(i)
+            if bezier is not None:
+                points += [bezier.control1, bezier.control2]
+        xs = [p.x() for p in points]
+        ys = [p.y() for p in points]
+        rect = self.view_transform().mapRect(QRectF(QPointF(min(xs), min(ys)), QPointF(max(xs), max(ys))))
+        return rect.toAlignedRect().adjusted(-30, -30, LABEL_MARGIN, 30)
+
+    def frame_time_report(self):
+        """One-line summary of the recent paints: count, mean/max time and share of the widget repainted."""
+        if not self.frame_times:
+            return "no frames"
+        times = np.array([t for t, _ in self.frame_times])
+        area = np.mean([a for _, a in self.frame_times]) / max(self.width() * self.height(), 1)
+        return (f"{len(times)} frames, mean {times.mean() * 1e3:.2f} ms, "
+                f"max {times.max() * 1e3:.2f} ms, {area:.1%} of the widget repainted")
 
     def mousePressEvent(self, event: QMouseEvent):
 
-        pos = event.pos()
+        if event.button() in (Qt.MiddleButton, Qt.RightButton):
+            # Pan the view
+            self.panning = True
+            self.last_mouse_pos = QPointF(event.pos())
+            return
         if event.button() == Qt.LeftButton:
             flag = False
-            clicked_edge = self.get_clicked_edge(pos)
-            clicked_vertex = self.get_clicked_vertex(pos)
-
-            print(f"Clicked edge: {clicked_edge}")
-            print(f"Clicked vertex: {clicked_vertex}")
+            with self.profiler.phase('hit test'):
+                shape_id, clicked_edge, clicked_vertex = self.hit_test(event.pos())
+            log.debug("Clicked shape: %s, edge: %s, vertex: %s", shape_id, clicked_edge, clicked_vertex)
+            self.activate_shape(shape_id)
+            pos = self.to_local(event.pos())
 
             if clicked_vertex is not None:
-                print(f"Clicked vertex: {clicked_vertex}")
-                self.vertex_clicked.emit(clicked_vertex, pos)
+                self.vertex_clicked.emit(shape_id, clicked_vertex, pos)
                 self.selected_vertex = clicked_vertex
                 self.dragging = True
+                self.begin_drag_updates()
                 flag = True
             if clicked_edge is not None:
-                print(f"Clicked edge: {clicked_edge}")
                 # Emit signal with edge index and click position
-                self.edge_clicked.emit(clicked_edge, pos)
+                self.edge_clicked.emit(shape_id, clicked_edge, pos)
                 flag = True
             
-            # Check if a control point is clicked
-            for bezier in self.polygon.bezier_segments.values():
-                if self.distance(pos, bezier.control1) < 5:
-                    self.selected_control = ('control1', bezier)
-                    self.dragging_control = True
-                    flag = True
-                elif self.distance(pos, bezier.control2) < 5:
-                    self.selected_control = ('control2', bezier)
-                    self.dragging_control = True
-                    flag = True
-            # Else, start dragging the whole polygon
+            # Check if a control point is clicked; after the signals, which may have edited the polygon
+            with self.profiler.phase('hit test'):
+                control = self.polygon.find_control(pos.x(), pos.y(), 5 / self.zoom)
+            if control is not None:
+                self.selected_control = control
+                self.dragging_control = True
+                self.begin_drag_updates()
+                flag = True
+            self.begin_drag_record()  # Whatever the drag moves becomes one history entry on release
+            # Else, start dragging the whole active shape
 
             if flag:
                 return 
             self.selected_vertex = 'polygon'
             self.dragging = True
-            self.last_mouse_pos = pos
+            self.last_mouse_pos = QPointF(event.pos())
 
     def mouseMoveEvent(self, event: QMouseEvent):
-        pos = event.pos()
-        if self.dragging and self.selected_vertex != 'polygon':
-            index = self.selected_vertex
-            # Apply constraints if any
-            if index in self.polygon.constraints:
-                constraint = self.polygon.constraints[index]
-                if constraint.type == 'horizontal':
-                    self.polygon.vertices[index].point.setY(pos.y())
-                elif constraint.type == 'vertical':
-                    self.polygon.vertices[index].point.setX(pos.x())
-                elif constraint.type == 'length':
-                    # For simplicity, skip implementing length constraint during drag
-                    self.polygon.vertices[index].point = pos
-                else:
-                    self.polygon.vertices[index].point = pos
-            else:
-                self.polygon.vertices[index].point = pos
+        if not (self.dragging or self.dragging_control or self.panning):
+            return
+        self.moves_received += 1
+        if not self.coalesce_moves:
+            self.apply_move(event.pos())
+            return
+        # Keep only the newest position; the frame timer applies it once per frame
+        self.pending_move = event.pos()
+        if not self.frame_timer.isActive():
+            self.apply_pending_move()  # First move after a pause goes through at once
+            self.frame_timer.start()
+
+    def apply_pending_move(self):
+        """Frame tick: apply the newest pending move, or keep an unfinished constraint solve going."""
+        if self.pending_move is not None:
+            pos, self.pending_move = self.pending_move, None
+            self.apply_move(pos)
+        elif self.constraint_solver.frontier:
+            with self.profiler.phase('constraints'):
+                self.constraint_solver.resume(self.polygon)
+            self.update_dragged()
+        else:
+            self.frame_timer.stop()
+
+    def apply_move(self, widget_pos):
+        """Apply one drag step to the model for the mouse at `widget_pos`."""
+        self.moves_applied += 1
+        pos = self.to_local(widget_pos)
+        if self.panning:
+            self.pan += QPointF(widget_pos) - self.last_mouse_pos
+            self.last_mouse_pos = QPointF(widget_pos)
             self.update()
+        elif self.dragging and self.selected_vertex != 'polygon':
+            # Pin the vertex under the cursor and pull constrained neighbours after it
+            delta = pos - self.polygon.vertices[self.selected_vertex].point
+            with self.profiler.phase('constraints'):
+                self.constraint_solver.drag_vertex(self.polygon, self.selected_vertex, pos)
+                continuity.follow_vertex(self.polygon, self.selected_vertex, delta)
+            self.update_dragged()
         elif self.dragging and self.selected_vertex == 'polygon':
-            delta = pos - self.last_mouse_pos
-            for vertex in self.polygon.vertices:
-                vertex.point += delta
-            for bezier in self.polygon.bezier_segments.values():
-                bezier.control1 += delta
-                bezier.control2 += delta
-            self.last_mouse_pos = pos
+            # Widget coordinates here: the local ones shift with the polygon itself.
+            # Only whole scene units are applied, the remainder carries over to the next move
+            delta = (QPointF(widget_pos) - self.last_mouse_pos) / self.zoom
+            delta = QPoint(round(delta.x()), round(delta.y()))
+            with self.profiler.phase('edit'):
+                self.scene.translate(self.shape_id, delta)
+            self.last_mouse_pos += QPointF(delta) * self.zoom
             self.update()
 
-        # we find bezier segment and manipuate it via control
+        # Move the control point; the opposite handle follows in O(1) at G1/C1 vertices
         if self.dragging_control and self.selected_control:
             control_name, bezier = self.selected_control
-            start_vertex = bezier.start_vertex
-            end_vertex = bezier.end_vertex
-            before_start_vertex = (bezier.start_vertex - 1) % self.polygon.length
-            after_end_vertex = (bezier.end_vertex + 1) % self.polygon.length
-            before_bezier = None
-            after_bezier = None
-
-            for bez in self.polygon.bezier_segments.values():
-                if bez.start_vertex == before_start_vertex and bez.end_vertex == start_vertex:
-                    before_bezier = bez
-                elif bez.start_vertex == end_vertex and bez.end_vertex == after_end_vertex:
-                    after_bezier = bez
-
-
-            if control_name == 'control1':
-                if before_bezier is None:
-                    start_vertex
-                    print(12345)
-                else:
-                    print(678)
-
-                
-
-                bezier.control1 = pos
-            elif control_name == 'control2':
-                if after_bezier is None:
-
-                    bezier.control2 = pos
-            self.update()
+            with self.profiler.phase('constraints'):
+                continuity.drag_control(self.polygon, bezier, control_name, pos)
+            self.update_dragged()
 
     def mouseReleaseEvent(self, event: QMouseEvent):
+        self.frame_timer.stop()
+        if self.pending_move is not None:
+            self.apply_move(self.pending_move)
+            self.pending_move = None
+        if self.constraint_solver.frontier:
+            with self.profiler.phase('constraints'):
+                self.constraint_solver.finish(self.polygon)
+        self.end_drag_record()
+        self.end_drag_updates()
+        self.panning = False
         self.dragging = False
         self.dragging_control = False
         self.selected_vertex = None
         self.selected_control = None
 
+    def begin_drag_record(self):
+        """Start collecting what a drag moves, for a single history entry however long it runs."""
+        self.polygon.moved_from = {}
+        self.drag_offset = QPoint(self.polygon.offset)
+
+    def end_drag_record(self):
+        if self.drag_offset is None:
+            return
+        moved = self.polygon.moved_from
+        self.polygon.moved_from = None
+        delta = self.polygon.offset - self.drag_offset
+        self.drag_offset = None
+        self.record(MovePoints.from_log(self.polygon, moved),
+                    None if delta.isNull() else Translate(delta.x(), delta.y()))
+
+    def record(self, *commands):
+        """Add the commands of one action just applied to the active shape to the history."""
+        self.history.push(self.shape_id, commands)
+
+    def undo(self):
+        """Revert the newest history entry, making its shape the active one."""
+        self.step_history(self.history.undo)
+
+    def redo(self):
+        self.step_history(self.history.redo)
+
+    def step_history(self, step):
+        if self.dragging or self.dragging_control:
+            return  # The drag in progress is not in the history yet
+        with self.profiler.phase('edit'):
+            shape_id = step(self.scene)
+        if shape_id is None:
+            return
+        self.activate_shape(shape_id)
+        self.selected_vertex = None
+        self.selected_control = None
+        self.update()
+
     def distance(self, p1: QPoint, p2: QPoint):
         return math.hypot(p1.x() - p2.x(), p1.y() - p2.y())
 
-    def get_clicked_edge(self, pos):
-        edges = self.polygon.get_edges()
-        for i, (start, end) in enumerate(edges):
-            if self.is_near_edge(pos, start, end):
-                return i
-        return None
+    def hit_test(self, widget_pos):
+        """(shape id, clicked edge, clicked vertex) for a click at `widget_pos`.
+
+        The active shape is tried first, then the other shapes whose boxes
+        are near the click, topmost first; the first with an edge, vertex or
+        control point under the cursor wins. Failing that, a click inside a
+        shape's outline picks it with no edge or vertex, and anywhere else
+        the active shape.
+        """
+        point = self.to_scene(widget_pos)
+        radius = max(self.edge_threshold, 10) / self.zoom
+        nearby = [i for i in self.scene.find_at(point.x(), point.y(), radius) if i != self.shape_id]
+        for shape_id in [self.shape_id] + nearby:
+            polygon = self.scene[shape_id]
+            pos = self.to_local(widget_pos, polygon)
+            clicked_edge = self.get_clicked_edge(pos, polygon)
+            clicked_vertex = self.get_clicked_vertex(pos, polygon)
+            if (clicked_edge is not None or clicked_vertex is not None
+                    or polygon.find_control(pos.x(), pos.y(), 5 / self.zoom) is not None):
+                return shape_id, clicked_edge, clicked_vertex
+        for shape_id in nearby:
+            offset = self.scene[shape_id].offset
+            if point_in_polygon((point.x() - offset.x(), point.y() - offset.y()), self.scene.outlines[shape_id]):
+                return shape_id, None, None
+        return self.shape_id, None, None
+
+    def get_clicked_edge(self, pos, polygon=None):
+        """Index of the edge nearest to pos within edge_threshold, or None."""
+        polygon = self.polygon if polygon is None else polygon
+        threshold = self.edge_threshold / self.zoom  # The threshold is in pixels, pos in scene units
+        candidates = polygon.find_edges(pos.x(), pos.y(), threshold)
+        if not candidates:
+            return None
+        # Score every segment of every candidate edge in one pass; curves use their flattened polyline
+        starts, ends, owners = polygon.edge_segments(candidates, self.curve_tolerance())
+        distances = point_segment_distances(np.array([pos.x(), pos.y()], dtype=float), starts, ends)
+        nearest = np.argmin(distances)
+        if distances[nearest] > threshold:
+            return None
+        return int(owners[nearest])
     
-    def get_clicked_vertex(self, pos):
-        for i, vertex in enumerate(self.polygon.vertices):
-            if self.distance(pos, vertex.point) < 10:
-                print("something")
-                return i
-        return None
+    def get_clicked_vertex(self, pos, polygon=None):
+        polygon = self.polygon if polygon is None else polygon
+        return polygon.find_vertex(pos.x(), pos.y(), 10 / self.zoom)
 
     def is_near_edge(self, point, start, end):
         """Check if a point is within a threshold distance from an edge."""
-        x0, y0 = point.x(), point.y()
-        x1, y1 = start.x(), start.y()
-        x2, y2 = end.x(), end.y()
-
-        # Compute the distance from point to the line segment
-        numerator = abs((y2 - y1)*x0 - (x2 - x1)*y0 + x2*y1 - y2*x1)
-        denominator = math.hypot(y2 - y1, x2 - x1)
-        if denominator == 0:
-            return False
-        distance = numerator / denominator
-        return distance <= self.edge_threshold
-
+        distance = point_segment_distances(
+            np.array([point.x(), point.y()], dtype=float),
+            np.array([[start.x(), start.y()]], dtype=float),
+            np.array([[end.x(), end.y()]], dtype=float),
+        )[0]
+        return distance <= self.edge_threshold / self.zoom
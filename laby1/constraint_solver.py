@@ -0,0 +1,107 @@
+import math
+import time
+
+from PyQt5.QtCore import QPoint
+
+import continuity
+
+LENGTH_TOLERANCE = 1.0  # Vertices are integral, so lengths can only be met to within rounding
+
+
+class ConstraintSolver:
+    """Keeps edge constraints satisfied while a vertex is dragged.
+
+    The dragged vertex is pinned at the cursor, then the solver walks outward
+    along the polygon in both directions. Each constrained edge that is no
+    longer satisfied is fixed by moving its far vertex, and a walk stops at
+    the first edge that is satisfied or unconstrained, so a drag only costs
+    as much as the chain of edges it actually disturbs. Every vertex a walk
+    moves goes through continuity.follow_vertex, so G1/C1 joints along the
+    chain keep their handles in line.
+
+    Each call gets a time budget. A walk that runs out of it is remembered and
+    resumed by the next call (or by finish() when the drag ends), so a huge
+    constrained chain is spread over several frames instead of stalling one.
+    """
+
+    def __init__(self, time_budget=0.004):
+        self.time_budget = time_budget  # Seconds per drag event; None for unlimited
+        self.pinned = None  # Index of the vertex being dragged
+        self.frontier = []  # (index of last vertex fixed, step +1/-1) of unfinished walks
+        self.steps = 0  # Vertices moved by the last call, for profiling
+
+    def drag_vertex(self, polygon, index, point):
+        """Move vertex `index` to `point` and re-satisfy constraints; True once nothing is pending."""
+        polygon.move_vertex(index, point)
+        self.pinned = index
+        # Walks from the new position supersede unfinished ones that started at the same vertex
+        self.frontier = [(index, 1), (index, -1)] + [
+            walk for walk in self.frontier if walk[0] != index]
+        return self.resume(polygon)
+
+    def finish(self, polygon):
+        """Run any unfinished walks to completion."""
+        budget, self.time_budget = self.time_budget, None
+        try:
+            self.resume(polygon)
+        finally:
+            self.time_budget = budget
+            self.pinned = None
+
+    def resume(self, polygon):
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        self.steps = 0
+        while self.frontier:
+            start, step = self.frontier.pop(0)
+            stopped_at = self.walk(polygon, start, step, deadline)
+            if stopped_at is not None:
+                self.frontier.insert(0, (stopped_at, step))
+                return False
+        return True
+
+    def walk(self, polygon, index, step, deadline):
+        """Fix vertices one by one from `index` in direction `step`.
+
+        Returns None when the chain is satisfied, or the index to resume from
+        when the deadline passed first.
+        """
+        n = len(polygon.vertices)
+        for _ in range(n - 1):
+            edge = index if step > 0 else (index - 1) % n
+            constraint = polygon.constraints.get(edge)
+            if constraint is None:
+                return None
+            following = (index + step) % n
+            if following == self.pinned:
+                return None  # Went all the way round; the dragged vertex stays where it is
+            anchor = polygon.vertices[index].point
+            moved = polygon.vertices[following].point
+            target = self.satisfy(constraint, anchor, moved)
+            if target is None:
+                return None
+            polygon.move_vertex(following, target)
+            continuity.follow_vertex(polygon, following, target - moved)
+            self.steps += 1
+            index = following
+            if deadline is not None and self.steps % 32 == 0 and time.perf_counter() > deadline:
+                return index
+        return None
+
+    @staticmethod
+    def satisfy(constraint, anchor, moved):
+        """Nearest position for `moved` that satisfies the constraint w.r.t. `anchor`, or None if it already does."""
+        if constraint.type == 'horizontal':
+            return None if moved.y() == anchor.y() else QPoint(moved.x(), anchor.y())
+        if constraint.type == 'vertical':
+            return None if moved.x() == anchor.x() else QPoint(anchor.x(), moved.y())
+        if constraint.type == 'length':
+            dx = moved.x() - anchor.x()
+            dy = moved.y() - anchor.y()
+            length = math.hypot(dx, dy)
+            if abs(length - constraint.value) <= LENGTH_TOLERANCE:
+                return None
+            if length == 0:
+                dx, dy, length = 1, 0, 1
+            scale = constraint.value / length
+            return QPoint(anchor.x() + round(dx * scale), anchor.y() + round(dy * scale))
+        return None
@@ -0,0 +1,107 @@
+import math
+
+from PyQt5.QtCore import QPoint
+
+import constraint_solver
+
+# Tangent at a vertex is 3 * (control - vertex) for a cubic and (neighbour - vertex) for a line
+HANDLE_WEIGHT = {True: 3, False: 1}
+
+
+def handle(polygon, index, incoming):
+    """The point that fixes the tangent on one side of vertex `index`.
+
+    That is the curve's nearer control point, or the neighbouring vertex for
+    a straight edge. Returns (point, bezier, control name or None).
+    """
+    before, after = polygon.incident_beziers(index)
+    n = len(polygon.vertices)
+    if incoming:
+        if before is not None:
+            return before.control2, before, 'control2'
+        return polygon.vertices[(index - 1) % n].point, None, None
+    if after is not None:
+        return after.control1, after, 'control1'
+    return polygon.vertices[(index + 1) % n].point, None, None
+
+
+def enforce(polygon, index, fixed_incoming):
+    """Restore G1/C1 at vertex `index` by moving the handle opposite the fixed side.
+
+    Only one point moves, so this is O(1). Joints between two straight edges
+    are left alone; continuity only constrains edges that are curves. When
+    the opposite side is a straight edge that cannot turn without breaking a
+    constraint at its far vertex, the fixed handle is brought in line with
+    the edge instead.
+    """
+    vertex = polygon.vertices[index]
+    if vertex.continuity not in ('G1', 'C1'):
+        return
+    fixed, fixed_bezier, _ = handle(polygon, index, fixed_incoming)
+    opposite, bezier, name = handle(polygon, index, not fixed_incoming)
+    if fixed_bezier is None and bezier is None:
+        return
+    center = vertex.point
+    dx, dy = center.x() - fixed.x(), center.y() - fixed.y()
+    if dx == 0 and dy == 0:
+        return  # Handle on the vertex: no tangent to follow
+    if vertex.continuity == 'C1':
+        # Equal tangent vectors: w_out * (opposite - center) = w_in * (center - fixed)
+        scale = HANDLE_WEIGHT[fixed_bezier is not None] / HANDLE_WEIGHT[bezier is not None]
+    else:
+        # Collinear, keeping the opposite handle's own length
+        scale = math.hypot(opposite.x() - center.x(), opposite.y() - center.y()) / math.hypot(dx, dy)
+    target = QPoint(center.x() + round(dx * scale), center.y() + round(dy * scale))
+    if target == opposite:
+        return
+    if bezier is not None:
+        polygon.move_control(bezier, name, target)
+        return
+    neighbour = (index + (1 if fixed_incoming else -1)) % len(polygon.vertices)
+    if breaks_constraints(polygon, neighbour, target):
+        enforce(polygon, index, not fixed_incoming)
+    else:
+        polygon.move_vertex(neighbour, target)
+
+
+def breaks_constraints(polygon, index, point):
+    """Whether moving vertex `index` to `point` leaves a constraint on either of its edges unsatisfied."""
+    n = len(polygon.vertices)
+    for edge, other in (((index - 1) % n, (index - 1) % n), (index, (index + 1) % n)):
+        constraint = polygon.constraints.get(edge)
+        if constraint is not None and constraint_solver.ConstraintSolver.satisfy(
+                constraint, polygon.vertices[other].point, point) is not None:
+            return True
+    return False
+
+
+def drag_control(polygon, bezier, control_name, point):
+    """Move a control point and keep the continuity at the vertex it belongs to."""
+    polygon.move_control(bezier, control_name, point)
+    if control_name == 'control1':
+        enforce(polygon, bezier.start_vertex, fixed_incoming=False)
+    else:
+        enforce(polygon, bezier.end_vertex, fixed_incoming=True)
+
+
+def follow_vertex(polygon, index, delta):
+    """Keep continuity after vertex `index` moved by `delta`.
+
+    Smooth vertices carry their control points along, so a joint between two
+    curves keeps its tangent. A straight edge at the vertex has turned,
+    though, so the curve handle facing it, here or at the neighbour on its
+    other end, is realigned.
+    """
+    n = len(polygon.vertices)
+    before, after = polygon.incident_beziers(index)
+    if polygon.vertices[index].continuity in ('G1', 'C1'):
+        if before is not None:
+            polygon.move_control(before, 'control2', before.control2 + delta)
+        if after is not None:
+            polygon.move_control(after, 'control1', after.control1 + delta)
+        if (before is None) != (after is None):
+            enforce(polygon, index, fixed_incoming=before is None)
+    if before is None:
+        enforce(polygon, (index - 1) % n, fixed_incoming=False)
+    if after is None:
+        enforce(polygon, (index + 1) % n, fixed_incoming=True)
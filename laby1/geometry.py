@@ -0,0 +1,36 @@
+import numpy as np
+
+
+def point_segment_distances(point, starts, ends):
+    """Distances from a point to many segments given as (n, 2) arrays of endpoints."""
+    return pairwise_segment_distances(np.asarray(point)[np.newaxis], starts, ends)
+
+
+def pairwise_segment_distances(points, starts, ends):
+    """Distance from points[i] to the segment starts[i]-ends[i], for (n, 2) arrays.
+
+    Each point is projected onto its segment and the projection clamped to
+    the endpoints, so points beyond either end are measured to that end
+    rather than to the infinite line. Zero-length segments act as points.
+    A single (1, 2) point broadcasts against all the segments.
+    """
+    direction = ends - starts
+    length_sq = np.einsum('ij,ij->i', direction, direction)
+    offset = points - starts
+    t = np.einsum('ij,ij->i', offset, direction) / np.where(length_sq == 0, 1, length_sq)
+    t = np.clip(t, 0, 1)
+    closest = starts + t[:, np.newaxis] * direction
+    return np.hypot(points[:, 0] - closest[:, 0], points[:, 1] - closest[:, 1])
+
+
+def point_in_polygon(point, coords):
+    """Even-odd test of a point against the closed outline through the (n, 2) array `coords`."""
+    if len(coords) < 3:
+        return False
+    x, y = point
+    xs, ys = coords[:, 0], coords[:, 1]
+    next_xs, next_ys = np.roll(xs, -1), np.roll(ys, -1)
+    # Edges that straddle the horizontal line through the point, and where they cross it
+    straddle = (ys > y) != (next_ys > y)
+    crossing = xs + (y - ys) * (next_xs - xs) / np.where(straddle, next_ys - ys, 1)
+    return bool(np.count_nonzero(straddle & (crossing > x)) % 2)
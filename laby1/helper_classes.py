@@ -1,4 +1,14 @@
+import math
+import itertools
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
 from PyQt5.QtCore import Qt, QPoint
+import numpy as np
+
+from bezier_math import bernstein_row, flatten_bezier
+from spatial_index import PolygonIndex
+from profiler import log
 
 
 
@@ -8,135 +18,337 @@ class Constraint:
         self.value = value  # Length value if type is 'length'
 
 class Vertex:
+    _ids = itertools.count()
+
     def __init__(self, x, y):
         self.point = QPoint(x, y)
         self.continuity = 'G0' # New Attribute: 'G0', 'G1', 'C1'
+        self.id = next(Vertex._ids)  # Stable across inserts/removes, unlike the list index
 
 class BezierSegment:
     def __init__(self, start_vertex, end_vertex, control1, control2):
-        self.start_vertex = start_vertex
-        self.end_vertex = end_vertex
+        self.polygon = None  # Set when the segment is added to a Polygon
+        self.edge_id = None  # Id of the start vertex; the indices are derived from it once attached
+        self._start_vertex = start_vertex
+        self._end_vertex = end_vertex
         self.control1 = control1  # QPoint
         self.control2 = control2  # QPoint
 
+    @property
+    def start_vertex(self):
+        if self.polygon is None:
+            return self._start_vertex
+        return self.polygon.position_of(self.edge_id)
+
+    @property
+    def end_vertex(self):
+        if self.polygon is None:
+            return self._end_vertex
+        return (self.start_vertex + 1) % len(self.polygon.vertices)
+
+
+class EdgeMap(MutableMapping):
+    """Edge index -> value view over a dict keyed by the edge's start vertex id.
+
+    Storing by id means inserting or removing a vertex leaves every other
+    edge's entry alone; indices are only worked out when they are asked for.
+    """
+
+    def __init__(self, polygon, attach=False):
+        self.polygon = polygon
+        self.by_id = {}  # key: start vertex id, value: Constraint or BezierSegment
+        self.attach = attach  # Give stored values a back-reference (BezierSegment)
+
+    def edge_id(self, edge):
+        vertices = self.polygon.vertices
+        if not isinstance(edge, (int, np.integer)) or not 0 <= edge < len(vertices):
+            raise KeyError(edge)
+        return vertices[edge].id
+
+    def __contains__(self, edge):
+        try:
+            return self.edge_id(edge) in self.by_id
+        except KeyError:
+            return False
+
+    def __getitem__(self, edge):
+        return self.by_id[self.edge_id(edge)]
+
+    def __setitem__(self, edge, value):
+        edge_id = self.edge_id(edge)
+        if self.attach:
+            value.polygon = self.polygon
+            value.edge_id = edge_id
+        self.by_id[edge_id] = value
+
+    def __delitem__(self, edge):
+        del self.by_id[self.edge_id(edge)]
+
+    def __iter__(self):
+        return (self.polygon.position_of(edge_id) for edge_id in list(self.by_id))
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def pop_id(self, edge_id):
+        return self.by_id.pop(edge_id, None)
+
+
+class FlattenedBezier:
+    def __init__(self, points, bbox, label_pos):
+        self.points = points  # (k, 2) float array of polyline samples
+        self.bbox = bbox  # (min_x, min_y, max_x, max_y)
+        self.label_pos = label_pos  # (x, y) of the curve at t=0.5, where the B{i} label goes
+
+
+class BezierCache:
+    """Bounded LRU cache of flattened curves keyed on their four defining points and the tolerance.
+
+    Entries are found by coordinates alone, so a segment that moved simply
+    misses and its old entry ages out; discard() just frees it sooner. The
+    tolerance is part of the key too: the canvas flattens to a fixed number
+    of pixels, so each zoom level has its own entries and zooming back to a
+    previous level finds them again.
+    """
+
+    def __init__(self, max_size=10000, tolerance=0.25):
+        self.entries = OrderedDict()  # key: (x0, y0, c1x, c1y, c2x, c2y, x3, y3, tolerance), value: FlattenedBezier
+        self.max_size = max_size
+        self.tolerance = tolerance
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, control_points):
+        key += (self.tolerance,)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        points = flatten_bezier(control_points, self.tolerance)
+        label = (bernstein_row(0.5) @ control_points)[0].astype(int).tolist()
+        entry = FlattenedBezier(points, (*points.min(axis=0), *points.max(axis=0)), tuple(label))
+        self.entries[key] = entry
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return entry
+
+    def discard(self, key):
+        """Drop the entry for a segment's key, taken before its defining points move.
+
+        Only the entry at the current tolerance goes; those of other zoom
+        levels age out.
+        """
+        self.entries.pop(key + (self.tolerance,), None)
+
+    def set_tolerance(self, tolerance):
+        self.tolerance = tolerance
+
+    def clear(self):
+        self.entries.clear()
+
+
 class Polygon:
+    SHIFT_LOG_LIMIT = 1024  # Pending index shifts before the position map is rebuilt
+
     def __init__(self):
         self.vertices = []  # List of Vertex
-        self.constraints = {}  # key: edge index, value: Constraint
-        self.bezier_segments = {}  # key: edge index, value: BezierSegment
+        self.constraints = EdgeMap(self)  # key: edge index, value: Constraint
+        self.bezier_segments = EdgeMap(self, attach=True)  # key: edge index, value: BezierSegment
         self.length = 0
+        self.bezier_cache = BezierCache()
+        self._hit_index = None  # PolygonIndex, built on the first hit test
+        self._positions = None  # key: vertex id, value: (index, number of shifts already applied)
+        self._shifts = []  # (first index, delta) of each insert/remove since the map was built
+        self.offset = QPoint(0, 0)  # Translation of the whole polygon, not yet applied to the points
+        self.touched_edges = None  # While a set, move_vertex/move_control add the edges they change
+        self.moved_from = None  # While a dict, move_vertex/move_control keep where each point started
 
     def add_vertex(self, x, y):
-        self.vertices.append(Vertex(x, y))
+        vertex = Vertex(x, y)
+        self.vertices.append(vertex)
         self.length += 1
-
-
-        
-
-
-
-
+        if self._positions is not None:
+            self._positions[vertex.id] = (len(self.vertices) - 1, len(self._shifts))
+        if self._hit_index is not None:
+            self._hit_index.insert_vertex(len(self.vertices) - 1)
+
+    def add_vertices(self, coords):
+        """Append many vertices at once from an (n, 2) array of points."""
+        self.vertices.extend(Vertex(x, y) for x, y in np.asarray(coords, dtype=int).tolist())
+        self.length = len(self.vertices)
+        self._positions = None
+        self._hit_index = None  # Rebuilt in bulk on the next hit test
+
+    def add_beziers(self, edges, controls):
+        """Turn many edges into Bezier segments; controls is an (n, 2, 2) array of control1, control2."""
+        n = len(self.vertices)
+        for edge, ((x1, y1), (x2, y2)) in zip(np.asarray(edges).tolist(), np.asarray(controls, dtype=int).tolist()):
+            self.add_bezier(edge, BezierSegment(edge, (edge + 1) % n, QPoint(x1, y1), QPoint(x2, y2)))
 
     def remove_vertex(self, index):
-        print(f"Removing vertex at index {index}")
+        log.debug("Removing vertex at index %d", index)
         if 0 <= index < len(self.vertices):
-            # Remove associated constraints and bezier segments
+            # Remove the constraints and bezier segments of both edges meeting at the vertex
             before_index = (index - 1) % self.length
             after_index = (index + 1) % self.length
-            if index in self.constraints:
-                del self.constraints[index]
-            if before_index in self.constraints:
-                del self.constraints[before_index]
-            # if after_index in self.constraints:
-            #     del self.constraints[after_index]
-            if index in self.bezier_segments:
-                del self.bezier_segments[index]
-            if before_index in self.bezier_segments:
-                del self.bezier_segments[before_index]
-            # if after_index in self.bezier_segments:
-            #     del self.bezier_segments[after_index]
-
+            for edge in (index, before_index):
+                edge_id = self.vertices[edge].id
+                self.constraints.pop_id(edge_id)
+                bezier = self.bezier_segments.pop_id(edge_id)
+                if bezier is not None:
+                    self.forget_bezier(bezier)
 
             self.vertices[before_index].continuity = "G0"
             self.vertices[index].continuity = "G0"
             self.vertices[after_index].continuity = "G0"
 
-
-            print(f"Removing vertex at index {index}")
-            del self.vertices[index]
+            removed = self.vertices.pop(index)
             self.length -= 1
-            # Remove associated constraints and bezier segments
-
-            local_constraints = {}
-            local_beziers = {}
-            
-            for i in range(index + 1):
-                if self.constraints.get(i):
-                    local_constraints[i] = self.constraints.get(i)
-                if self.bezier_segments.get(i):
-                    local_beziers[i] = self.bezier_segments.get(i)
-                
-            for i in range(index + 1, len(self.get_edges())):
-                item = self.constraints.get(i)
-                if item:
-                    local_constraints[i-1] = item
-                item = self.bezier_segments.get(i)
-                if item:
-                    item.start_vertex = (item.start_vertex - 1) % self.length
-                    item.end_vertex = (item.end_vertex - 1) % self.length
-                    local_beziers[i-1] = item
-
-            self.constraints = local_constraints
-            self.bezier_segments = local_beziers
-                    #TODO ADD CONTINUTEITE BETTER.
-
-            
+            # Every other edge keeps its entry; only later indices move down by one
+            if self._positions is not None:
+                del self._positions[removed.id]
+                self.record_shift(index + 1, -1)
+
+            if self._hit_index is not None:
+                self._hit_index.remove_vertex(removed)
+                if self.vertices:
+                    self._hit_index.update_edge((index - 1) % len(self.vertices))
 
     def add_vertex_continuity(self, vertex_index, selected_continuity="G0"):
         self.vertices[vertex_index].continuity = selected_continuity
 
     def insert_vertex(self, edge_index, x, y):
         """Insert a vertex at the specified edge."""
+        # The split edge loses its constraint and curve; no other edge is touched
+        edge_id = self.vertices[edge_index].id
+        self.constraints.pop_id(edge_id)
+        bezier = self.bezier_segments.pop_id(edge_id)
+        if bezier is not None:
+            self.forget_bezier(bezier)
+
         # Insert the new vertex after the start vertex of the edge
         self.insert_vertex_at_position(edge_index + 1, x, y)
 
-       
-        if edge_index in self.constraints:
-            del self.constraints[edge_index]
-        
-        if edge_index in self.bezier_segments:
-            del self.bezier_segments[edge_index]
-       
-
-        # Shift constraints and bezier segments for subsequent edges
-        local_constraints = {}
-        local_beziers = {}
-
-        for i in range(edge_index + 1):
-            if self.constraints.get(i):
-                local_constraints[i] = self.constraints.get(i)
-            if self.bezier_segments.get(i):
-                local_beziers[i] = self.bezier_segments.get(i)
-            
-        for i in reversed(range(edge_index + 1, len(self.get_edges()))):
-            item = self.constraints.get(i - 1)
-            if item:
-                local_constraints[i] = item
-            item = self.bezier_segments.get(i - 1)
-            if item:
-                item.start_vertex = (item.start_vertex + 1) % self.length
-                item.end_vertex = (item.end_vertex + 1) % self.length
-                local_beziers[i] = item
-
-        self.constraints = local_constraints
-        self.bezier_segments = local_beziers
-                #TODO ADD CONTINUTEITE BETTER.
-
+        if self._hit_index is not None:
+            self._hit_index.update_edge(edge_index)
 
     def insert_vertex_at_position(self, index, x, y):
         """Insert a vertex at the specified list index."""
         if 0 <= index <= len(self.vertices):
-            self.vertices.insert(index, Vertex(x, y))
+            vertex = Vertex(x, y)
+            self.vertices.insert(index, vertex)
+            self.length += 1
+            if self._positions is not None:
+                self._positions[vertex.id] = (index, len(self._shifts) + 1)  # Already past its own shift
+                self.record_shift(index, 1)
+            if self._hit_index is not None:
+                self._hit_index.insert_vertex(index)
+
+    def record_shift(self, first_index, delta):
+        """Note that every vertex at or after first_index moved by delta."""
+        self._shifts.append((first_index, delta))
+        if len(self._shifts) > self.SHIFT_LOG_LIMIT:
+            self._positions = None  # Cheaper to rebuild once than to replay a long log
+
+    def position_of(self, vertex_id):
+        """Current list index of the vertex with this id."""
+        if self._positions is None:
+            self._positions = {vertex.id: (i, 0) for i, vertex in enumerate(self.vertices)}
+            self._shifts = []
+        index, applied = self._positions[vertex_id]
+        if applied < len(self._shifts):
+            for first_index, delta in itertools.islice(self._shifts, applied, None):
+                if index >= first_index:
+                    index += delta
+            self._positions[vertex_id] = (index, len(self._shifts))
+        return index
+
+    def validate_edits(self, inserts=(), removes=(), moves=()):
+        """Check a batch of edits against the current indices and normalize it to arrays.
+
+        inserts: (edge index, x, y), removes: vertex index, moves: (vertex index, x, y),
+        all referring to the polygon as it is before the batch.
+        """
+        n = len(self.vertices)
+        inserts = np.asarray(list(inserts), dtype=np.int64).reshape(-1, 3)
+        removes = np.asarray(list(removes), dtype=np.int64).reshape(-1)
+        moves = np.asarray(list(moves), dtype=np.int64).reshape(-1, 3)
+        for name, indices in (('insert', inserts[:, 0]), ('remove', removes), ('move', moves[:, 0])):
+            if len(indices) and (indices.min() < 0 or indices.max() >= n):
+                raise ValueError(f"{name} index out of range for a polygon with {n} vertices")
+        if len(np.unique(removes)) != len(removes):
+            raise ValueError("vertex removed more than once")
+        if len(np.unique(moves[:, 0])) != len(moves):
+            raise ValueError("vertex moved more than once")
+        removed = np.zeros(n, dtype=bool)
+        removed[removes] = True
+        if removed[moves[:, 0]].any():
+            raise ValueError("cannot move a vertex that is being removed")
+        if (removed[inserts[:, 0]] | removed[(inserts[:, 0] + 1) % max(n, 1)]).any():
+            raise ValueError("cannot insert on an edge whose endpoint is being removed")
+        return inserts, removes, moves, removed
+
+    def edit_mapping(self, inserts, removed):
+        """Old -> new vertex index after a batch (-1 for removed vertices)."""
+        kept = ~removed
+        added = np.bincount(inserts[:, 0], minlength=len(removed))  # New vertices after each old one
+        new_index = np.cumsum(kept) - kept + np.cumsum(added) - added
+        return np.where(kept, new_index, -1)
+
+    def dropped_edges(self, inserts, removes):
+        """Old edge indices that lose their constraint and curve in a batch, like insert/remove_vertex."""
+        n = len(self.vertices)
+        return np.unique(np.concatenate([inserts[:, 0], removes, (removes - 1) % max(n, 1)]))
+
+    def apply_edits(self, inserts=(), removes=(), moves=()):
+        """Apply many vertex inserts, removes and moves in one linear pass.
+
+        Indices refer to the polygon before the batch. Inserts on the same edge
+        keep their order along it. Edges that are split or lose an endpoint
+        drop their constraint and curve, and neighbours of removed vertices go
+        back to G0, as with insert_vertex/remove_vertex. Returns the old -> new
+        vertex index mapping as an array, with -1 for removed vertices.
+        """
+        inserts, removes, moves, removed = self.validate_edits(inserts, removes, moves)
+        n = len(self.vertices)
+        old = self.vertices
+
+        for index, x, y in moves.tolist():
+            for edge in ((index - 1) % n, index):
+                bezier = self.bezier_segments.by_id.get(old[edge].id)
+                if bezier is not None:
+                    self.bezier_cache.discard(self.bezier_key(bezier))
+            old[index].point = QPoint(x, y)
+        for edge in self.dropped_edges(inserts, removes).tolist():
+            self.constraints.pop_id(old[edge].id)
+            bezier = self.bezier_segments.pop_id(old[edge].id)
+            if bezier is not None:
+                self.forget_bezier(bezier)
+        for index in removes.tolist():
+            old[(index - 1) % n].continuity = "G0"
+            old[(index + 1) % n].continuity = "G0"
+
+        # Rebuild the vertex list from slices of the old one, splicing at each edited index
+        inserted = {}
+        for edge, x, y in inserts.tolist():
+            inserted.setdefault(edge, []).append(Vertex(x, y))
+        vertices = []
+        start = 0
+        for index in sorted(set(inserted) | set(removes.tolist())):
+            vertices.extend(old[start:index])
+            if not removed[index]:
+                vertices.append(old[index])
+            vertices.extend(inserted.get(index, ()))
+            start = index + 1
+        vertices.extend(old[start:])
+
+        self.vertices = vertices
+        self.length = len(vertices)
+        self._positions = None
+        self._hit_index = None  # Rebuilt in bulk on the next hit test
+        return self.edit_mapping(inserts, removed)
 
     def get_edges(self):
         edges = []
@@ -148,8 +360,211 @@ class Polygon:
             edges.append((start, end))
         return edges
     
+    def coordinates(self):
+        """Vertex positions as an (n, 2) float array."""
+        coords = []
+        for vertex in self.vertices:
+            coords.extend((vertex.point.x(), vertex.point.y()))
+        return np.array(coords, dtype=float).reshape(-1, 2)
+
     def get_beziers(self):
         return self.bezier_segments
 
+    def add_bezier(self, edge_index, bezier):
+        self.bezier_segments[edge_index] = bezier
+        if self._hit_index is not None:
+            self._hit_index.add_controls(bezier)
+            self._hit_index.update_edge(edge_index)
+
+    def remove_bezier(self, edge_index):
+        self.forget_bezier(self.bezier_segments.pop(edge_index))
+        if self._hit_index is not None:
+            self._hit_index.update_edge(edge_index)
+
+    def forget_bezier(self, bezier):
+        """Drop a deleted segment from the curve cache and the hit-test index."""
+        self.bezier_cache.discard(self.bezier_key(bezier))
+        if self._hit_index is not None:
+            self._hit_index.remove_controls(bezier)
+
+    def index_of(self, vertex):
+        """Current list index of a Vertex object."""
+        return self.position_of(vertex.id)
+
+    def hit_index(self):
+        if self._hit_index is None:
+            self._hit_index = PolygonIndex(self)
+        return self._hit_index
+
+    def find_vertex(self, x, y, radius):
+        """Index of the vertex nearest to (x, y) within `radius`, or None."""
+        best, best_distance = None, radius
+        for vertex in self.hit_index().vertices.query(x, y, radius):
+            distance = math.hypot(vertex.point.x() - x, vertex.point.y() - y)
+            if distance < best_distance:
+                best, best_distance = vertex, distance
+        return None if best is None else self.index_of(best)
+
+    def find_edges(self, x, y, radius):
+        """Sorted indices of the edges whose bounding boxes come within `radius` of (x, y)."""
+        return sorted(self.index_of(vertex) for vertex in self.hit_index().edges.query(x, y, radius))
+
+    def find_in_rect(self, min_x, min_y, max_x, max_y):
+        """(vertex indices, edge indices) that may lie in the rectangle; a superset, from the grid cells."""
+        index = self.hit_index()
+        vertices = [self.index_of(v) for v in index.vertices.query_rect(min_x, min_y, max_x, max_y)]
+        edges = [self.index_of(v) for v in index.edges.query_rect(min_x, min_y, max_x, max_y)]
+        return vertices, edges
+
+    def count_in_rect(self, min_x, min_y, max_x, max_y):
+        """Rough number of edges in the rectangle, cheap enough to decide whether culling pays off."""
+        return self.hit_index().edges.count_rect(min_x, min_y, max_x, max_y)
+
+    def bounds(self):
+        """(min_x, min_y, max_x, max_y) of the vertices and control points, or None when empty."""
+        coords = self.coordinates()
+        if len(coords) == 0:
+            return None
+        _, control_points = self.all_bezier_control_points()
+        points = np.vstack([coords, control_points.reshape(-1, 2)])
+        return (*points.min(axis=0).tolist(), *points.max(axis=0).tolist())
+
+    def edge_segments(self, edge_indices, tolerance=0.25):
+        """Line segments that make up the given edges, for distance queries.
+
+        Straight edges contribute their chord and Bezier edges the segments of
+        their cached flattened polyline. Returns (starts, ends, owners) where
+        owners[i] is the edge index that segment i belongs to.
+        """
+        n = len(self.vertices)
+        polylines = []
+        owners = []
+        for i in edge_indices:
+            bezier = self.bezier_segments.get(i)
+            if bezier is not None:
+                points = self.flattened_bezier(bezier, tolerance).points
+            else:
+                start = self.vertices[i].point
+                end = self.vertices[(i + 1) % n].point
+                points = np.array([[start.x(), start.y()], [end.x(), end.y()]], dtype=float)
+            polylines.append(points)
+            owners.append(np.full(len(points) - 1, i))
+        starts = np.concatenate([points[:-1] for points in polylines])
+        ends = np.concatenate([points[1:] for points in polylines])
+        return starts, ends, np.concatenate(owners)
+
+    def find_control(self, x, y, radius):
+        """(control name, BezierSegment) of the control point nearest to (x, y) within `radius`, or None."""
+        best, best_distance = None, radius
+        for name, bezier in self.hit_index().controls.query(x, y, radius):
+            point = getattr(bezier, name)
+            distance = math.hypot(point.x() - x, point.y() - y)
+            if distance < best_distance:
+                best, best_distance = (name, bezier), distance
+        return best
+
+    def incident_beziers(self, index):
+        """(curve ending at vertex `index`, curve starting at it), either may be None.
+
+        Curves are keyed by the id of their start vertex, so this is two
+        dictionary lookups and stays correct across inserts and removes.
+        """
+        n = len(self.vertices)
+        return self.bezier_segments.get((index - 1) % n), self.bezier_segments.get(index)
+
+    def move_vertex(self, index, point):
+        """Move a vertex, dropping the cached curves of the edges that meet at it."""
+        n = len(self.vertices)
+        for edge_index in ((index - 1) % n, index):
+            bezier = self.bezier_segments.get(edge_index)
+            if bezier is not None:
+                self.bezier_cache.discard(self.bezier_key(bezier))
+        if self.moved_from is not None:
+            start = self.vertices[index].point
+            self.moved_from.setdefault(index, (start.x(), start.y()))
+        self.vertices[index].point = QPoint(point)
+        if self.touched_edges is not None:
+            self.touched_edges.update(((index - 1) % n, index))
+        if self._hit_index is not None:
+            self._hit_index.update_vertex(index)
+
+    def move_control(self, bezier, control_name, point):
+        """Move control1 or control2 of a segment."""
+        self.bezier_cache.discard(self.bezier_key(bezier))
+        if self.moved_from is not None:
+            start = getattr(bezier, control_name)
+            self.moved_from.setdefault((bezier.start_vertex, control_name), (start.x(), start.y()))
+        setattr(bezier, control_name, QPoint(point))
+        if self.touched_edges is not None:
+            self.touched_edges.add(bezier.start_vertex)
+        if self._hit_index is not None:
+            self._hit_index.update_control(bezier, control_name)
+            self._hit_index.update_edge(bezier.start_vertex)
+
+    def translate(self, delta):
+        """Move the whole polygon, including Bezier control points, in O(1).
+
+        Only the offset changes; vertices and controls stay in local
+        coordinates, which paint and hit tests map through the offset. Call
+        bake_offset() when absolute coordinates are needed.
+        """
+        self.offset += delta
+
+    def to_local(self, point):
+        """Map a point from widget coordinates into the polygon's stored coordinates."""
+        return point - self.offset
+
+    def bake_offset(self):
+        """Apply the pending offset to every vertex and control point and reset it."""
+        delta = self.offset
+        if delta.isNull():
+            return
+        for vertex in self.vertices:
+            vertex.point += delta
+        for bezier in self.bezier_segments.values():
+            bezier.control1 += delta
+            bezier.control2 += delta
+        self.offset = QPoint(0, 0)
+        self.bezier_cache.clear()
+        if self._hit_index is not None:
+            self._hit_index.translate(delta.x(), delta.y())
+
+    def bezier_key(self, bezier):
+        start = self.vertices[bezier.start_vertex].point
+        end = self.vertices[bezier.end_vertex].point
+        return (start.x(), start.y(), bezier.control1.x(), bezier.control1.y(),
+                bezier.control2.x(), bezier.control2.y(), end.x(), end.y())
+
+    def flattened_bezier(self, bezier, tolerance=None):
+        """Cached polyline, bounding box and label position of a segment."""
+        if tolerance is not None:
+            self.bezier_cache.set_tolerance(tolerance)
+        key = self.bezier_key(bezier)
+        return self.bezier_cache.get(key, np.array(key, dtype=float).reshape(4, 2))
+
+    def bezier_control_points(self, bezier):
+        """Control polygon of a segment as a (4, 2) array: start, control1, control2, end."""
+        start = self.vertices[bezier.start_vertex].point
+        end = self.vertices[bezier.end_vertex].point
+        return np.array([
+            [start.x(), start.y()],
+            [bezier.control1.x(), bezier.control1.y()],
+            [bezier.control2.x(), bezier.control2.y()],
+            [end.x(), end.y()],
+        ], dtype=float)
+
+    def all_bezier_control_points(self):
+        """Edge indices and an (n, 4, 2) array with the control polygons of all Bezier segments."""
+        edge_indices = list(self.bezier_segments.keys())
+        coords = []
+        for bezier in self.bezier_segments.values():
+            start = self.vertices[bezier.start_vertex].point
+            end = self.vertices[bezier.end_vertex].point
+            coords.extend((start.x(), start.y(),
+                           bezier.control1.x(), bezier.control1.y(),
+                           bezier.control2.x(), bezier.control2.y(),
+                           end.x(), end.y()))
+        return edge_indices, np.array(coords, dtype=float).reshape(-1, 4, 2)
+
 
 
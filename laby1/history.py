@@ -0,0 +1,286 @@
+"""Undo/redo as compact command records instead of snapshots of the polygon.
+
+Each command stores only what its edit changed (a vertex and its
+neighbourhood, one edge's constraint or curve, the points a drag moved)
+and knows how to apply and revert itself on the shape it was recorded on.
+Commands refer to vertices and edges by index, which is valid because
+entries are always undone and redone in order. Undo and redo therefore
+cost time proportional to the size of the edit, not of the polygon.
+"""
+from collections import deque
+
+import numpy as np
+from PyQt5.QtCore import QPoint
+
+from helper_classes import BezierSegment, Constraint
+
+DEFAULT_MEMORY_LIMIT = 64 * 2**20  # Bytes of history kept before the oldest entries are dropped
+RECORD_BYTES = 256  # Rough footprint of one small command object with its tuples
+
+
+def edge_state(polygon, edge):
+    """(constraint, controls) of an edge, each None when absent, as plain tuples."""
+    constraint = polygon.constraints.get(edge)
+    bezier = polygon.bezier_segments.get(edge)
+    return (None if constraint is None else (constraint.type, constraint.value),
+            None if bezier is None else point_pair(bezier))
+
+
+def point_pair(bezier):
+    return (bezier.control1.x(), bezier.control1.y()), (bezier.control2.x(), bezier.control2.y())
+
+
+def set_constraint(polygon, edge, constraint):
+    """Give an edge the constraint (type, value), or none for None."""
+    if constraint is None:
+        polygon.constraints.pop(edge, None)
+    else:
+        polygon.constraints[edge] = Constraint(*constraint)
+
+
+def set_bezier(polygon, edge, controls):
+    """Make an edge a curve with these ((x1, y1), (x2, y2)) controls, or a straight edge for None."""
+    if edge in polygon.bezier_segments:
+        polygon.remove_bezier(edge)
+    if controls is not None:
+        (x1, y1), (x2, y2) = controls
+        n = len(polygon.vertices)
+        polygon.add_bezier(edge, BezierSegment(edge, (edge + 1) % n, QPoint(x1, y1), QPoint(x2, y2)))
+
+
+def restore_edge(polygon, edge, state):
+    constraint, controls = state
+    set_constraint(polygon, edge, constraint)
+    set_bezier(polygon, edge, controls)
+
+
+class InsertVertex:
+    """Vertex (x, y) inserted on an edge, which loses its constraint and curve."""
+
+    def __init__(self, polygon, edge, x, y):
+        n = len(polygon.vertices)
+        self.edge, self.x, self.y = edge, x, y
+        self.split_edge = edge_state(polygon, edge)
+        # Removing the vertex again resets its neighbours to G0
+        self.continuity = (polygon.vertices[edge].continuity, polygon.vertices[(edge + 1) % n].continuity)
+        self.nbytes = RECORD_BYTES
+
+    def apply(self, scene, shape_id):
+        scene[shape_id].insert_vertex(self.edge, self.x, self.y)
+
+    def revert(self, scene, shape_id):
+        polygon = scene[shape_id]
+        polygon.remove_vertex(self.edge + 1)
+        n = len(polygon.vertices)
+        polygon.add_vertex_continuity(self.edge, self.continuity[0])
+        polygon.add_vertex_continuity((self.edge + 1) % n, self.continuity[1])
+        restore_edge(polygon, self.edge, self.split_edge)
+
+
+class RemoveVertex:
+    """Vertex removed with the constraints and curves of both its edges."""
+
+    def __init__(self, polygon, index):
+        n = len(polygon.vertices)
+        point = polygon.vertices[index].point
+        self.index, self.x, self.y = index, point.x(), point.y()
+        self.continuity = tuple(polygon.vertices[(index + step) % n].continuity for step in (-1, 0, 1))
+        self.edges = (edge_state(polygon, (index - 1) % n), edge_state(polygon, index))
+        self.nbytes = RECORD_BYTES
+
+    def apply(self, scene, shape_id):
+        scene[shape_id].remove_vertex(self.index)
+
+    def revert(self, scene, shape_id):
+        polygon = scene[shape_id]
+        polygon.insert_vertex_at_position(self.index, self.x, self.y)
+        n = len(polygon.vertices)
+        for step, continuity in zip((-1, 0, 1), self.continuity):
+            polygon.add_vertex_continuity((self.index + step) % n, continuity)
+        restore_edge(polygon, (self.index - 1) % n, self.edges[0])
+        restore_edge(polygon, self.index, self.edges[1])
+
+
+class SetConstraint:
+    """Constraint of an edge changed from `old` to `new`, each (type, value) or None."""
+
+    def __init__(self, polygon, edge, new):
+        self.edge, self.new = edge, new
+        self.old = edge_state(polygon, edge)[0]
+        self.nbytes = RECORD_BYTES
+
+    def apply(self, scene, shape_id):
+        set_constraint(scene[shape_id], self.edge, self.new)
+
+    def revert(self, scene, shape_id):
+        set_constraint(scene[shape_id], self.edge, self.old)
+
+
+class SetBezier:
+    """Curve of an edge changed from `old` to `new` controls, each ((x1, y1), (x2, y2)) or None."""
+
+    def __init__(self, polygon, edge, new):
+        self.edge, self.new = edge, new
+        self.old = edge_state(polygon, edge)[1]
+        self.nbytes = RECORD_BYTES
+
+    def apply(self, scene, shape_id):
+        set_bezier(scene[shape_id], self.edge, self.new)
+
+    def revert(self, scene, shape_id):
+        set_bezier(scene[shape_id], self.edge, self.old)
+
+
+class SetContinuity:
+    def __init__(self, polygon, index, new):
+        self.index, self.new = index, new
+        self.old = polygon.vertices[index].continuity
+        self.nbytes = RECORD_BYTES
+
+    def apply(self, scene, shape_id):
+        scene[shape_id].add_vertex_continuity(self.index, self.new)
+
+    def revert(self, scene, shape_id):
+        scene[shape_id].add_vertex_continuity(self.index, self.old)
+
+
+class MovePoints:
+    """Vertices and control points moved by one drag, however many steps it took.
+
+    Kept as arrays: vertex indices with their old and new positions, and
+    control points as (edge, 0 for control1 / 1 for control2) with theirs.
+    """
+
+    def __init__(self, vertices, old_points, new_points, controls, old_controls, new_controls):
+        self.vertices = np.asarray(vertices, dtype=np.int64)
+        self.old_points = np.asarray(old_points, dtype=np.int32).reshape(-1, 2)
+        self.new_points = np.asarray(new_points, dtype=np.int32).reshape(-1, 2)
+        self.controls = np.asarray(controls, dtype=np.int64).reshape(-1, 2)
+        self.old_controls = np.asarray(old_controls, dtype=np.int32).reshape(-1, 2)
+        self.new_controls = np.asarray(new_controls, dtype=np.int32).reshape(-1, 2)
+        self.nbytes = RECORD_BYTES + sum(array.nbytes for array in (
+            self.vertices, self.old_points, self.new_points, self.controls, self.old_controls, self.new_controls))
+
+    @classmethod
+    def from_log(cls, polygon, moved_from):
+        """Build the command from a polygon's moved_from log; None if nothing ended up elsewhere."""
+        vertices, old_points, new_points = [], [], []
+        controls, old_controls, new_controls = [], [], []
+        for key, old in moved_from.items():
+            if isinstance(key, tuple):
+                edge, name = key
+                point = getattr(polygon.bezier_segments[edge], name)
+                if (point.x(), point.y()) != old:
+                    controls.append((edge, name == 'control2'))
+                    old_controls.append(old)
+                    new_controls.append((point.x(), point.y()))
+            else:
+                point = polygon.vertices[key].point
+                if (point.x(), point.y()) != old:
+                    vertices.append(key)
+                    old_points.append(old)
+                    new_points.append((point.x(), point.y()))
+        if not vertices and not controls:
+            return None
+        return cls(vertices, old_points, new_points, controls, old_controls, new_controls)
+
+    def move(self, polygon, points, controls):
+        for index, (x, y) in zip(self.vertices.tolist(), points.tolist()):
+            polygon.move_vertex(index, QPoint(x, y))
+        for (edge, which), (x, y) in zip(self.controls.tolist(), controls.tolist()):
+            polygon.move_control(polygon.bezier_segments[edge], ('control1', 'control2')[which], QPoint(x, y))
+
+    def apply(self, scene, shape_id):
+        self.move(scene[shape_id], self.new_points, self.new_controls)
+
+    def revert(self, scene, shape_id):
+        self.move(scene[shape_id], self.old_points, self.old_controls)
+
+
+class Translate:
+    """Whole shape moved by (dx, dy)."""
+
+    def __init__(self, dx, dy):
+        self.dx, self.dy = dx, dy
+        self.nbytes = RECORD_BYTES
+
+    def apply(self, scene, shape_id):
+        scene.translate(shape_id, QPoint(self.dx, self.dy))
+
+    def revert(self, scene, shape_id):
+        scene.translate(shape_id, QPoint(-self.dx, -self.dy))
+
+
+class History:
+    """Undo and redo stacks of entries, each the commands of one user action on one shape.
+
+    Entries are (shape id, commands, bytes). Their total size is kept under
+    memory_limit by dropping the oldest undo entries; the newest one always
+    stays, however big, so the last action can be undone.
+    """
+
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT):
+        self.memory_limit = memory_limit
+        self.undo_entries = deque()  # Oldest first
+        self.redo_entries = []  # Next to redo last
+        self.memory = 0  # Bytes held by both stacks
+        self.evicted = 0  # Entries dropped to stay under memory_limit
+
+    def __len__(self):
+        return len(self.undo_entries) + len(self.redo_entries)
+
+    def can_undo(self):
+        return bool(self.undo_entries)
+
+    def can_redo(self):
+        return bool(self.redo_entries)
+
+    def push(self, shape_id, commands):
+        """Record an action whose commands were just applied; this drops whatever could be redone."""
+        commands = [command for command in commands if command is not None]
+        if not commands:
+            return
+        for _, _, nbytes in self.redo_entries:
+            self.memory -= nbytes
+        self.redo_entries.clear()
+        nbytes = sum(command.nbytes for command in commands)
+        self.undo_entries.append((shape_id, commands, nbytes))
+        self.memory += nbytes
+        self.evict()
+
+    def set_memory_limit(self, memory_limit):
+        self.memory_limit = memory_limit
+        self.evict()
+
+    def evict(self):
+        while self.memory > self.memory_limit and len(self.undo_entries) > 1:
+            _, _, nbytes = self.undo_entries.popleft()
+            self.memory -= nbytes
+            self.evicted += 1
+
+    def undo(self, scene):
+        """Revert the newest entry; returns its shape id, or None when there is nothing to undo."""
+        if not self.undo_entries:
+            return None
+        entry = self.undo_entries.pop()
+        shape_id, commands, _ = entry
+        for command in reversed(commands):
+            command.revert(scene, shape_id)
+        self.redo_entries.append(entry)
+        return shape_id
+
+    def redo(self, scene):
+        """Apply the entry undone last again; returns its shape id, or None when there is none."""
+        if not self.redo_entries:
+            return None
+        entry = self.redo_entries.pop()
+        shape_id, commands, _ = entry
+        for command in commands:
+            command.apply(scene, shape_id)
+        self.undo_entries.append(entry)
+        return shape_id
+
+    def clear(self):
+        self.undo_entries.clear()
+        self.redo_entries.clear()
+        self.memory = 0
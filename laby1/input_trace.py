@@ -0,0 +1,226 @@
+"""Record editing sessions as input traces and replay them headlessly.
+
+Record with `python main.py --record session.trace`, then replay:
+    python input_trace.py session.trace            # as fast as possible, deterministic
+    python input_trace.py session.trace --realtime # with the recorded timing
+    python input_trace.py session.trace --json latency.json
+
+A trace holds the canvas mouse and wheel events, canvas resizes, mode
+button clicks and the answers given in dialogs, as fixed-size records.
+Replay feeds them to a fresh MainWindow and reports how long each event
+took to handle and repaint.
+"""
+import os
+import sys
+import json
+import time
+import struct
+import hashlib
+import argparse
+from collections import deque
+
+from PyQt5.QtWidgets import QAbstractButton, QApplication
+from PyQt5.QtCore import QEvent, QEventLoop, QObject, QPoint, QPointF, Qt
+from PyQt5.QtGui import QMouseEvent, QWheelEvent
+import numpy as np
+
+TRACE_MAGIC = b'GKTR'
+TRACE_VERSION = 1
+HEADER = struct.Struct('<4sHHH')  # magic, version, canvas width, canvas height
+RECORD = struct.Struct('<IBBiih')  # ms since start, kind, button, x, y, extra
+
+# Record kinds. extra is the held buttons for mouse events, the angle delta for
+# wheel events, the checked state for MODE and the ok flag for ANSWER.
+PRESS, MOVE, RELEASE, WHEEL, MODE, ANSWER, RESIZE = range(7)
+KIND_NAMES = ['press', 'move', 'release', 'wheel', 'mode', 'answer', 'resize']
+MOUSE_EVENTS = {QEvent.MouseButtonPress: PRESS, QEvent.MouseMove: MOVE, QEvent.MouseButtonRelease: RELEASE}
+QT_MOUSE_EVENTS = {kind: event_type for event_type, kind in MOUSE_EVENTS.items()}
+
+# Buttons whose clicks are recorded, by object name; a MODE record stores the list index
+MODE_BUTTONS = [
+    'add_vertex_btn', 'remove_vertex_btn', 'add_constraint_btn', 'remove_constraint_btn',
+    'add_bezier_btn', 'remove_bezier_btn', 'add_vertex_continuity_btn',
+    'radio_bresenham', 'radio_library', 'add_polygon_btn', 'undo_btn', 'redo_btn', 'fit_view_btn',
+]
+
+
+class InputRecorder(QObject):
+    """Writes the input of a MainWindow to a trace file as it happens."""
+
+    def __init__(self, window, path):
+        super().__init__(window)
+        self.window = window
+        self.file = open(path, 'wb')
+        self.start = time.perf_counter()
+        canvas = window.canvas
+        self.file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, canvas.width(), canvas.height()))
+        canvas.installEventFilter(self)
+        for index, name in enumerate(MODE_BUTTONS):
+            button = window.findChild(QAbstractButton, name)
+            button.clicked.connect(lambda checked, index=index: self.write(MODE, index, 0, 0, int(checked)))
+        window.input_recorder = self
+
+    def write(self, kind, button, x, y, extra):
+        if self.file is None:
+            return
+        ms = int((time.perf_counter() - self.start) * 1000)
+        self.file.write(RECORD.pack(ms, kind, button, x, y, extra))
+
+    def eventFilter(self, obj, event):
+        kind = MOUSE_EVENTS.get(event.type())
+        if kind is not None:
+            self.write(kind, int(event.button()), event.x(), event.y(), int(event.buttons()))
+        elif event.type() == QEvent.Wheel:
+            self.write(WHEEL, 0, event.x(), event.y(), event.angleDelta().y())
+        elif event.type() == QEvent.Resize:
+            self.write(RESIZE, 0, event.size().width(), event.size().height(), 0)
+        return False
+
+    def record_answer(self, value, ok):
+        """Note what a dialog returned; an option index or an integer."""
+        self.write(ANSWER, 0, value, 0, int(ok))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.window.input_recorder = None
+
+
+def read_trace(path):
+    """((canvas width, height), (n, 6) int64 array of records) from a trace file."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: not an input trace")
+    magic, version, width, height = HEADER.unpack_from(data)
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"{path}: not an input trace")
+    if version != TRACE_VERSION:
+        raise ValueError(f"{path}: unsupported trace version {version}")
+    count = (len(data) - HEADER.size) // RECORD.size  # A trailing partial record is dropped
+    records = np.array(list(RECORD.iter_unpack(data[HEADER.size:HEADER.size + count * RECORD.size])),
+                       dtype=np.int64).reshape(-1, 6)
+    return (width, height), records
+
+
+def make_event(kind, button, x, y, extra):
+    if kind == WHEEL:
+        return QWheelEvent(QPointF(x, y), QPointF(x, y), QPoint(0, 0), QPoint(0, extra),
+                           Qt.NoButton, Qt.NoModifier, Qt.NoScrollPhase, False)
+    return QMouseEvent(QT_MOUSE_EVENTS[kind], QPointF(x, y), Qt.MouseButton(button),
+                       Qt.MouseButtons(extra), Qt.NoModifier)
+
+
+def state_digest(scene):
+    """Short hash of the geometry, constraints and curves of every shape, to check that replays agree."""
+    digest = hashlib.sha1()
+    for shape_id in scene:
+        polygon = scene[shape_id]
+        digest.update(repr(shape_id).encode())
+        digest.update(polygon.coordinates().astype(np.int64).tobytes())
+        digest.update(repr((polygon.offset.x(), polygon.offset.y())).encode())
+        digest.update(repr(sorted((i, c.type, c.value) for i, c in polygon.constraints.items())).encode())
+        digest.update(repr(sorted((i, b.control1.x(), b.control1.y(), b.control2.x(), b.control2.y())
+                                  for i, b in polygon.bezier_segments.items())).encode())
+        digest.update(repr([v.continuity for v in polygon.vertices]).encode())
+    return digest.hexdigest()[:12]
+
+
+def replay(window, size, records, realtime=False):
+    """Feed a trace to `window`; returns {event kind: [seconds to handle and repaint]}.
+
+    Without `realtime` events go in back to back, with move coalescing off
+    and no time budget for the constraint solver, so that every replay of
+    a trace does the same work and ends in the same state. With it, each
+    event waits for its recorded time and the frame timer runs as it would
+    for a user.
+    """
+    app = QApplication.instance()
+    canvas = window.canvas
+    canvas.setFixedSize(*size)
+    if not realtime:
+        canvas.coalesce_moves = False
+        canvas.constraint_solver.time_budget = None
+    window.replay_answers = deque((int(r[3]), bool(r[5])) for r in records if r[1] == ANSWER)
+    buttons = [window.findChild(QAbstractButton, name) for name in MODE_BUTTONS]
+    app.processEvents()
+    canvas.frame_times = deque()  # Keep every paint of the replay, not only the recent ones
+    latencies = {}
+    start = time.perf_counter()
+    for ms, kind, button, x, y, extra in records.tolist():
+        if kind == ANSWER:
+            continue  # Consumed from replay_answers by the dialog that asked
+        if realtime:
+            remaining = start + ms / 1000 - time.perf_counter()
+            while remaining > 0:
+                app.processEvents(QEventLoop.AllEvents, max(int(remaining * 1000), 1))
+                remaining = start + ms / 1000 - time.perf_counter()
+        began = time.perf_counter()
+        if kind == MODE:
+            target = buttons[button]
+            if target.isCheckable() and target.isChecked() == bool(extra):
+                # Start from the other state so the click lands on the recorded one, as it did when recorded
+                target.setChecked(not extra)
+            target.click()
+        elif kind == RESIZE:
+            canvas.setFixedSize(x, y)
+        else:
+            QApplication.sendEvent(canvas, make_event(kind, button, x, y, extra))
+        app.processEvents()  # Paints whatever the event scheduled
+        latencies.setdefault(KIND_NAMES[kind], []).append(time.perf_counter() - began)
+    window.replay_answers = None
+    return latencies
+
+
+def percentiles(seconds):
+    values = np.array(seconds) * 1e3
+    return {
+        'count': len(values),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max()),
+    }
+
+
+def report(latencies, paint_times):
+    rows = {name: percentiles(values) for name, values in latencies.items()}
+    if paint_times:
+        rows['paint'] = percentiles(paint_times)
+    print(f"{'':>8} {'count':>7} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+    for name, row in rows.items():
+        print(f"{name:>8} {row['count']:>7} {row['p50_ms']:>7.2f} ms {row['p95_ms']:>7.2f} ms "
+              f"{row['p99_ms']:>7.2f} ms {row['max_ms']:>7.2f} ms")
+    return rows
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Replay an input trace headlessly and report latencies.")
+    parser.add_argument("trace")
+    parser.add_argument("--realtime", action="store_true", help="keep the recorded timing between events")
+    parser.add_argument("--json", metavar="FILE", help="also write the percentiles to FILE")
+    args = parser.parse_args(argv)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from main import MainWindow  # Here, as main.py imports this module for recording
+    app = QApplication(sys.argv[:1])
+    size, records = read_trace(args.trace)
+    window = MainWindow()
+    window.show()
+    latencies = replay(window, size, records, realtime=args.realtime)
+    paint_times = [seconds for seconds, _ in window.canvas.frame_times]
+    print(f"{args.trace}: {len(records)} records, canvas {size[0]}x{size[1]}, "
+          f"{'realtime' if args.realtime else 'back to back'}")
+    rows = report(latencies, paint_times)
+    digest = state_digest(window.canvas.scene)
+    print(f"final state {digest}")
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'trace': args.trace, 'realtime': args.realtime, 'state': digest,
+                       'latency': rows}, file, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,16 +1,26 @@
 import sys
 import math
+import logging
+import argparse
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QPushButton, QVBoxLayout,
     QHBoxLayout, QLabel, QMessageBox, QRadioButton, QButtonGroup,
-    QInputDialog
+    QInputDialog, QShortcut, QFileDialog
 )
-from PyQt5.QtGui import QPainter, QPen, QColor, QBrush, QMouseEvent
+from PyQt5.QtGui import QPainter, QPen, QColor, QBrush, QMouseEvent, QKeySequence
 from PyQt5.QtCore import Qt, QPoint
 import numpy as np
 
 from canvas_widget import Canvas
 from helper_classes import Constraint, Vertex, BezierSegment, Polygon
+from profiler import log
+from input_trace import InputRecorder
+from history import InsertVertex, RemoveVertex, SetConstraint, SetBezier, SetContinuity
+import scene_file
+import path_io
+
+
+SCENE_FILTER = "Sceny (*.gksc);;Ścieżki SVG (*.svg);;Listy punktów (*.csv *.txt)"
 
 
 class MainWindow(QMainWindow):
@@ -31,6 +41,37 @@ class MainWindow(QMainWindow):
         self.removing_bezier_mode = False  # Optional: If you want to remove Bezier curves
         self.adding_vertex_continuity_mode = False  # Initialize continuity mode
         self.selected_edge = None
+        self.input_recorder = None  # InputRecorder writing this session to a trace, if any
+        self.replay_answers = None  # While a trace is replayed: deque of its dialog answers
+
+    # Dialogs go through these so that traces can record the answers and replay them without a user
+
+    def ask_item(self, title, label, options):
+        if self.replay_answers is not None:
+            index, ok = self.replay_answers.popleft()
+            item = options[index] if ok else ""
+        else:
+            item, ok = QInputDialog.getItem(self, title, label, options, 0, False)
+        if self.input_recorder is not None:
+            self.input_recorder.record_answer(options.index(item) if ok else 0, ok)
+        return item, ok
+
+    def ask_int(self, title, label, value, minimum, maximum):
+        if self.replay_answers is not None:
+            value, ok = self.replay_answers.popleft()
+        else:
+            value, ok = QInputDialog.getInt(self, title, label, value, minimum, maximum)
+        if self.input_recorder is not None:
+            self.input_recorder.record_answer(value, ok)
+        return value, ok
+
+    def inform(self, title, text):
+        if self.replay_answers is None:
+            QMessageBox.information(self, title, text)
+
+    def warn(self, title, text):
+        if self.replay_answers is None:
+            QMessageBox.warning(self, title, text)
 
     def init_ui(self):
         main_widget = QWidget()
@@ -96,7 +137,9 @@ class MainWindow(QMainWindow):
         # Radio Buttons for Line Drawing
         controls.addWidget(QLabel("Algorytm ry/sowania linii:"))
         self.radio_bresenham = QRadioButton("Bresenham")
+        self.radio_bresenham.setObjectName("radio_bresenham")
         self.radio_library = QRadioButton("Biblioteczny")
+        self.radio_library.setObjectName("radio_library")
         self.radio_library.setChecked(True)
         self.radio_group = QButtonGroup()
         self.radio_group.addButton(self.radio_bresenham)
@@ -105,6 +148,45 @@ class MainWindow(QMainWindow):
         controls.addWidget(self.radio_bresenham)
         controls.addWidget(self.radio_library)
 
+        # Add Polygon Button: a new square shape in the middle of the view
+        add_polygon_btn = QPushButton("Dodaj Wielokąt")
+        add_polygon_btn.setObjectName("add_polygon_btn")
+        add_polygon_btn.clicked.connect(self.add_polygon)
+        controls.addWidget(add_polygon_btn)
+
+        # Undo/Redo Buttons: the history keeps the edits themselves, not copies of the polygon
+        undo_btn = QPushButton("Cofnij (Ctrl+Z)")
+        undo_btn.setObjectName("undo_btn")
+        undo_btn.clicked.connect(self.canvas.undo)
+        controls.addWidget(undo_btn)
+        redo_btn = QPushButton("Ponów (Ctrl+Y)")
+        redo_btn.setObjectName("redo_btn")
+        redo_btn.clicked.connect(self.canvas.redo)
+        controls.addWidget(redo_btn)
+        QShortcut(QKeySequence.Undo, self, undo_btn.click)  # Through the buttons, so traces record them
+        QShortcut(QKeySequence.Redo, self, redo_btn.click)
+
+        # Fit View Button
+        fit_view_btn = QPushButton("Dopasuj Widok")
+        fit_view_btn.setObjectName("fit_view_btn")  # Recorded in traces: it changes the view transform
+        fit_view_btn.clicked.connect(lambda: self.canvas.fit_to_content())  # Not the checked flag as margin
+        controls.addWidget(fit_view_btn)
+
+        # Profiler Button: FPS and time per paint phase over the canvas
+        self.profiler_btn = QPushButton("Profiler (F3)")
+        self.profiler_btn.setCheckable(True)
+        self.profiler_btn.toggled.connect(self.canvas.toggle_profiler)
+        controls.addWidget(self.profiler_btn)
+        QShortcut(QKeySequence(Qt.Key_F3), self, self.profiler_btn.toggle)
+
+        # Open/Save Scene Buttons
+        open_scene_btn = QPushButton("Otwórz Scenę")
+        open_scene_btn.clicked.connect(self.open_scene)
+        controls.addWidget(open_scene_btn)
+        save_scene_btn = QPushButton("Zapisz Scenę")
+        save_scene_btn.clicked.connect(self.save_scene)
+        controls.addWidget(save_scene_btn)
+
         # Documentation Button
         doc_btn = QPushButton("Instrukcja")
         doc_btn.clicked.connect(self.show_documentation)
@@ -116,37 +198,37 @@ class MainWindow(QMainWindow):
     def toggle_add_vertex_mode(self, checked):
         self.adding_vertex_mode = checked
         if checked:
-            QMessageBox.information(self, "Tryb Dodawania Wierzchołka", "Kliknij na krawędź, aby dodać wierzchołek.")
+            self.inform("Tryb Dodawania Wierzchołka", "Kliknij na krawędź, aby dodać wierzchołek.")
         else:
             self.selected_edge = None
 
     def toggle_remove_vertex_mode(self, checked):
         self.removing_vertex_mode = checked
         if checked:
-            QMessageBox.information(self, "Tryb Usuwania Wierzchołka", "Kliknij na wierzchołek, aby usunąć.")
+            self.inform("Tryb Usuwania Wierzchołka", "Kliknij na wierzchołek, aby usunąć.")
         else:
             self.selected_vertex = None
 
     def toggle_add_constraint_mode(self, checked):
-        print(checked)
+        log.debug("Add constraint mode: %s", checked)
         self.adding_constraint_mode = checked
         if checked:
-            QMessageBox.information(self, "Tryb Dodawania Ograniczenia", "Kliknij na krawędź, aby dodać ograniczenie.")
+            self.inform("Tryb Dodawania Ograniczenia", "Kliknij na krawędź, aby dodać ograniczenie.")
         else:
             self.selected_edge = None
 
     def toggle_remove_constraint_mode(self, checked):
-        print(checked)
+        log.debug("Remove constraint mode: %s", checked)
         self.removing_constraint_mode = checked
         if checked:
-            QMessageBox.information(self, "Tryb Usuwania Ograniczenia", "Kliknij na krawędź, aby usunąć ograniczenie.")
+            self.inform("Tryb Usuwania Ograniczenia", "Kliknij na krawędź, aby usunąć ograniczenie.")
         else:
             self.selected_edge = None
 
     def toggle_add_bezier_mode(self, checked):
         self.adding_bezier_mode = checked
         if checked:
-            QMessageBox.information(self, "Tryb Dodawania Krzywej Béziera",
+            self.inform("Tryb Dodawania Krzywej Béziera",
                                     "Kliknij na krawędź, aby dodać krzywą Béziera.")
         else:
             self.selected_edge = None
@@ -154,7 +236,7 @@ class MainWindow(QMainWindow):
     def toggle_remove_bezier_mode(self, checked):
         self.removing_bezier_mode = checked
         if checked:
-            QMessageBox.information(self, "Tryb Usuwania Krzywej Béziera",
+            self.inform("Tryb Usuwania Krzywej Béziera",
                                     "Kliknij na krzywą Béziera, aby usunąć.")
         else:
             self.selected_bezier = None
@@ -162,16 +244,17 @@ class MainWindow(QMainWindow):
     def toggle_add_vertex_continuity_mode(self, checked):
         self.adding_vertex_continuity_mode = checked
         if checked:
-            QMessageBox.information(self, "Tryb Dodawania Ograniczenia Wierzchołka",
+            self.inform("Tryb Dodawania Ograniczenia Wierzchołka",
                                     "Kliknij na wierzchołek, aby dodać ograniczenie ciągłości.")
         else:
             self.selected_vertex = None
 
-    def on_edge_clicked(self, edge_index, click_pos):
+    def on_edge_clicked(self, shape_id, edge_index, click_pos):
+        # The canvas has made the clicked shape the active one, self.canvas.polygon
         if self.adding_vertex_mode:
             # Optionally, ask user to confirm or adjust position
             # For simplicity, we'll add the vertex at the click position
-            print(f"Edge index: {edge_index}, Click position: {click_pos}")
+            log.debug("Shape %d, edge index: %d, Click position: %s", shape_id, edge_index, click_pos)
             self.add_vertex_on_edge(edge_index, click_pos)
             self.adding_vertex_mode = False
             # Uncheck the add vertex button
@@ -207,7 +290,7 @@ class MainWindow(QMainWindow):
             if remove_bezier_btn:
                 remove_bezier_btn.setChecked(False)
 
-    def on_vertex_clicked(self, vertex_index, pos):
+    def on_vertex_clicked(self, shape_id, vertex_index, pos):
         if self.adding_vertex_continuity_mode:
             
             flag = False
@@ -243,42 +326,46 @@ class MainWindow(QMainWindow):
         x, y = pos.x(), pos.y()
 
         # Insert the new vertex into the polygon
-        self.canvas.polygon.insert_vertex(edge_index, x, y)
+        with self.canvas.profiler.phase('edit'):
+            command = InsertVertex(self.canvas.polygon, edge_index, x, y)
+            self.canvas.polygon.insert_vertex(edge_index, x, y)
+            self.canvas.record(command)
 
         # Update the canvas
         self.canvas.update()
 
     def remove_vertex(self, vertex_index):
-        print(f"Removing vertex at index {vertex_index}")
-
         # Remove constraints related to this vertex and adjacent edges
-        self.remove_constraint_without_information(vertex_index)
-        prev_edge_index = (vertex_index - 1) % len(self.canvas.polygon.vertices)
-        self.remove_constraint_without_information(prev_edge_index)
+        with self.canvas.profiler.phase('edit'):
+            command = RemoveVertex(self.canvas.polygon, vertex_index)
+            self.remove_constraint_without_information(vertex_index)
+            prev_edge_index = (vertex_index - 1) % len(self.canvas.polygon.vertices)
+            self.remove_constraint_without_information(prev_edge_index)
 
-        self.canvas.polygon.remove_vertex(vertex_index)
+            self.canvas.polygon.remove_vertex(vertex_index)
+            self.canvas.record(command)
 
         self.canvas.update()
 
     def add_constraint(self, edge_index, pos):
         clicked_edge = edge_index
-        print(f"Clicked edge: {clicked_edge}")
+        log.debug("Clicked edge: %s", clicked_edge)
         if clicked_edge is not None and clicked_edge not in self.canvas.polygon.bezier_segments:
             # Show possible constraints
             options = ["horizontal", "vertical", "length"]
-            selected_constraint, ok = QInputDialog.getItem(self, "Wybierz Ograniczenie",
-                                                            "Typ ograniczenia:", options, 0, False)
+            selected_constraint, ok = self.ask_item("Wybierz Ograniczenie", "Typ ograniczenia:", options)
             if ok and selected_constraint:
                 # Check for existing constraints
                 if clicked_edge in self.canvas.polygon.constraints:
-                    QMessageBox.information(self, "Info", "Krawędź ma już ograniczenie.")
+                    self.inform("Info", "Krawędź ma już ograniczenie.")
                     return
                 # Add the selected constraint
                 if selected_constraint == "length":
-                    length, ok = QInputDialog.getInt(self, "Długość Ograniczenia",
-                                                    "Podaj długość:", 100, 1, 1000)
+                    length, ok = self.ask_int("Długość Ograniczenia", "Podaj długość:", 100, 1, 1000)
                     if ok:
+                        command = SetConstraint(self.canvas.polygon, clicked_edge, ('length', length))
                         self.canvas.polygon.constraints[clicked_edge] = Constraint('length', length)
+                        self.canvas.record(command)
                 else:
                     # Ensure that two adjacent edges cannot both be vertical or both horizontal
                     if selected_constraint in ["horizontal", "vertical"]:
@@ -292,13 +379,15 @@ class MainWindow(QMainWindow):
                         ]
                         for constraint in constraints:
                             if constraint and constraint.type == selected_constraint:
-                                QMessageBox.warning(self, "Ostrzeżenie",
+                                self.warn("Ostrzeżenie",
                                                     f"Dwoma sąsiednimi krawędziami nie mogą być oba {selected_constraint}.")
                                 return
+                    command = SetConstraint(self.canvas.polygon, clicked_edge, (selected_constraint, None))
                     self.canvas.polygon.constraints[clicked_edge] = Constraint(selected_constraint)
+                    self.canvas.record(command)
                 self.canvas.update()
         else:
-            QMessageBox.information(self, "Info", "Nie można dodać ograniczenia do tej krawędzi.")
+            self.inform("Info", "Nie można dodać ograniczenia do tej krawędzi.")
 
     def remove_constraint_without_information(self, edge_index):
         clicked_edge = edge_index
@@ -309,9 +398,52 @@ class MainWindow(QMainWindow):
     def remove_constraint(self, edge_index):
         clicked_edge = edge_index
         if clicked_edge is not None and clicked_edge in self.canvas.polygon.constraints:
+            command = SetConstraint(self.canvas.polygon, edge_index, None)
             self.remove_constraint_without_information(edge_index)
+            self.canvas.record(command)
         else:
-            QMessageBox.information(self, "Info", "Brak ograniczenia do usunięcia.")
+            self.inform("Info", "Brak ograniczenia do usunięcia.")
+
+    def add_polygon(self):
+        center = self.canvas.to_scene(self.canvas.rect().center())
+        half = max(round(100 / self.canvas.zoom), 1)
+        x, y = round(center.x()), round(center.y())
+        polygon = Polygon()
+        for dx, dy in ((-half, -half), (half, -half), (half, half), (-half, half)):
+            polygon.add_vertex(x + dx, y + dy)
+        self.canvas.add_shape(polygon)
+
+    def open_scene(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Otwórz Scenę", "", SCENE_FILTER)
+        if not path:
+            return
+        try:
+            if path.endswith(".svg"):
+                polygon = path_io.import_svg(path)
+            elif path.endswith((".csv", ".txt")):
+                polygon = path_io.import_points(path)
+            else:
+                polygon = scene_file.load_scene(path)
+        except (OSError, ValueError) as error:
+            self.warn("Błąd", f"Nie można otworzyć sceny: {error}")
+            return
+        self.canvas.set_polygon(polygon)
+
+    def save_scene(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Zapisz Scenę", "", SCENE_FILTER)
+        if not path:
+            return
+        if not path.endswith((".gksc", ".svg", ".csv", ".txt")):
+            path += ".gksc"
+        try:
+            if path.endswith(".svg"):
+                path_io.export_svg(path, self.canvas.polygon)
+            elif path.endswith((".csv", ".txt")):
+                path_io.export_points(path, self.canvas.polygon)
+            else:
+                scene_file.save_scene(path, self.canvas.polygon)
+        except OSError as error:
+            self.warn("Błąd", f"Nie można zapisać sceny: {error}")
 
     def set_bresenham(self, checked):
         self.canvas.bresenham = self.radio_bresenham.isChecked()
@@ -346,9 +478,32 @@ class MainWindow(QMainWindow):
         - Kliknij i przeciągnij wierzchołki (zielone kółka), aby je przesuwać.
         - Kliknij i przeciągnij kontrolne punkty krzywych Béziera (niebieskie kółka), aby edytować krzywe.
 
+        **Widok:**
+        - Kółko myszy przybliża i oddala widok wokół kursora.
+        - Przeciągnij prawym lub środkowym przyciskiem myszy, aby przesunąć widok.
+        - Przycisk "Dopasuj Widok" dopasowuje widok do całego wielokąta.
+
+        **Wiele Wielokątów:**
+        - Przycisk "Dodaj Wielokąt" dodaje nowy kwadrat na środku widoku. Edytowany jest zawsze jeden wielokąt, rysowany na wierzchu; kliknięcie innego wielokąta (krawędzi, wierzchołka lub wnętrza) wybiera go do edycji.
+        - Zapis i odczyt plików dotyczą wybranego wielokąta.
+
+        **Zapis i Odczyt:**
+        - Przyciski "Zapisz Scenę" i "Otwórz Scenę" zapisują i wczytują wielokąt (plik .gksc). Duże sceny otwierają się od razu, dane są doczytywane z pliku w miarę potrzeby.
+        - Wybierz typ pliku .svg, aby zapisać lub wczytać kontur jako ścieżkę SVG (odcinki jako L, krzywe Béziera jako C), albo .csv / .txt dla listy punktów "x,y" w kolejnych wierszach.
+
+        **Profiler:**
+        - Przycisk "Profiler" lub klawisz F3 pokazuje liczbę klatek na sekundę i czas poszczególnych etapów rysowania (średni / maksymalny, w ms).
+        - Uruchom z opcją --profile PLIK, aby co sekundę dopisywać statystyki do pliku, lub z --debug, aby wypisywać komunikaty diagnostyczne.
+        - Opcja --record PLIK zapisuje przebieg sesji (mysz, tryby, odpowiedzi w oknach dialogowych); "python input_trace.py PLIK" odtwarza go bez ekranu i podaje opóźnienia zdarzeń (p50/p95/p99).
+
         **Kontynuacja Krzywych Béziera:**
         - Aktualna implementacja wspiera ciągłość G0, G1 i C1. Ograniczenia wynikające z ciągłości są automatycznie zarządzane.
 
+        **Cofanie i Ponawianie:**
+        - Przyciski "Cofnij" i "Ponów" (Ctrl+Z, Ctrl+Y) cofają i przywracają zmiany: wierzchołki, ograniczenia, krzywe Béziera, ciągłość i przesunięcia.
+        - Jedno przeciągnięcie to jeden krok historii. Najstarsze kroki są usuwane, gdy historia przekroczy limit pamięci.
+        - Otwarcie nowej sceny czyści historię.
+
         **Przesuwanie Całego Wielokąta:**
         - Kliknij i przeciągnij dowolny obszar wielokąta, aby przesunąć cały wielokąt.
 
@@ -361,45 +516,52 @@ class MainWindow(QMainWindow):
     def add_bezier_curve(self, edge_index):
         # Check if the edge has constraints
         if edge_index in self.canvas.polygon.constraints:
-            QMessageBox.warning(self, "Błąd", "Nie można dodać krzywej Béziera do krawędzi z ograniczeniem.")
+            self.warn("Błąd", "Nie można dodać krzywej Béziera do krawędzi z ograniczeniem.")
             return
         # Check if the edge already has a Bezier segment
         if edge_index in self.canvas.polygon.bezier_segments:
-            QMessageBox.information(self, "Info", "Krawędź już ma krzywą Béziera.")
+            self.inform("Info", "Krawędź już ma krzywą Béziera.")
             return
 
         
         # Add a default Bezier segment
         start = self.canvas.polygon.vertices[edge_index].point
         end = self.canvas.polygon.vertices[(edge_index + 1) % len(self.canvas.polygon.vertices)].point
-        print(f"Start: {start}, End: {end}")
+        log.debug("Start: %s, End: %s", start, end)
         control1 = QPoint(start.x() + 50, start.y() - 50)
         control2 = QPoint(end.x() - 50, end.y() + 50)
         bezier = BezierSegment(
             start_vertex=edge_index,
             end_vertex=(edge_index + 1) % len(self.canvas.polygon.vertices),
             control1=control1,
-            control2=control2,
-            continuity='G0'  # Default continuity
+            control2=control2
         )
-        self.canvas.polygon.bezier_segments[edge_index] = bezier
+        with self.canvas.profiler.phase('edit'):
+            command = SetBezier(self.canvas.polygon, edge_index,
+                                ((control1.x(), control1.y()), (control2.x(), control2.y())))
+            self.canvas.polygon.add_bezier(edge_index, bezier)
+            self.canvas.record(command)
         self.canvas.update()
 
     def remove_bezier_curve(self, edge_index):
         if edge_index in self.canvas.polygon.bezier_segments:
-            del self.canvas.polygon.bezier_segments[edge_index]
+            with self.canvas.profiler.phase('edit'):
+                command = SetBezier(self.canvas.polygon, edge_index, None)
+                self.canvas.polygon.remove_bezier(edge_index)
+                self.canvas.record(command)
             self.canvas.update()
         else:
-            QMessageBox.information(self, "Info", "Brak krzywej Béziera do usunięcia.")
+            self.inform("Info", "Brak krzywej Béziera do usunięcia.")
 
     def add_vertex_continuity(self, vertex_index):
         # Prompt user to select continuity type
         options = ["G0", "G1", "C1"]
-        selected_continuity, ok = QInputDialog.getItem(self, "Wybierz Ciągłość",
-                                                       "Typ ciągłości:", options, 0, False)
+        selected_continuity, ok = self.ask_item("Wybierz Ciągłość", "Typ ciągłości:", options)
         if ok and selected_continuity:
             # Assign continuity to the vertex
+            command = SetContinuity(self.canvas.polygon, vertex_index, selected_continuity)
             self.canvas.polygon.add_vertex_continuity(vertex_index, selected_continuity)
+            self.canvas.record(command)
             # self.canvas.polygon.vertices[vertex_index].continuity = selected_continuity
             self.canvas.update()
 
@@ -408,10 +570,27 @@ class MainWindow(QMainWindow):
 # ----- Main Execution -----
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Edytor wielokątów z krzywymi Béziera.")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="turn the profiler on and append its rolling stats to FILE every second")
+    parser.add_argument("--debug", action="store_true", help="print debug messages")
+    parser.add_argument("--record", metavar="FILE",
+                        help="record the session's input to FILE for input_trace.py to replay")
+    args, qt_args = parser.parse_known_args()
+    if args.debug:
+        logging.basicConfig(level=logging.DEBUG, format="%(name)s: %(message)s")
+
+    app = QApplication(sys.argv[:1] + qt_args)
     window = MainWindow()
+    if args.profile:
+        window.canvas.profiler.dump_path = args.profile
+        window.profiler_btn.setChecked(True)
+    recorder = InputRecorder(window, args.record) if args.record else None
     window.show()
-    sys.exit(app.exec_())
+    status = app.exec_()
+    if recorder is not None:
+        recorder.close()
+    sys.exit(status)
 
 if __name__ == '__main__':
     main()
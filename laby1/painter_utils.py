@@ -0,0 +1,80 @@
+from collections import OrderedDict
+
+import numpy as np
+from PyQt5.QtCore import QPointF, QRectF, Qt
+from PyQt5.QtGui import QFont, QFontMetricsF, QPen, QPolygonF, QStaticText, QTransform
+
+
+def array_to_polygonf(points):
+    """Build a QPolygonF from a (k, 2) array by copying straight into its buffer.
+
+    QPolygonF stores its points as contiguous pairs of doubles, so the array is
+    written through a NumPy view of that memory instead of creating k QPointF
+    objects in Python.
+    """
+    polygon = QPolygonF()
+    polygon.fill(QPointF(), len(points))
+    if len(points):
+        buffer = polygon.data()
+        buffer.setsize(len(points) * 2 * 8)
+        np.frombuffer(buffer, dtype=np.float64).reshape(-1, 2)[:] = points
+    return polygon
+
+
+def cosmetic_pen(color, width=1, style=Qt.SolidLine):
+    """Pen `width` pixels wide whatever the painter's zoom."""
+    pen = QPen(color, width, style)
+    pen.setCosmetic(True)
+    return pen
+
+
+class LabelCache:
+    """Bounded LRU cache of laid-out labels as QStaticText, keyed by text and font.
+
+    A label is laid out once and then only drawn, however often it moves.
+    Call set_font() with the painter's font before drawing; labels are laid
+    out in that font until it is changed.
+    """
+
+    def __init__(self, max_size=16384):
+        self.entries = OrderedDict()  # key: (text, font key), value: QStaticText
+        self.max_size = max_size
+        self.font = None
+        self.font_key = None
+        self.ascent = 0.0  # Of the current font, to place text by its baseline
+        self.hits = 0
+        self.misses = 0
+
+    def set_font(self, font):
+        if self.font is None or font != self.font:
+            self.font = QFont(font)
+            self.font_key = font.key()
+            self.ascent = QFontMetricsF(font).ascent()
+
+    def get(self, text):
+        key = (text, self.font_key)
+        static = self.entries.get(key)
+        if static is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return static
+        self.misses += 1
+        static = QStaticText(text)
+        static.setPerformanceHint(QStaticText.AggressiveCaching)
+        static.prepare(QTransform(), self.font)
+        self.entries[key] = static
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return static
+
+    def draw(self, painter, x, y, text):
+        """Draw text with its baseline starting at (x, y), like QPainter.drawText(x, y, text)."""
+        painter.drawStaticText(QPointF(x, y - self.ascent), self.get(text))
+
+    def draw_at(self, painter, x, y, text):
+        """Draw text with its top-left corner at (x, y)."""
+        painter.drawStaticText(x, y, self.get(text))
+
+    def bounding_rect(self, x, y, text):
+        """Rectangle that text drawn by draw_at(x, y) covers."""
+        return QRectF(QPointF(x, y), self.get(text).size())
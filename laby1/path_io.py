@@ -0,0 +1,352 @@
+"""Streaming import/export of outlines as SVG paths and plain-text point lists.
+
+Export writes a polygon chunk by chunk through a buffered file: an SVG
+<path> with straight edges as L and Bezier segments as C commands, or one
+"x,y" line per vertex.
+
+Import reads the file in chunks too, turns each chunk into NumPy arrays
+and builds the polygon in one bulk pass at the end. Paths support the
+M, L, H, V, C and Z commands, absolute and relative, with implicit
+repetition; only the first subpath is read, and malformed data raises a
+ValueError naming the file and the problem. Point lists take one point
+per line, separated by commas and/or whitespace, with '#' comments and
+an optional header line.
+"""
+import re
+
+import numpy as np
+
+from array_polygon import ArrayPolygon
+from scene_file import WRITE_CHUNK, column_chunk, sparse_entries
+
+READ_CHUNK = 1 << 20  # Characters read from the file at a time
+WRITE_BUFFER = 1 << 20
+ARITY = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'Z': 0}  # Numbers per command repetition
+COMMAND = re.compile(r'([MmLlHhVvCcZzQqSsTtAa])')
+NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+DECIMAL_RUN = re.compile(r'(\.\d*)(?=\.)')  # "1.5.5" is two numbers
+# Segment commands, the number of values per repetition and the columns they fill, see PathBuilder.flush()
+SEGMENT_COMMANDS = 'LHVC'
+SEGMENT_ARITY = np.array([2, 1, 1, 6])
+SEGMENT_COLUMNS = ((4, 5), (4,), (5,), (0, 1, 2, 3, 4, 5))
+PATH_START = re.compile(r'<path\b[^>]*?\sd\s*=\s*(["\'])')
+COORDINATE_LIMIT = 2 ** 31 - 1  # Vertices are stored as int32
+
+
+def export_svg(path, polygon, chunk=WRITE_CHUNK):
+    """Write the polygon as a closed SVG path; a pending translation offset is applied."""
+    n = len(polygon.vertices)
+    entries = sparse_entries(polygon)
+    bounds = polygon.bounds()
+    with open(path, 'w', buffering=WRITE_BUFFER) as file:
+        file.write('<svg xmlns="http://www.w3.org/2000/svg"')
+        if bounds is not None:
+            dx, dy = polygon.offset.x(), polygon.offset.y()
+            min_x, min_y, max_x, max_y = bounds
+            file.write(f' viewBox="{min_x + dx:g} {min_y + dy:g} {max_x - min_x:g} {max_y - min_y:g}"')
+        file.write('>\n<path fill="none" stroke="black" d="')
+        if n:
+            first = column_chunk(polygon, 'coords', 0, 1, entries)
+            file.write('M %d,%d' % tuple(np.asarray(first)[0].tolist()))
+            command = None
+            for start in range(0, n, chunk):
+                stop = min(start + chunk, n)
+                command = write_edges(file, polygon, entries, start, stop, first, command)
+            file.write(' Z')
+        file.write('"/>\n</svg>\n')
+
+
+def write_edges(file, polygon, entries, start, stop, first, command):
+    """Path commands for edges start:stop; returns the last command letter, which later edges repeat."""
+    n = len(polygon.vertices)
+    # Edge i ends at vertex i + 1, and the last edge back at the first vertex
+    ends = np.asarray(column_chunk(polygon, 'coords', start + 1, min(stop + 1, n), entries))
+    if stop == n:
+        ends = np.concatenate([ends.reshape(-1, 2), np.asarray(first)])
+    curves = np.asarray(column_chunk(polygon, 'has_bezier', start, stop, entries)).astype(bool)
+    values = np.zeros((stop - start, 6), dtype=np.int64)
+    values[:, 4:] = ends
+    if curves.any():
+        values[curves, :4] = np.asarray(column_chunk(polygon, 'controls', start, stop, entries))[curves].reshape(-1, 4)
+    used = np.ones((stop - start, 6), dtype=bool)
+    used[~curves, :4] = False
+
+    letters = np.where(curves, 'C', 'L')
+    changed = np.empty(len(letters), dtype=bool)
+    changed[0] = letters[0] != command
+    changed[1:] = letters[1:] != letters[:-1]
+    pieces = [(f' {letter} ' if change else ' ') + ('%d,%d %d,%d %d,%d' if letter == 'C' else '%d,%d')
+              for letter, change in zip(letters.tolist(), changed.tolist())]
+    file.write(''.join(pieces) % tuple(values[used].tolist()))
+    return letters[-1]
+
+
+def export_points(path, polygon, chunk=WRITE_CHUNK):
+    """Write one "x,y" line per vertex."""
+    n = len(polygon.vertices)
+    entries = sparse_entries(polygon)
+    with open(path, 'w', buffering=WRITE_BUFFER) as file:
+        for start in range(0, n, chunk):
+            coords = np.asarray(column_chunk(polygon, 'coords', start, min(start + chunk, n), entries))
+            file.write('%d,%d\n' * len(coords) % tuple(coords.ravel().tolist()))
+
+
+class PathBuilder:
+    """Collects the segments of the first subpath of an SVG path.
+
+    Runs of L, H, V and C commands are queued as raw number tokens and
+    turned into absolute segments in one vectorized pass per batch; a
+    relative command counts from the end of the segment before it.
+    """
+
+    def __init__(self):
+        self.start = None  # First point of the subpath
+        self.current = np.zeros(2)  # Current point
+        self.ends = []  # Arrays of segment end points
+        self.controls = []  # Arrays of (control1, control2) per segment, zeros for lines
+        self.curves = []  # Arrays of is-a-curve flags per segment
+        self.runs = []  # (command letter, number of tokens) queued since the last flush
+        self.tokens = []  # Their number tokens, back to back
+        self.done = False  # The first subpath has ended
+
+    def move_to(self, tokens, relative):
+        if self.start is not None:
+            self.flush()
+            self.done = True  # A second subpath
+            return
+        point = to_numbers(tokens) + (self.current if relative else 0)
+        self.start = self.current = point
+
+    def close(self):
+        self.flush()
+        self.done = self.start is not None
+
+    def queue(self, letter, tokens):
+        """Add one run of a command; `tokens` holds whole repetitions of it."""
+        if self.start is None:
+            raise ValueError("path data must start with a moveto")
+        self.runs.append((letter, len(tokens)))
+        self.tokens.extend(tokens)
+
+    def flush(self):
+        if not self.runs:
+            return
+        numbers = to_numbers(self.tokens)
+        letters, counts = zip(*self.runs)
+        self.runs, self.tokens = [], []
+        kinds = np.array([SEGMENT_COMMANDS.index(letter.upper()) for letter in letters])
+        relative = np.array([letter.islower() for letter in letters])
+        counts = np.array(counts)
+        arity = SEGMENT_ARITY[kinds]
+        repeats = counts // arity
+        # Segment k is repetition `within` of run `run`, its numbers start at token `first`
+        run = np.repeat(np.arange(len(letters)), repeats)
+        within = np.arange(len(run)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        first = (np.cumsum(counts) - counts)[run] + within * arity[run]
+        kind, relative = kinds[run], relative[run]
+
+        # Columns: control1 x, y, control2 x, y, end x, y
+        values = np.zeros((len(run), 6))
+        for code, columns in enumerate(SEGMENT_COLUMNS):
+            rows = np.flatnonzero(kind == code)
+            values[np.ix_(rows, columns)] = numbers[first[rows, None] + np.arange(len(columns))]
+        # H and V keep the other coordinate: a relative step of zero
+        absolute = np.column_stack([~relative & (kind != SEGMENT_COMMANDS.index('V')),
+                                    ~relative & (kind != SEGMENT_COMMANDS.index('H'))])
+        ends = running_position(values[:, 4:], absolute, self.current)
+        starts = np.vstack([self.current[None, :], ends[:-1]])
+        controls = values[:, :4].reshape(-1, 2, 2)
+        controls[relative] += starts[relative][:, None, :]
+        self.ends.append(ends)
+        self.controls.append(controls)
+        self.curves.append(kind == SEGMENT_COMMANDS.index('C'))
+        self.current = ends[-1]
+
+    def build(self, polygon_class):
+        self.flush()
+        if self.start is None:
+            raise ValueError("no path data")
+        ends = np.concatenate(self.ends) if self.ends else np.zeros((0, 2))
+        controls = np.concatenate(self.controls) if self.controls else np.zeros((0, 2, 2))
+        curves = np.concatenate(self.curves) if self.curves else np.zeros(0, dtype=bool)
+        points = np.vstack([self.start[None, :], ends])
+        if np.abs(points).max() > COORDINATE_LIMIT or np.abs(controls).max(initial=0) > COORDINATE_LIMIT:
+            raise ValueError("path coordinates out of range")
+        if len(points) > 1 and np.array_equal(np.rint(points[-1]), np.rint(points[0])):
+            points = points[:-1]  # The last segment returns to the start: it is the closing edge
+        else:
+            curves = np.append(curves, False)  # Closed by a straight edge
+            controls = np.concatenate([controls, np.zeros((1, 2, 2))])
+        polygon = polygon_class()
+        polygon.add_vertices(np.rint(points).astype(np.int32))
+        edges = np.flatnonzero(curves)
+        if len(edges):
+            polygon.add_beziers(edges, np.rint(controls[edges]).astype(np.int32))
+        return polygon
+
+
+def to_numbers(tokens):
+    """Path data number tokens as a float array; anything else raises a ValueError naming the token."""
+    try:
+        numbers = np.array(tokens, dtype=float)
+    except ValueError:
+        numbers = None
+    if numbers is None or not np.isfinite(numbers).all():
+        bad = next(token for token in tokens if not NUMBER.fullmatch(token))
+        raise ValueError(f"bad number {bad!r} in path data")
+    return numbers
+
+
+def running_position(steps, absolute, current):
+    """Positions after each step, per axis: absolute steps set it, the others add to it."""
+    count = len(steps)
+    relative = np.where(absolute, 0, steps)
+    total = np.cumsum(relative, axis=0)
+    # Index of the last absolute step at or before each step, -1 if none
+    last = np.maximum.accumulate(np.where(absolute, np.arange(count)[:, None], -1), axis=0)
+    found = last >= 0
+    anchor = np.where(found, np.take_along_axis(steps - total, np.maximum(last, 0), axis=0), current)
+    return anchor + total
+
+
+def read_chunks(path):
+    with open(path, 'r') as file:
+        while True:
+            text = file.read(READ_CHUNK)
+            if not text:
+                return
+            yield text
+
+
+def import_svg(path, polygon_class=ArrayPolygon):
+    """Read the first subpath of the first <path> element of an SVG file."""
+    try:
+        return read_path(path).build(polygon_class)
+    except ValueError as error:
+        raise ValueError(f"{path}: {error}") from None
+
+
+def read_path(path):
+    """Parse the d attribute of the first <path> element into a PathBuilder."""
+    builder = PathBuilder()
+    buffer = ''
+    quote = None  # Quote character closing the d attribute, once it has been found
+    letter = None  # Command whose repetitions are still running
+    pending = []  # Number tokens of an incomplete repetition
+    chunks = read_chunks(path)
+    for text in chunks:
+        buffer += text
+        if quote is None:
+            match = PATH_START.search(buffer)
+            if match is None:
+                buffer = buffer[-1024:]  # A tag may be split across chunks
+                continue
+            quote = match.group(1)
+            buffer = buffer[match.end():]
+        end = buffer.find(quote)
+        if end >= 0:
+            data, buffer = buffer[:end], ''
+        else:
+            # Hold back a number that may continue in the next chunk
+            cut = max(buffer.rfind(' '), buffer.rfind(','), buffer.rfind('\n')) + 1
+            data, buffer = buffer[:cut], buffer[cut:]
+        letter, pending = parse_path_data(builder, data, letter, pending)
+        if end >= 0 or builder.done:
+            break
+    chunks.close()
+    if quote is None:
+        raise ValueError("no <path d=...> element")
+    if buffer and not builder.done:
+        letter, pending = parse_path_data(builder, buffer, letter, pending)  # The file ended inside the attribute
+    if pending and not builder.done:
+        raise ValueError(f"path command {letter!r} is missing numbers")
+    return builder
+
+
+def parse_path_data(builder, data, letter, pending):
+    """Feed a piece of path data to `builder`; returns the (command, incomplete tokens) to carry on."""
+    data = split_numbers(data)
+    parts = COMMAND.split(data)
+    # parts alternates: numbers of the running command, letter, its numbers, letter, ...
+    for i in range(0, len(parts), 2):
+        if i:
+            if pending:
+                raise ValueError(f"path command {letter!r} is missing numbers")
+            letter = parts[i - 1]
+            if letter.upper() not in ARITY:
+                raise ValueError(f"unsupported path command {letter!r}")
+            if builder.start is None and letter not in 'Mm':
+                raise ValueError("path data must start with a moveto")
+            if letter in 'Zz':
+                builder.close()
+                return letter, pending
+        tokens = pending + parts[i].split()
+        pending = []
+        if not tokens:
+            continue
+        if letter is None or letter in 'Zz':
+            raise ValueError("numbers without a command in path data")
+        if letter in 'Mm':
+            if len(tokens) < 2:
+                pending = tokens
+                continue
+            builder.move_to(tokens[:2], letter == 'm')
+            if builder.done:
+                return letter, pending
+            letter = 'L' if letter == 'M' else 'l'  # Repeated pairs after a moveto are line-tos
+            tokens = tokens[2:]
+        full = len(tokens) - len(tokens) % ARITY[letter.upper()]
+        if full:
+            builder.queue(letter, tokens[:full])
+        pending = tokens[full:]
+    return letter, pending
+
+
+def split_numbers(data):
+    """Separate the numbers of path data by spaces only; "10-5" and "1.5.5" are two numbers each."""
+    data = data.replace(',', ' ')
+    for sign in '-+':
+        if sign in data:  # Plain replaces, much faster than a regular expression on megabytes
+            data = data.replace(sign, ' ' + sign).replace('e ' + sign, 'e' + sign).replace('E ' + sign, 'E' + sign)
+    if '.' in data:
+        data = DECIMAL_RUN.sub(r'\1 ', data)
+    return data
+
+
+def import_points(path, polygon_class=ArrayPolygon):
+    """Read a CSV or whitespace separated list of x y points, one per line."""
+    parts = []
+    carry = ''
+    first = True
+    for text in read_chunks(path):
+        text = carry + text
+        cut = text.rfind('\n') + 1
+        text, carry = text[:cut], text[cut:]
+        if first and text:
+            text, first = skip_header(text), False
+        parts.append(parse_points(text))
+    if carry:
+        parts.append(parse_points(skip_header(carry) if first else carry))
+    values = np.concatenate(parts) if parts else np.zeros(0)
+    if len(values) % 2:
+        raise ValueError(f"{path}: odd number of coordinates")
+    polygon = polygon_class()
+    polygon.add_vertices(np.rint(values.reshape(-1, 2)).astype(np.int32))
+    return polygon
+
+
+def skip_header(text):
+    """Drop a first line like "x,y" that holds no numbers."""
+    line, _, rest = text.partition('\n')
+    if line.strip() and not NUMBER.search(line) and not line.lstrip().startswith('#'):
+        return rest
+    return text
+
+
+def parse_points(text):
+    if '#' in text:
+        text = '\n'.join(line.partition('#')[0] for line in text.split('\n'))
+    try:
+        return np.array(text.replace(',', ' ').split(), dtype=float)
+    except ValueError as error:
+        raise ValueError(f"not a point list: {error}") from None
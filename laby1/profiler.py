@@ -0,0 +1,143 @@
+import json
+import time
+import logging
+from collections import deque
+
+# Debug output of the editor; silent unless logging is configured at DEBUG (main.py --debug)
+log = logging.getLogger("laby1")
+
+
+class NullPhase:
+    """What Profiler.phase() hands out while profiling is off: a with-block that does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_PHASE = NullPhase()
+
+
+class Phase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+        self.children = 0.0  # Time spent in phases nested inside this one
+
+    def __enter__(self):
+        self.profiler.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        profiler = self.profiler
+        profiler.stack.pop()
+        if profiler.stack:
+            profiler.stack[-1].children += elapsed
+        profiler.record(self.name, elapsed - self.children)
+        return False
+
+
+class Profiler:
+    """Times named phases of paints and of the other hot paths while enabled.
+
+    Code wraps its phases in `with profiler.phase(name):`. While profiling
+    is off that returns a shared do-nothing object, so the instrumentation
+    can stay in the hot paths. Nested phases count exclusively: the time of
+    an inner phase is not counted again in the outer one.
+
+    Phases inside begin_frame()/end_frame() add up to a per-frame breakdown;
+    the rest (hit tests, edits, constraint work) are kept per call. Both
+    are rolling windows of the last `history` entries.
+    """
+
+    def __init__(self, history=240):
+        self.enabled = False
+        self.history = history
+        self.stack = []  # Phases currently open, innermost last
+        self.frames = deque(maxlen=history)  # (start time, seconds, {phase: seconds}) of recent paints
+        self.samples = {}  # key: phase name, value: deque of seconds per frame or per call
+        self.current = None  # {phase: seconds} of the frame being painted
+        self.frame_start = 0.0
+        self.dump_path = None  # File the rolling stats are appended to, one JSON line per dump
+        self.dump_interval = 1.0  # Seconds between dumps
+        self.last_dump = 0.0
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_PHASE
+        return Phase(self, name)
+
+    def record(self, name, seconds):
+        if self.current is not None:
+            self.current[name] = self.current.get(name, 0.0) + seconds
+            return
+        self.sample(name, seconds)
+
+    def sample(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.history)
+        samples.append(seconds)
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self.current is None:
+            return
+        now = time.perf_counter()
+        phases, self.current = self.current, None
+        self.frames.append((self.frame_start, now - self.frame_start, phases))
+        for name, seconds in phases.items():
+            self.sample(name, seconds)
+        if self.dump_path is not None and now - self.last_dump >= self.dump_interval:
+            self.dump()
+            self.last_dump = now
+
+    def reset(self):
+        self.frames.clear()
+        self.samples = {}
+
+    def fps(self):
+        """Paints per second over the recent frames, or 0 with fewer than two."""
+        if len(self.frames) < 2:
+            return 0.0
+        span = self.frames[-1][0] - self.frames[0][0]
+        return (len(self.frames) - 1) / span if span > 0 else 0.0
+
+    def stats(self):
+        """{phase: (calls, mean seconds, max seconds)} over the recent samples, plus 'frame'."""
+        stats = {name: (len(s), sum(s) / len(s), max(s)) for name, s in self.samples.items() if s}
+        if self.frames:
+            totals = [seconds for _, seconds, _ in self.frames]
+            stats['frame'] = (len(totals), sum(totals) / len(totals), max(totals))
+        return stats
+
+    def report_lines(self):
+        """Text for the on-canvas overlay: FPS, then mean/max milliseconds per phase."""
+        stats = self.stats()
+        lines = [f"FPS {self.fps():.1f}"]
+        names = (['frame'] if 'frame' in stats else []) + sorted(name for name in stats if name != 'frame')
+        for name in names:
+            _, mean, peak = stats[name]
+            lines.append(f"{name:<12} {mean * 1e3:7.2f} / {peak * 1e3:7.2f} ms")
+        return lines
+
+    def dump(self):
+        """Append the current rolling stats to dump_path as one JSON line."""
+        record = {
+            'time': time.time(),
+            'fps': self.fps(),
+            'phases': {name: {'calls': calls, 'mean_ms': mean * 1e3, 'max_ms': peak * 1e3}
+                       for name, (calls, mean, peak) in self.stats().items()},
+        }
+        with open(self.dump_path, 'a') as file:
+            file.write(json.dumps(record) + '\n')
@@ -0,0 +1,96 @@
+import numpy as np
+from PyQt5.QtGui import QImage
+
+BLACK = 0xFF000000  # premultiplied ARGB
+
+
+def bresenham_line(x0, y0, x1, y1):
+    """Generate points on a line using Bresenham's algorithm, one pixel at a time."""
+    points = []
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    x, y = x0, y0
+    sx = -1 if x0 > x1 else 1
+    sy = -1 if y0 > y1 else 1
+    if dy <= dx:
+        err = dx / 2.0
+        while x != x1:
+            points.append((x, y))
+            err -= dy
+            if err < 0:
+                y += sy
+                err += dx
+            x += sx
+    else:
+        err = dy / 2.0
+        while y != y1:
+            points.append((x, y))
+            err -= dx
+            if err < 0:
+                x += sx
+                err += dy
+            y += sy
+    points.append((x1, y1))
+    return points
+
+
+def bresenham_lines(x0, y0, x1, y1):
+    """Rasterize many lines at once with Bresenham's algorithm, integer arithmetic only.
+
+    Takes int arrays of endpoints and returns (xs, ys) arrays with the pixels
+    of every line, in the same order bresenham_line produces them.
+
+    Doubling the error term of the classic loop (err = dx / 2.0) keeps it
+    integral: starting from err = dx and subtracting 2 * dy per step, the
+    minor axis has advanced ceil((2 * k * dy - dx) / (2 * dx)) times after k
+    major steps, so every pixel can be computed directly instead of stepping.
+    """
+    x0, y0, x1, y1 = (np.asarray(a, dtype=np.int64) for a in (x0, y0, x1, y1))
+    dx = np.abs(x1 - x0)
+    dy = np.abs(y1 - y0)
+    sx = np.where(x0 > x1, -1, 1)
+    sy = np.where(y0 > y1, -1, 1)
+    x_major = dy <= dx
+    major = np.where(x_major, dx, dy)
+    minor = np.where(x_major, dy, dx)
+
+    counts = major + 1
+    offsets = np.cumsum(counts) - counts
+    k = np.arange(counts.sum()) - np.repeat(offsets, counts)
+    major_k = np.repeat(major, counts)
+    m = (2 * k * np.repeat(minor, counts) + major_k - 1) // np.maximum(2 * major_k, 1)
+    m = np.maximum(m, 0)  # single-pixel lines
+
+    x_major_k = np.repeat(x_major, counts)
+    xs = np.repeat(x0, counts) + np.repeat(sx, counts) * np.where(x_major_k, k, m)
+    ys = np.repeat(y0, counts) + np.repeat(sy, counts) * np.where(x_major_k, m, k)
+    return xs, ys
+
+
+class Framebuffer:
+    """uint32 pixel array that a QImage wraps without copying, blitted once per frame."""
+
+    def __init__(self, width, height):
+        self.pixels = np.zeros((height, width), dtype=np.uint32)
+        # The QImage points into self.pixels, which must outlive it
+        self.image = QImage(self.pixels.data, width, height, width * 4,
+                            QImage.Format_ARGB32_Premultiplied)
+
+    @property
+    def width(self):
+        return self.pixels.shape[1]
+
+    @property
+    def height(self):
+        return self.pixels.shape[0]
+
+    def clear(self):
+        self.pixels.fill(0)
+
+    def draw_lines(self, starts, ends, color=BLACK):
+        """Rasterize all lines given as (n, 2) int arrays of start and end points."""
+        if len(starts) == 0:
+            return
+        xs, ys = bresenham_lines(starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1])
+        visible = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        self.pixels[ys[visible], xs[visible]] = color
@@ -0,0 +1,148 @@
+import itertools
+
+import numpy as np
+
+from spatial_index import SpatialGrid
+
+LARGE_SHAPE_CELLS = 64  # Shapes whose boxes span more grid cells are kept in a list instead
+
+
+class Scene:
+    """Independent polygons ("shapes") under stable integer ids, with a grid over their bounding boxes.
+
+    Each shape's box (vertices and control points, with its pending offset
+    applied) and outline coordinates are cached, so painting and hit tests
+    can cull whole shapes without touching their vertices. Call
+    update_bounds() after editing a shape; translate() keeps the cache in
+    step by itself. Shapes are drawn in id order, which is the order they
+    were added in.
+
+    A shape much bigger than a grid cell would fill thousands of cells, so
+    those few are kept aside and checked on every query.
+    """
+
+    def __init__(self, polygons=(), cell_size=256):
+        self.shapes = {}  # key: shape id, value: Polygon
+        self.boxes = {}  # key: shape id, value: (min_x, min_y, max_x, max_y), None while empty
+        self.outlines = {}  # key: shape id, value: (n, 2) array of its vertex coordinates
+        self.grid = SpatialGrid(cell_size)
+        self.large = set()  # Ids of the shapes spanning more than LARGE_SHAPE_CELLS cells
+        self._ids = itertools.count()
+        for polygon in polygons:
+            self.add(polygon)
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def __iter__(self):
+        return iter(self.shapes)
+
+    def __contains__(self, shape_id):
+        return shape_id in self.shapes
+
+    def __getitem__(self, shape_id):
+        return self.shapes[shape_id]
+
+    def add(self, polygon):
+        """Add a shape and return its id."""
+        shape_id = next(self._ids)
+        self.shapes[shape_id] = polygon
+        self.update_bounds(shape_id)
+        return shape_id
+
+    def add_many(self, polygons):
+        """Add many shapes at once, filling the grid in bulk; returns their ids."""
+        added = []
+        ids, boxes = [], []  # Of the non-empty shapes, which go into the grid
+        for polygon in polygons:
+            shape_id = next(self._ids)
+            self.shapes[shape_id] = polygon
+            coords = self.outlines[shape_id] = polygon.coordinates()
+            box = self.boxes[shape_id] = self.measure(polygon, coords)
+            added.append(shape_id)
+            if box is not None and self.is_large(box):
+                self.large.add(shape_id)
+            elif box is not None:
+                ids.append(shape_id)
+                boxes.append(box)
+        if ids:
+            min_x, min_y, max_x, max_y = np.array(boxes, dtype=float).T
+            self.grid.bulk_insert(ids, min_x, min_y, max_x, max_y)
+        return added
+
+    def remove(self, shape_id):
+        """Take a shape out of the scene and return it."""
+        self.grid.remove(shape_id)
+        self.large.discard(shape_id)
+        self.boxes.pop(shape_id)
+        self.outlines.pop(shape_id)
+        return self.shapes.pop(shape_id)
+
+    def measure(self, polygon, coords):
+        """Box of a shape's vertices `coords` and control points, with its offset applied."""
+        if len(coords) == 0:
+            return None
+        _, control_points = polygon.all_bezier_control_points()
+        points = np.vstack([coords, control_points[:, 1:3].reshape(-1, 2)])
+        dx, dy = polygon.offset.x(), polygon.offset.y()
+        min_x, min_y = points.min(axis=0).tolist()
+        max_x, max_y = points.max(axis=0).tolist()
+        return min_x + dx, min_y + dy, max_x + dx, max_y + dy
+
+    def update_bounds(self, shape_id):
+        """Refresh the cached box and outline of a shape after it was edited."""
+        polygon = self.shapes[shape_id]
+        coords = self.outlines[shape_id] = polygon.coordinates()
+        self.place(shape_id, self.measure(polygon, coords))
+
+    def is_large(self, box):
+        size = self.grid.cell_size
+        return ((box[2] - box[0]) // size + 2) * ((box[3] - box[1]) // size + 2) > LARGE_SHAPE_CELLS
+
+    def place(self, shape_id, box):
+        """Store a shape's new box and put it in the grid or among the large shapes."""
+        self.boxes[shape_id] = box
+        if box is not None and not self.is_large(box):
+            self.large.discard(shape_id)
+            self.grid.move(shape_id, *box)
+            return
+        self.grid.remove(shape_id)
+        if box is None:
+            self.large.discard(shape_id)
+        else:
+            self.large.add(shape_id)
+
+    def translate(self, shape_id, delta):
+        """Move a whole shape; O(1) for the shape, re-bucketing only its box."""
+        polygon = self.shapes[shape_id]
+        polygon.translate(delta)
+        box = self.boxes[shape_id]
+        if box is not None:
+            dx, dy = delta.x(), delta.y()
+            self.place(shape_id, (box[0] + dx, box[1] + dy, box[2] + dx, box[3] + dy))
+
+    def find_in_rect(self, min_x, min_y, max_x, max_y):
+        """Ids of the shapes whose boxes intersect the rectangle, in drawing order."""
+        boxes = self.boxes
+        found = []
+        for shape_id in self.grid.query_rect(min_x, min_y, max_x, max_y) | self.large:
+            box = boxes[shape_id]
+            if box[0] <= max_x and box[2] >= min_x and box[1] <= max_y and box[3] >= min_y:
+                found.append(shape_id)
+        found.sort()
+        return found
+
+    def count_in_rect(self, min_x, min_y, max_x, max_y):
+        """Upper bound on the number of shapes in the rectangle, from the grid cells."""
+        return self.grid.count_rect(min_x, min_y, max_x, max_y) + len(self.large)
+
+    def find_at(self, x, y, radius):
+        """Ids of the shapes whose boxes come within `radius` of (x, y), topmost first."""
+        return self.find_in_rect(x - radius, y - radius, x + radius, y + radius)[::-1]
+
+    def bounds(self):
+        """(min_x, min_y, max_x, max_y) over every shape, or None when all are empty."""
+        boxes = np.array([box for box in self.boxes.values() if box is not None], dtype=float)
+        if len(boxes) == 0:
+            return None
+        return (*boxes[:, :2].min(axis=0).tolist(), *boxes[:, 2:].max(axis=0).tolist())
@@ -0,0 +1,164 @@
+"""Binary scene files: one polygon as packed little-endian column arrays.
+
+Layout (version 1), every integer little-endian:
+
+    header    64 bytes: magic b'GKSC', version u16, header size u16,
+              vertex count u64, then the file offset (u64) of each column
+    columns   in COLUMNS order, each starting on a 64-byte boundary:
+        coords            (n, 2)    int32   vertex positions
+        continuity        (n,)      uint8   code into CONTINUITY_NAMES
+        constraint_type   (n,)      uint8   code into CONSTRAINT_NAMES, 0 = none
+        constraint_value  (n,)      int32   length for 'length' constraints
+        has_bezier        (n,)      uint8   edge i is a Bezier segment
+        controls          (n, 2, 2) int32   control1, control2 of that segment
+
+Constraints and curves are stored per edge, the edge starting at the
+vertex with the same index. These are ArrayPolygon's own columns, so
+load_scene() hands out memory maps of the file as its storage; opening
+is immediate and pages are read when first touched.
+"""
+import os
+import struct
+from bisect import bisect_left
+
+import numpy as np
+
+from array_polygon import ArrayPolygon, CONTINUITY_CODES, CONSTRAINT_CODES
+
+SCENE_MAGIC = b'GKSC'
+SCENE_VERSION = 1
+HEADER = struct.Struct('<4sHHQ6Q')
+HEADER_SIZE = 64
+ALIGNMENT = 64
+WRITE_CHUNK = 65536  # Vertices per chunk the writer converts at a time
+
+# name, dtype on disk, shape of one row
+COLUMNS = (
+    ('coords', np.dtype('<i4'), (2,)),
+    ('continuity', np.dtype('u1'), ()),
+    ('constraint_type', np.dtype('u1'), ()),
+    ('constraint_value', np.dtype('<i4'), ()),
+    ('has_bezier', np.dtype('u1'), ()),
+    ('controls', np.dtype('<i4'), (2, 2)),
+)
+ROW_SHAPES = {name: shape for name, _, shape in COLUMNS}
+
+
+def column_offsets(n):
+    """File offset of each column for a scene of n vertices, and the total file size."""
+    offsets = []
+    position = HEADER_SIZE
+    for _, dtype, shape in COLUMNS:
+        position = -(-position // ALIGNMENT) * ALIGNMENT
+        offsets.append(position)
+        position += n * dtype.itemsize * int(np.prod(shape, dtype=int))
+    return offsets, position
+
+
+def array_chunk(polygon, name, start, stop):
+    """Rows start:stop of one column of an ArrayPolygon, with its pending offset applied."""
+    chunk = getattr(polygon, name)[start:stop]
+    if name in ('coords', 'controls') and not polygon.offset.isNull():
+        chunk = chunk + (polygon.offset.x(), polygon.offset.y())
+    return chunk
+
+
+def object_chunk(polygon, name, start, stop, constraints, beziers):
+    """Rows start:stop of one column, read from the Vertex/BezierSegment objects of a Polygon."""
+    dx, dy = polygon.offset.x(), polygon.offset.y()
+    if name == 'coords':
+        return [(v.point.x() + dx, v.point.y() + dy) for v in polygon.vertices[start:stop]]
+    if name == 'continuity':
+        return [CONTINUITY_CODES[v.continuity] for v in polygon.vertices[start:stop]]
+    # Constraints and curves are sparse: only the entries falling in this chunk are looked at
+    column = np.zeros((stop - start,) + ROW_SHAPES[name], dtype=np.int64)
+    entries = constraints if name.startswith('constraint') else beziers
+    first = bisect_left(entries, (start,))
+    for edge, item in entries[first:bisect_left(entries, (stop,), first)]:
+        if name == 'constraint_type':
+            column[edge - start] = CONSTRAINT_CODES[item.type]
+        elif name == 'constraint_value':
+            column[edge - start] = item.value or 0
+        elif name == 'has_bezier':
+            column[edge - start] = 1
+        else:
+            column[edge - start] = ((item.control1.x() + dx, item.control1.y() + dy),
+                                    (item.control2.x() + dx, item.control2.y() + dy))
+    return column
+
+
+def sparse_entries(polygon):
+    """(constraints, curves) of a Polygon as (edge, item) lists sorted by edge, for column_chunk()."""
+    if isinstance(polygon, ArrayPolygon):
+        return None
+    key = lambda entry: entry[0]
+    return sorted(polygon.constraints.items(), key=key), sorted(polygon.bezier_segments.items(), key=key)
+
+
+def column_chunk(polygon, name, start, stop, entries):
+    """Rows start:stop of one scene column of either kind of polygon; `entries` from sparse_entries()."""
+    if entries is None:
+        return array_chunk(polygon, name, start, stop)
+    return object_chunk(polygon, name, start, stop, *entries)
+
+
+def save_scene(path, polygon, chunk=WRITE_CHUNK):
+    """Write `polygon` (a Polygon or an ArrayPolygon) to `path`.
+
+    Columns are converted and written `chunk` vertices at a time, so the
+    writer never builds a second copy of the whole polygon. A pending
+    translation offset is applied to what is written.
+
+    The file is written under a temporary name and then renamed over
+    `path`, so a scene that is still memory-mapped from `path` can be
+    saved back to it.
+    """
+    n = len(polygon.vertices)
+    offsets, size = column_offsets(n)
+    entries = sparse_entries(polygon)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(HEADER.pack(SCENE_MAGIC, SCENE_VERSION, HEADER_SIZE, n, *offsets).ljust(HEADER_SIZE, b'\0'))
+        for (name, dtype, shape), offset in zip(COLUMNS, offsets):
+            file.write(b'\0' * (offset - file.tell()))
+            for start in range(0, n, chunk):
+                rows = column_chunk(polygon, name, start, min(start + chunk, n), entries)
+                file.write(np.asarray(rows).astype(dtype, copy=False).tobytes())
+        file.truncate(size)
+    os.replace(temporary, path)
+
+
+def read_header(path):
+    """(vertex count, column offsets) of a scene file, checking its magic, version and size."""
+    with open(path, 'rb') as file:
+        data = file.read(HEADER_SIZE)
+        file.seek(0, 2)
+        file_size = file.tell()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: not a scene file")
+    magic, version, header_size, n, *offsets = HEADER.unpack_from(data)
+    if magic != SCENE_MAGIC:
+        raise ValueError(f"{path}: not a scene file")
+    if version != SCENE_VERSION:
+        raise ValueError(f"{path}: unsupported scene version {version}")
+    expected, size = column_offsets(n)
+    if header_size != HEADER_SIZE or offsets != expected or file_size < size:
+        raise ValueError(f"{path}: truncated or corrupt scene file")
+    return n, offsets
+
+
+def load_scene(path):
+    """Open a scene file as an ArrayPolygon backed by copy-on-write memory maps of it.
+
+    Nothing is read up front. Edits stay in memory and never reach the file;
+    growing the polygon moves it into ordinary arrays.
+    """
+    n, offsets = read_header(path)
+    if n == 0:
+        return ArrayPolygon()
+    columns = {}
+    for (name, dtype, shape), offset in zip(COLUMNS, offsets):
+        if name == 'has_bezier':
+            dtype = np.dtype(bool)  # Same single byte, read as 0/1
+        columns[name] = np.memmap(path, dtype=dtype, mode='c', offset=offset, shape=(n,) + shape)
+    return ArrayPolygon.from_storage(n, columns)
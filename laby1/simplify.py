@@ -0,0 +1,75 @@
+import numpy as np
+
+from geometry import pairwise_segment_distances
+
+DP_FLOOR = 0.05  # Default deviation below which douglas_peucker_importance stops splitting
+
+
+def douglas_peucker_importance(points, floor=DP_FLOOR):
+    """Tolerance at which each vertex of a closed outline drops out of its Douglas-Peucker simplification.
+
+    Simplifying to tolerance eps keeps exactly the vertices with importance
+    >= eps, so the whole hierarchy of simplifications comes from one array
+    and picking a level is a single comparison.
+
+    Instead of recursing, every open interval is split in the same pass:
+    the interior points of all intervals are measured against their chords
+    at once and each interval is split at its farthest point. That is one
+    vectorized pass per level of the recursion. A split point's importance
+    is capped by its parent's, so coarser levels are subsets of finer ones.
+
+    Intervals whose points all lie within `floor` of the chord are not split
+    further; their interior keeps importance 0. This stops long runs of
+    (nearly) collinear or duplicate points from recursing one point at a time.
+    The hierarchy is therefore only exact for tolerances >= floor; below
+    that, also keep the vertices with importance 0.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    importance = np.full(n, np.inf)
+    if n <= 3:
+        return importance
+    importance[:] = 0
+    # Anchor the ring at vertex 0 and the vertex farthest from it
+    far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+    ring = np.vstack([points, points[:1]])  # Index n is vertex 0 again
+    starts = np.array([0, far])
+    ends = np.array([far, n])
+    caps = np.array([np.inf, np.inf])
+
+    while True:
+        open_ = ends - starts > 1
+        starts, ends, caps = starts[open_], ends[open_], caps[open_]
+        if len(starts) == 0:
+            break
+        counts = ends - starts - 1
+        offsets = np.cumsum(counts) - counts
+        owner = np.repeat(np.arange(len(starts)), counts)
+        interior = np.arange(counts.sum()) - offsets[owner] + starts[owner] + 1
+        distances = pairwise_segment_distances(ring[interior], ring[starts[owner]], ring[ends[owner]])
+
+        # Farthest interior point of every interval; ties go to the first
+        farthest = np.maximum.reduceat(distances, offsets)
+        is_max = np.flatnonzero(distances == farthest[owner])
+        first = is_max[np.r_[True, np.diff(owner[is_max]) != 0]]
+        split = interior[first]
+        level = np.minimum(distances[first], caps)
+
+        deep = level >= floor
+        starts, split, ends, level = starts[deep], split[deep], ends[deep], level[deep]
+        importance[split] = level
+        starts, ends = np.concatenate([starts, split]), np.concatenate([split, ends])
+        caps = np.concatenate([level, level])
+    importance[[0, far]] = np.inf
+    return importance
+
+
+def thin_points(points, spacing):
+    """Indices of a subset of points at most one per `spacing`-sized grid cell, in order."""
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.int64)
+    cells = np.floor(np.asarray(points) / spacing).astype(np.int64)
+    cells -= cells.min(axis=0)
+    keys = cells[:, 0] * (int(cells[:, 1].max()) + 1) + cells[:, 1]
+    _, first = np.unique(keys, return_index=True)
+    return np.sort(first)
@@ -0,0 +1,203 @@
+import numpy as np
+
+from bezier_math import bezier_bounds
+
+
+class SpatialGrid:
+    """Uniform grid that buckets items by the cells their bounding boxes overlap."""
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}  # key: (cx, cy), value: set of items
+        self.item_cells = {}  # key: item, value: tuple of cells holding it
+        self.offset_x = 0  # Translation of the whole grid, so moving everything is O(1)
+        self.offset_y = 0
+
+    def cells_for(self, min_x, min_y, max_x, max_y):
+        size = self.cell_size
+        x0 = int((min_x - self.offset_x) // size)
+        y0 = int((min_y - self.offset_y) // size)
+        x1 = int((max_x - self.offset_x) // size)
+        y1 = int((max_y - self.offset_y) // size)
+        if x0 == x1 and y0 == y1:
+            return ((x0, y0),)
+        return tuple((cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1))
+
+    def insert(self, item, min_x, min_y, max_x, max_y):
+        cells = self.cells_for(min_x, min_y, max_x, max_y)
+        self.item_cells[item] = cells
+        for cell in cells:
+            bucket = self.cells.get(cell)
+            if bucket is None:
+                self.cells[cell] = {item}
+            else:
+                bucket.add(item)
+
+    def bulk_insert(self, items, min_x, min_y, max_x, max_y):
+        """Insert many items at once from arrays of bounding boxes.
+
+        Items that fit in a single cell (nearly all of them for short edges
+        and every point) are grouped by cell with one sort instead of a
+        Python-level insert each.
+        """
+        size = self.cell_size
+        x0 = ((np.asarray(min_x) - self.offset_x) // size).astype(np.int64)
+        y0 = ((np.asarray(min_y) - self.offset_y) // size).astype(np.int64)
+        x1 = ((np.asarray(max_x) - self.offset_x) // size).astype(np.int64)
+        y1 = ((np.asarray(max_y) - self.offset_y) // size).astype(np.int64)
+        single = np.flatnonzero((x0 == x1) & (y0 == y1))
+        objects = np.empty(len(items), dtype=object)
+        objects[:] = items
+
+        order = single[np.lexsort((y0[single], x0[single]))]
+        cxs, cys = x0[order].tolist(), y0[order].tolist()
+        cells = list(zip(cxs, cys))
+        self.item_cells.update(zip(objects[order].tolist(), ((cell,) for cell in cells)))
+        if len(order):
+            change = np.flatnonzero((np.diff(x0[order]) != 0) | (np.diff(y0[order]) != 0)) + 1
+            for start, end in zip([0] + change.tolist(), change.tolist() + [len(order)]):
+                bucket = self.cells.setdefault(cells[start], set())
+                bucket.update(objects[order[start:end]].tolist())
+
+        spanning = np.ones(len(items), dtype=bool)
+        spanning[single] = False
+        for i in np.flatnonzero(spanning).tolist():
+            self.insert(items[i], min_x[i], min_y[i], max_x[i], max_y[i])
+
+    def remove(self, item):
+        for cell in self.item_cells.pop(item, ()):
+            bucket = self.cells[cell]
+            bucket.discard(item)
+            if not bucket:
+                del self.cells[cell]
+
+    def move(self, item, min_x, min_y, max_x, max_y):
+        """Re-bucket an item whose bounding box changed; a no-op while it stays in the same cells."""
+        if self.item_cells.get(item) == self.cells_for(min_x, min_y, max_x, max_y):
+            return
+        self.remove(item)
+        self.insert(item, min_x, min_y, max_x, max_y)
+
+    def translate(self, dx, dy):
+        self.offset_x += dx
+        self.offset_y += dy
+
+    def query(self, x, y, radius):
+        """Items whose cells overlap the square of half-size `radius` around (x, y)."""
+        return self.query_rect(x - radius, y - radius, x + radius, y + radius)
+
+    def occupied_cells(self, min_x, min_y, max_x, max_y):
+        """Non-empty cells overlapping the rectangle.
+
+        A big rectangle (a zoomed-out view) can span far more cells than
+        hold anything, so it is cheaper to filter the occupied cells then.
+        """
+        size = self.cell_size
+        x0 = int((min_x - self.offset_x) // size)
+        y0 = int((min_y - self.offset_y) // size)
+        x1 = int((max_x - self.offset_x) // size)
+        y1 = int((max_y - self.offset_y) // size)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(self.cells):
+            return [cell for cell in self.cells_for(min_x, min_y, max_x, max_y) if cell in self.cells]
+        return [cell for cell in self.cells if x0 <= cell[0] <= x1 and y0 <= cell[1] <= y1]
+
+    def query_rect(self, min_x, min_y, max_x, max_y):
+        """Items whose cells overlap the given rectangle."""
+        found = set()
+        for cell in self.occupied_cells(min_x, min_y, max_x, max_y):
+            found |= self.cells[cell]
+        return found
+
+    def count_rect(self, min_x, min_y, max_x, max_y):
+        """Upper bound on the number of items in the rectangle, without collecting them."""
+        return sum(len(self.cells[cell]) for cell in self.occupied_cells(min_x, min_y, max_x, max_y))
+
+
+class PolygonIndex:
+    """Grids over the vertices, edges and Bezier control points of a Polygon.
+
+    Vertices and edges are stored as Vertex objects (an edge by its start
+    vertex) so that inserting or removing a vertex does not renumber the
+    index; positions are resolved through Polygon.index_of on query.
+    """
+
+    def __init__(self, polygon, cell_size=64):
+        self.polygon = polygon
+        self.vertices = SpatialGrid(cell_size)
+        self.edges = SpatialGrid(cell_size)
+        self.controls = SpatialGrid(cell_size)
+
+        vertices = polygon.vertices
+        coords = polygon.coordinates()
+        if len(coords):
+            xs, ys = coords[:, 0], coords[:, 1]
+            self.vertices.bulk_insert(vertices, xs, ys, xs, ys)
+            next_xs, next_ys = np.roll(xs, -1), np.roll(ys, -1)
+            min_x, max_x = np.minimum(xs, next_xs), np.maximum(xs, next_xs)
+            min_y, max_y = np.minimum(ys, next_ys), np.maximum(ys, next_ys)
+            curved = list(polygon.bezier_segments)
+            straight = np.ones(len(vertices), dtype=bool)
+            straight[curved] = False
+            keep = np.flatnonzero(straight)
+            self.edges.bulk_insert([vertices[i] for i in keep.tolist()],
+                                   min_x[keep], min_y[keep], max_x[keep], max_y[keep])
+            for i in curved:
+                self.update_edge(i)
+        for bezier in polygon.bezier_segments.values():
+            self.add_controls(bezier)
+
+    def edge_bbox(self, index):
+        vertices = self.polygon.vertices
+        start = vertices[index].point
+        end = vertices[(index + 1) % len(vertices)].point
+        xs = [start.x(), end.x()]
+        ys = [start.y(), end.y()]
+        bezier = self.polygon.bezier_segments.get(index)
+        if bezier is not None:
+            # Tight bounds of the curve itself, usually well inside its control polygon
+            control_points = np.array([[[start.x(), start.y()],
+                                        [bezier.control1.x(), bezier.control1.y()],
+                                        [bezier.control2.x(), bezier.control2.y()],
+                                        [end.x(), end.y()]]], dtype=float)
+            return tuple(bezier_bounds(control_points)[0].tolist())
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def update_vertex(self, index):
+        """Re-bucket a moved vertex and the two edges that meet at it."""
+        vertices = self.polygon.vertices
+        point = vertices[index].point
+        self.vertices.move(vertices[index], point.x(), point.y(), point.x(), point.y())
+        self.update_edge((index - 1) % len(vertices))
+        self.update_edge(index)
+
+    def update_edge(self, index):
+        self.edges.move(self.polygon.vertices[index], *self.edge_bbox(index))
+
+    def insert_vertex(self, index):
+        """Index a vertex just inserted at `index` and the edges either side of it."""
+        vertex = self.polygon.vertices[index]
+        point = vertex.point
+        self.vertices.insert(vertex, point.x(), point.y(), point.x(), point.y())
+        self.update_edge(index)
+        self.update_edge((index - 1) % len(self.polygon.vertices))
+
+    def remove_vertex(self, vertex):
+        self.vertices.remove(vertex)
+        self.edges.remove(vertex)
+
+    def add_controls(self, bezier):
+        for name in ('control1', 'control2'):
+            point = getattr(bezier, name)
+            self.controls.insert((name, bezier), point.x(), point.y(), point.x(), point.y())
+
+    def remove_controls(self, bezier):
+        self.controls.remove(('control1', bezier))
+        self.controls.remove(('control2', bezier))
+
+    def update_control(self, bezier, name):
+        point = getattr(bezier, name)
+        self.controls.move((name, bezier), point.x(), point.y(), point.x(), point.y())
+
+    def translate(self, dx, dy):
+        for grid in (self.vertices, self.edges, self.controls):
+            grid.translate(dx, dy)
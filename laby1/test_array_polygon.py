@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from PyQt5.QtCore import QPoint
+
+from array_polygon import ArrayPolygon
+from helper_classes import BezierSegment
+
+
+def make_polygon(n=40):
+    rng = np.random.default_rng(0)
+    polygon = ArrayPolygon.from_arrays(rng.integers(-200, 200, size=(n, 2)))
+    polygon.add_beziers(np.arange(0, n, 3), rng.integers(-300, 300, size=(len(range(0, n, 3)), 2, 2)))
+    return polygon
+
+
+def assert_bounds_current(polygon):
+    """The cached edge bounds match bounds computed from scratch."""
+    low, high = polygon.edge_bounds()
+    fresh_low, fresh_high = polygon.bounds_of_edges(np.arange(polygon.length))
+    assert np.allclose(low, fresh_low) and np.allclose(high, fresh_high)  # Batched roots may differ in the last bit
+
+
+def test_edge_bounds_follow_single_edits():
+    rng = np.random.default_rng(1)
+    polygon = make_polygon()
+    polygon.edge_bounds()
+    for step in range(300):
+        n = polygon.length
+        action = step % 6
+        if action == 0:
+            polygon.move_vertex(int(rng.integers(n)), QPoint(*rng.integers(-300, 300, size=2).tolist()))
+        elif action == 1 and len(polygon.bezier_segments):
+            edge = int(rng.choice(list(polygon.bezier_segments)))
+            polygon.move_control(polygon.bezier_segments[edge], 'control2', QPoint(*rng.integers(-400, 400, size=2).tolist()))
+        elif action == 2:
+            edge = int(rng.integers(n))
+            if edge in polygon.bezier_segments:
+                polygon.remove_bezier(edge)
+            else:
+                polygon.add_bezier(edge, BezierSegment(edge, (edge + 1) % n, QPoint(500, -20), QPoint(-500, 20)))
+        elif action == 3:
+            polygon.insert_vertex(int(rng.integers(n)), *rng.integers(-200, 200, size=2).tolist())
+        elif action == 4 and n > 8:
+            polygon.remove_vertex(int(rng.integers(n)))
+        elif action == 5:
+            polygon.translate(QPoint(3, -4))
+            polygon.bake_offset()
+        assert_bounds_current(polygon)
+
+
+def test_edge_bounds_rebuilt_after_bulk_edits():
+    polygon = make_polygon()
+    polygon.edge_bounds()
+    polygon.apply_edits(inserts=[(2, 7, 7), (5, -9, 9)], removes=[10, 11], moves=[(0, 50, 50)])
+    assert_bounds_current(polygon)
+    polygon.add_vertices([(1, 2), (300, 4)])
+    assert_bounds_current(polygon)
+
+
+@pytest.mark.parametrize('radius', [0, 5, 50])
+def test_find_edges_matches_a_scan(radius):
+    polygon = make_polygon()
+    polygon.move_vertex(3, QPoint(0, 0))
+    low, high = polygon.bounds_of_edges(np.arange(polygon.length))
+    near = ((low[:, 0] - radius <= 10) & (10 <= high[:, 0] + radius)
+            & (low[:, 1] - radius <= -10) & (-10 <= high[:, 1] + radius))
+    assert polygon.find_edges(10, -10, radius) == np.flatnonzero(near).tolist()
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from PyQt5.QtCore import QPoint
+
+from array_polygon import ArrayPolygon
+from helper_classes import BezierSegment, Constraint, Polygon
+
+KINDS = [Polygon, ArrayPolygon]
+
+
+def make_polygon(kind=Polygon, n=30):
+    """n-gon with constraints, curves and smooth vertices spread around it."""
+    polygon = Polygon()
+    for i in range(n):
+        polygon.add_vertex(10 * i, (i * 37) % 101)
+    for i in range(0, n, 3):
+        polygon.add_bezier(i, BezierSegment(i, (i + 1) % n, QPoint(i, -i), QPoint(-i, 2 * i)))
+    for i in range(1, n, 4):
+        polygon.constraints[i] = Constraint('length', 10 + i)
+    for i in range(2, n, 5):
+        polygon.vertices[i].continuity = 'G1'
+    return polygon if kind is Polygon else ArrayPolygon.from_polygon(polygon)
+
+
+def state(polygon):
+    """Everything the edits can change, in comparable form."""
+    return (
+        polygon.coordinates().tolist(),
+        [v.continuity for v in polygon.vertices],
+        sorted((i, c.type, c.value) for i, c in polygon.constraints.items()),
+        sorted((i, b.control1.x(), b.control1.y(), b.control2.x(), b.control2.y())
+               for i, b in polygon.bezier_segments.items()),
+    )
+
+
+def random_batch(n, seed):
+    rng = np.random.default_rng(seed)
+    removes = rng.choice(n, size=n // 6, replace=False)
+    removed = np.zeros(n, dtype=bool)
+    removed[removes] = True
+    free_edges = np.flatnonzero(~removed & ~np.roll(removed, -1))
+    inserts = [(int(e), int(x), int(y)) for e, (x, y) in
+               zip(rng.choice(free_edges, size=n // 4), rng.integers(-50, 50, size=(n // 4, 2)))]
+    moves = [(int(i), int(x), int(y)) for i, (x, y) in
+             zip(rng.choice(np.flatnonzero(~removed), size=n // 5, replace=False),
+                 rng.integers(-50, 50, size=(n // 5, 2)))]
+    return inserts, removes.tolist(), moves
+
+
+def one_by_one(polygon, inserts, removes, moves):
+    """The same batch through move_vertex/insert_vertex/remove_vertex, translating old indices via vertex ids."""
+    ids = [v.id for v in polygon.vertices]
+    for i, x, y in moves:
+        polygon.move_vertex(i, QPoint(x, y))
+    last = {}  # Edge -> id of the vertex inserted on it last; the next one goes after it
+    for edge, x, y in inserts:
+        after = polygon.position_of(last.get(edge, ids[edge]))
+        polygon.insert_vertex(after, x, y)
+        last[edge] = polygon.vertices[after + 1].id
+    for i in removes:
+        polygon.remove_vertex(polygon.position_of(ids[i]))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_batch_matches_one_edit_at_a_time(seed):
+    inserts, removes, moves = random_batch(30, seed)
+    sequential = make_polygon()
+    one_by_one(sequential, inserts, removes, moves)
+    for kind in KINDS:
+        batched = make_polygon(kind)
+        batched.apply_edits(inserts, removes, moves)
+        assert state(batched) == state(sequential), kind.__name__
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_mapping_from_old_to_new_indices(kind):
+    polygon = make_polygon(kind, n=6)
+    old = polygon.coordinates()
+    mapping = polygon.apply_edits(inserts=[(1, 500, 1), (1, 500, 2), (3, 500, 3)], removes=[0, 5])
+    assert mapping.tolist() == [-1, 0, 3, 4, 6, -1]
+    new = polygon.coordinates()
+    kept = mapping >= 0
+    assert np.array_equal(new[mapping[kept]], old[kept])
+    # Inserts on one edge keep their order along it, straight after the edge's start
+    assert new[[1, 2, 5]].tolist() == [[500, 1], [500, 2], [500, 3]]
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_empty_batch_changes_nothing(kind):
+    polygon = make_polygon(kind)
+    before = state(polygon)
+    assert polygon.apply_edits().tolist() == list(range(30))
+    assert state(polygon) == before
+
+
+@pytest.mark.parametrize('kind', KINDS)
+@pytest.mark.parametrize('edits, message', [
+    (dict(inserts=[(30, 0, 0)]), 'insert index out of range'),
+    (dict(inserts=[(-1, 0, 0)]), 'insert index out of range'),
+    (dict(removes=[30]), 'remove index out of range'),
+    (dict(moves=[(-3, 0, 0)]), 'move index out of range'),
+    (dict(removes=[4, 7, 4]), 'removed more than once'),
+    (dict(moves=[(2, 0, 0), (2, 1, 1)]), 'moved more than once'),
+    (dict(removes=[6], moves=[(6, 0, 0)]), 'cannot move a vertex that is being removed'),
+    (dict(removes=[6], inserts=[(6, 0, 0)]), 'endpoint is being removed'),
+    (dict(removes=[7], inserts=[(6, 0, 0)]), 'endpoint is being removed'),
+    (dict(removes=[0], inserts=[(29, 0, 0)]), 'endpoint is being removed'),  # The closing edge
+])
+def test_invalid_batches_raise_and_leave_the_polygon_alone(kind, edits, message):
+    polygon = make_polygon(kind)
+    before = state(polygon)
+    with pytest.raises(ValueError, match=message):
+        polygon.apply_edits(**edits)
+    assert state(polygon) == before
@@ -0,0 +1,133 @@
+import math
+
+import pytest
+from PyQt5.QtCore import QPoint
+
+from array_polygon import ArrayPolygon
+from constraint_solver import ConstraintSolver
+from helper_classes import BezierSegment, Constraint, Polygon
+
+
+def polygon_of(points, kind=Polygon):
+    polygon = Polygon()
+    for x, y in points:
+        polygon.add_vertex(x, y)
+    return polygon if kind is Polygon else ArrayPolygon.from_polygon(polygon)
+
+
+def staircase(steps):
+    """Closed rectilinear staircase whose edges alternate horizontal and vertical, all constrained."""
+    points = []
+    for i in range(steps):
+        points += [(10 * i, 10 * i), (10 * i + 10, 10 * i)]
+    points += [(10 * steps, 10 * steps), (0, 10 * steps)]
+    polygon = polygon_of(points)
+    for i in range(len(points)):
+        polygon.constraints[i] = Constraint('horizontal' if i % 2 == 0 else 'vertical')
+    return polygon
+
+
+def regular(n, radius=500):
+    points = [(round(radius * math.cos(2 * math.pi * i / n)), round(radius * math.sin(2 * math.pi * i / n)))
+              for i in range(n)]
+    return polygon_of(points)
+
+
+def constrain_lengths(polygon, edges):
+    for i, (start, end) in enumerate(polygon.get_edges()):
+        if i in edges:
+            polygon.constraints[i] = Constraint('length', round(math.hypot(end.x() - start.x(), end.y() - start.y())))
+
+
+def unsatisfied(polygon, skip=()):
+    edges = polygon.get_edges()
+    return [i for i, constraint in polygon.constraints.items()
+            if i not in skip and ConstraintSolver.satisfy(constraint, *edges[i]) is not None]
+
+
+def test_horizontal_and_vertical_chain():
+    polygon = staircase(20)
+    solver = ConstraintSolver(time_budget=None)
+    n = len(polygon.vertices)
+    assert solver.drag_vertex(polygon, 5, QPoint(57, 33))
+    assert polygon.vertices[5].point == QPoint(57, 33)
+    assert unsatisfied(polygon, skip={(5 - 1) % n}) == []  # The edge closing the loop onto the pinned vertex may not hold
+
+
+def test_length_chain_stops_at_the_first_free_edge():
+    polygon = regular(12)
+    constrain_lengths(polygon, range(0, 6))
+    before = [polygon.vertices[i].point for i in range(12)]
+    solver = ConstraintSolver(time_budget=None)
+    assert solver.drag_vertex(polygon, 3, before[3] + QPoint(40, -25))
+    assert unsatisfied(polygon) == []
+    # Edges 6..11 are free, so vertices past 6 and the walk backwards from 3 past 0 stay put
+    assert [polygon.vertices[i].point for i in range(7, 12)] == before[7:]
+
+
+CLOSING_EDGES = {399, 0}  # Whichever walk ends last leaves its edge onto the pinned vertex 0 as it is
+
+
+def test_resumes_after_the_time_budget_runs_out():
+    polygon = regular(400, radius=5000)
+    constrain_lengths(polygon, range(400))
+    solver = ConstraintSolver(time_budget=0)
+    assert not solver.drag_vertex(polygon, 0, polygon.vertices[0].point + QPoint(300, 0))
+    assert solver.frontier
+    while not solver.resume(polygon):
+        pass
+    assert unsatisfied(polygon, skip=CLOSING_EDGES) == []
+
+
+def test_finish_completes_pending_walks():
+    polygon = regular(400, radius=5000)
+    constrain_lengths(polygon, range(400))
+    solver = ConstraintSolver(time_budget=0)
+    solver.drag_vertex(polygon, 0, polygon.vertices[0].point + QPoint(300, 0))
+    solver.finish(polygon)
+    assert not solver.frontier and solver.pinned is None
+    assert unsatisfied(polygon, skip=CLOSING_EDGES) == []
+
+
+def assert_opposite(polygon, index, incoming, outgoing):
+    """The two tangents at a vertex point in opposite directions, to within whole-unit rounding."""
+    center = polygon.vertices[index].point
+    a, b = incoming - center, outgoing - center
+    lengths = math.hypot(a.x(), a.y()) * math.hypot(b.x(), b.y())
+    assert abs(a.x() * b.y() - a.y() * b.x()) / lengths < 0.02
+    assert a.x() * b.x() + a.y() * b.y() < 0
+
+
+@pytest.mark.parametrize('kind', [Polygon, ArrayPolygon])
+def test_chain_keeps_g1_where_it_meets_a_curve(kind):
+    polygon = regular(12)
+    constrain_lengths(polygon, range(0, 4))
+    start, end = polygon.vertices[4].point, polygon.vertices[5].point
+    # Straight constrained edge 3 into vertex 4, curve out of it, handle in line with edge 3
+    polygon.add_bezier(4, BezierSegment(4, 5, start + (start - polygon.vertices[3].point) / 2, end))
+    polygon.vertices[4].continuity = 'G1'
+    if kind is ArrayPolygon:
+        polygon = ArrayPolygon.from_polygon(polygon)
+    ConstraintSolver(time_budget=None).drag_vertex(polygon, 2, polygon.vertices[2].point + QPoint(-260, 40))
+    assert unsatisfied(polygon) == []
+    assert polygon.vertices[4].point != start  # The chain reached the smooth joint
+    assert_opposite(polygon, 4, polygon.vertices[3].point, polygon.bezier_segments[4].control1)
+
+
+@pytest.mark.parametrize('kind', [Polygon, ArrayPolygon])
+def test_chain_carries_c1_handles_along(kind):
+    polygon = regular(12)
+    constrain_lengths(polygon, range(0, 5))
+    for edge in (2, 3):
+        start, end = polygon.vertices[edge].point, polygon.vertices[edge + 1].point
+        polygon.add_bezier(edge, BezierSegment(edge, edge + 1, start + (end - start) / 3, end - (end - start) / 3))
+    polygon.vertices[3].continuity = 'C1'
+    if kind is ArrayPolygon:
+        polygon = ArrayPolygon.from_polygon(polygon)
+    joint = polygon.vertices[3].point
+    offsets = (polygon.bezier_segments[2].control2 - joint, polygon.bezier_segments[3].control1 - joint)
+    ConstraintSolver(time_budget=None).drag_vertex(polygon, 1, polygon.vertices[1].point + QPoint(-260, 40))
+    assert unsatisfied(polygon) == []
+    assert polygon.vertices[3].point != joint  # The chain reached the smooth joint
+    joint = polygon.vertices[3].point
+    assert (polygon.bezier_segments[2].control2 - joint, polygon.bezier_segments[3].control1 - joint) == offsets
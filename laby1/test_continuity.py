@@ -0,0 +1,60 @@
+import math
+import os
+
+import pytest
+from PyQt5.QtCore import QPoint
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+import continuity  # noqa: E402
+from canvas_widget import Canvas  # noqa: E402
+from constraint_solver import ConstraintSolver  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def assert_constraints_hold(polygon):
+    edges = polygon.get_edges()
+    for i, constraint in polygon.constraints.items():
+        start, end = edges[i]
+        assert ConstraintSolver.satisfy(constraint, start, end) is None, (i, constraint.type, start, end)
+
+
+def assert_smooth(polygon, index, incoming_point, outgoing_point):
+    """The two handles at a G1 vertex point in opposite directions."""
+    center = polygon.vertices[index].point
+    a = incoming_point - center
+    b = outgoing_point - center
+    cross = a.x() * b.y() - a.y() * b.x()
+    assert abs(cross) <= math.hypot(a.x(), a.y()) + math.hypot(b.x(), b.y())  # Within rounding
+    assert a.x() * b.x() + a.y() * b.y() < 0
+
+
+@pytest.mark.parametrize('angle', range(0, 360, 30))
+def test_dragging_a_control_keeps_the_default_scene_constraints(app, angle):
+    canvas = Canvas()
+    polygon = canvas.polygon
+    bezier = polygon.bezier_segments[0]
+    radius = 80
+    for step in range(1, 11):
+        a = math.radians(angle) + step / 10
+        point = QPoint(300 + round(radius * math.cos(a)), 100 + round(radius * math.sin(a)))
+        continuity.drag_control(polygon, bezier, 'control2', point)
+        assert_constraints_hold(polygon)
+        assert_smooth(polygon, 1, bezier.control2, polygon.vertices[2].point)
+
+
+def test_unconstrained_straight_edge_turns_with_the_handle(app):
+    canvas = Canvas()
+    polygon = canvas.polygon
+    del polygon.constraints[1]
+    del polygon.constraints[2]
+    bezier = polygon.bezier_segments[0]
+    continuity.drag_control(polygon, bezier, 'control2', QPoint(250, 50))
+    assert polygon.vertices[2].point != QPoint(300, 300)
+    assert bezier.control2 == QPoint(250, 50)
+    assert_smooth(polygon, 1, bezier.control2, polygon.vertices[2].point)
@@ -0,0 +1,222 @@
+import pytest
+from PyQt5.QtCore import QPoint
+
+from array_polygon import ArrayPolygon
+from helper_classes import BezierSegment, Constraint, Polygon
+from history import (
+    RECORD_BYTES, History, InsertVertex, MovePoints, RemoveVertex, SetBezier, SetConstraint, SetContinuity,
+    Translate
+)
+from scene import Scene
+
+KINDS = [Polygon, ArrayPolygon]
+
+
+def make_scene(kind):
+    """Scene with one 10-gon carrying curves, constraints and smooth vertices around vertex 0 and 5."""
+    polygon = Polygon()
+    for i in range(10):
+        polygon.add_vertex(20 * i, (i * 13) % 37)
+    for edge in (0, 4, 9):
+        polygon.add_bezier(edge, BezierSegment(edge, (edge + 1) % 10, QPoint(edge, 50), QPoint(-edge, -50)))
+    polygon.constraints[5] = Constraint('length', 25)
+    polygon.constraints[8] = Constraint('horizontal')
+    for i in (0, 1, 5, 6):
+        polygon.vertices[i].continuity = 'C1' if i % 2 else 'G1'
+    if kind is ArrayPolygon:
+        polygon = ArrayPolygon.from_polygon(polygon)
+    return Scene([polygon])
+
+
+def state(polygon):
+    return (
+        polygon.coordinates().tolist(),
+        [v.continuity for v in polygon.vertices],
+        sorted((i, c.type, c.value) for i, c in polygon.constraints.items()),
+        sorted((i, b.control1.x(), b.control1.y(), b.control2.x(), b.control2.y())
+               for i, b in polygon.bezier_segments.items()),
+        (polygon.offset.x(), polygon.offset.y()),
+    )
+
+
+def check_round_trip(scene, command, edit):
+    """Apply `edit` as the editor does, record `command`, and check undo and redo restore each state exactly."""
+    polygon = scene[0]
+    history = History()
+    before = state(polygon)
+    edit(polygon)
+    after = state(polygon)
+    history.push(0, [command])
+    assert history.undo(scene) == 0
+    assert state(polygon) == before
+    assert history.redo(scene) == 0
+    assert state(polygon) == after
+    assert history.undo(scene) == 0
+    assert state(polygon) == before
+
+
+@pytest.mark.parametrize('kind', KINDS)
+@pytest.mark.parametrize('edge', [0, 2, 5, 9])  # A curve, a plain edge, a constrained edge, the closing curve
+def test_insert_vertex(kind, edge):
+    scene = make_scene(kind)
+    command = InsertVertex(scene[0], edge, 77, 88)
+    check_round_trip(scene, command, lambda polygon: polygon.insert_vertex(edge, 77, 88))
+
+
+@pytest.mark.parametrize('kind', KINDS)
+@pytest.mark.parametrize('index', [0, 1, 5, 9])
+def test_remove_vertex(kind, index):
+    scene = make_scene(kind)
+    command = RemoveVertex(scene[0], index)
+    check_round_trip(scene, command, lambda polygon: polygon.remove_vertex(index))
+
+
+@pytest.mark.parametrize('kind', KINDS)
+@pytest.mark.parametrize('edge, new', [(2, ('vertical', None)), (5, ('length', 40)), (8, None)])
+def test_set_constraint(kind, edge, new):
+    scene = make_scene(kind)
+    command = SetConstraint(scene[0], edge, new)
+
+    def edit(polygon):
+        if new is None:
+            del polygon.constraints[edge]
+        else:
+            polygon.constraints[edge] = Constraint(*new)
+
+    check_round_trip(scene, command, edit)
+
+
+@pytest.mark.parametrize('kind', KINDS)
+@pytest.mark.parametrize('edge, new', [(2, ((1, 2), (3, 4))), (4, ((-5, 6), (7, -8))), (9, None)])
+def test_set_bezier(kind, edge, new):
+    scene = make_scene(kind)
+    command = SetBezier(scene[0], edge, new)
+
+    def edit(polygon):
+        if edge in polygon.bezier_segments:
+            polygon.remove_bezier(edge)
+        if new is not None:
+            (x1, y1), (x2, y2) = new
+            polygon.add_bezier(edge, BezierSegment(edge, edge + 1, QPoint(x1, y1), QPoint(x2, y2)))
+
+    check_round_trip(scene, command, edit)
+
+
+@pytest.mark.parametrize('kind', KINDS)
+@pytest.mark.parametrize('index, new', [(3, 'C1'), (5, 'G0'), (0, 'G1')])
+def test_set_continuity(kind, index, new):
+    scene = make_scene(kind)
+    command = SetContinuity(scene[0], index, new)
+    check_round_trip(scene, command, lambda polygon: polygon.add_vertex_continuity(index, new))
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_move_points(kind):
+    scene = make_scene(kind)
+    polygon = scene[0]
+    before = state(polygon)
+    polygon.moved_from = {}
+    for step in range(5):  # One drag of several steps, through vertices and control points
+        polygon.move_vertex(3, QPoint(100 + step, 7 * step))
+        polygon.move_vertex(0, QPoint(-step, step))
+        polygon.move_control(polygon.bezier_segments[4], 'control2', QPoint(step, -step))
+    polygon.move_vertex(7, polygon.vertices[7].point)  # Touched but ending where it started
+    command = MovePoints.from_log(polygon, polygon.moved_from)
+    polygon.moved_from = None
+    assert sorted(command.vertices.tolist()) == [0, 3]
+    after = state(polygon)
+
+    history = History()
+    history.push(0, [command])
+    history.undo(scene)
+    assert state(polygon) == before
+    history.redo(scene)
+    assert state(polygon) == after
+
+
+def test_move_points_without_a_change_records_nothing():
+    polygon = make_scene(Polygon)[0]
+    polygon.moved_from = {}
+    polygon.move_vertex(2, polygon.vertices[2].point)
+    assert MovePoints.from_log(polygon, polygon.moved_from) is None
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_translate(kind):
+    scene = make_scene(kind)
+    box = scene.boxes[0]
+    check_round_trip(scene, Translate(15, -40), lambda polygon: scene.translate(0, QPoint(15, -40)))
+    assert scene.boxes[0] == box  # The scene's cached box follows the undo
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_many_actions_undo_back_to_the_start(kind):
+    scene = make_scene(kind)
+    polygon = scene[0]
+    history = History()
+    states = [state(polygon)]
+    actions = [
+        (lambda: InsertVertex(polygon, 2, 1, 1), lambda: polygon.insert_vertex(2, 1, 1)),
+        (lambda: SetConstraint(polygon, 3, ('length', 9)),
+         lambda: polygon.constraints.update({3: Constraint('length', 9)})),
+        (lambda: RemoveVertex(polygon, 6), lambda: polygon.remove_vertex(6)),
+        (lambda: SetContinuity(polygon, 2, 'C1'), lambda: polygon.add_vertex_continuity(2, 'C1')),
+        (lambda: Translate(3, 4), lambda: scene.translate(0, QPoint(3, 4))),
+    ]
+    for command, edit in actions:
+        recorded = command()
+        edit()
+        history.push(0, [recorded])
+        states.append(state(polygon))
+    for expected in reversed(states[:-1]):
+        history.undo(scene)
+        assert state(polygon) == expected
+    assert history.undo(scene) is None
+    for expected in states[1:]:
+        history.redo(scene)
+        assert state(polygon) == expected
+    assert history.redo(scene) is None
+
+
+def test_new_action_drops_what_could_be_redone():
+    scene = make_scene(Polygon)
+    history = History()
+    history.push(0, [Translate(1, 0)])
+    history.push(0, [Translate(2, 0)])
+    history.undo(scene)
+    assert history.can_redo()
+    history.push(0, [Translate(3, 0)])
+    assert not history.can_redo()
+    assert len(history) == 2 and history.memory == 2 * RECORD_BYTES
+
+
+def test_oldest_entries_evicted_under_the_memory_cap():
+    scene = make_scene(Polygon)
+    history = History(memory_limit=5 * RECORD_BYTES)
+    for dx in range(1, 9):
+        scene.translate(0, QPoint(dx, 0))
+        history.push(0, [Translate(dx, 0)])
+    assert history.evicted == 3 and len(history) == 5
+    assert history.memory == 5 * RECORD_BYTES
+    # Only the newest five can be undone, newest first
+    for dx in range(8, 3, -1):
+        offset = scene[0].offset.x()
+        history.undo(scene)
+        assert scene[0].offset.x() == offset - dx
+    assert history.undo(scene) is None
+
+
+def test_newest_entry_kept_even_over_the_cap():
+    history = History(memory_limit=RECORD_BYTES)
+    history.push(0, [Translate(1, 0)])
+    history.push(0, [Translate(1, 0), Translate(2, 0)])  # Twice the cap on its own
+    assert len(history) == 1 and history.evicted == 1
+    assert history.can_undo()
+
+
+def test_lowering_the_cap_evicts_at_once():
+    history = History()
+    for _ in range(10):
+        history.push(0, [Translate(1, 0)])
+    history.set_memory_limit(3 * RECORD_BYTES)
+    assert len(history) == 3 and history.evicted == 7
@@ -0,0 +1,125 @@
+import pytest
+from PyQt5.QtCore import QPoint
+
+import path_io
+from array_polygon import ArrayPolygon
+from helper_classes import BezierSegment, Polygon
+from path_io import export_svg, import_svg
+
+
+def write_svg(tmp_path, d):
+    path = str(tmp_path / 'outline.svg')
+    with open(path, 'w') as file:
+        file.write(f'<svg xmlns="http://www.w3.org/2000/svg">\n<path fill="none" d="{d}"/>\n</svg>\n')
+    return path
+
+
+def outline(polygon):
+    """Vertices and curve control points of a polygon, in comparable form."""
+    return (
+        polygon.coordinates().tolist(),
+        sorted((i, b.control1.x(), b.control1.y(), b.control2.x(), b.control2.y())
+               for i, b in polygon.bezier_segments.items()),
+    )
+
+
+def read(tmp_path, d):
+    return outline(import_svg(write_svg(tmp_path, d)))
+
+
+SQUARE = ([[10, 20], [110, 20], [110, 70], [10, 70]], [])
+
+
+@pytest.mark.parametrize('d, expected', [
+    ('M 10 20 L 110 20 L 110 70 L 10 70 Z', SQUARE),
+    ('m 10 20 l 100 0 l 0 50 l -100 0 z', SQUARE),
+    ('m10,20 h100 v50 h-100 z', SQUARE),
+    ('M 10 20 h 100 V 70 H 10 Z', SQUARE),
+    ('M 10 20 L 110 20 l 0 50 H 10 v -50 Z', SQUARE),
+    ('M 0 0 C 10 -20 40 -20 50 0 L 50 50 Z', ([[0, 0], [50, 0], [50, 50]], [(0, 10, -20, 40, -20)])),
+    # Relative control points count from the start of their own segment
+    ('m 0 0 c 10 -20 40 -20 50 0 l 0 50 z', ([[0, 0], [50, 0], [50, 50]], [(0, 10, -20, 40, -20)])),
+    ('M 0 0 L 50 0 c 10 10 10 40 0 50 L 0 50 Z',
+     ([[0, 0], [50, 0], [50, 50], [0, 50]], [(1, 60, 10, 60, 40)])),
+    ('M 5 5 m 100 100 l 10 0', ([[5, 5]], [])),  # Only the first subpath is read
+])
+def test_relative_commands(tmp_path, d, expected):
+    assert read(tmp_path, d) == expected
+
+
+@pytest.mark.parametrize('d, expected', [
+    # Pairs after a moveto are line-tos, relative after a relative moveto
+    ('M 10 20 110 20 110 70 10 70 Z', SQUARE),
+    ('m 10 20 100 0 0 50 -100 0 z', SQUARE),
+    ('M 10 20 L 110 20 110 70 10 70 Z', SQUARE),
+    ('M 10 20 l 100 0 0 50 -100 0 z', SQUARE),
+    ('M 10 20 H 50 110 V 40 70 H 10 Z', ([[10, 20], [50, 20], [110, 20], [110, 40], [110, 70], [10, 70]], [])),
+    ('M 0 0 c 10 -20 40 -20 50 0 10 20 40 20 50 0 L 100 50 Z',
+     ([[0, 0], [50, 0], [100, 0], [100, 50]], [(0, 10, -20, 40, -20), (1, 60, 20, 90, 20)])),
+    ('M10-20L110-20-5.5.5Z', ([[10, -20], [110, -20], [-6, 0]], [])),
+])
+def test_implicit_repeats(tmp_path, d, expected):
+    assert read(tmp_path, d) == expected
+
+
+def test_repeats_across_read_chunks(tmp_path, monkeypatch):
+    d = 'm 0 0 ' + ' '.join(f'{3 + i % 5} {i % 7 - 3}' for i in range(200)) + ' c 1 2 3 4 5 6 7 8 9 10 11 12 z'
+    expected = read(tmp_path, d)
+    monkeypatch.setattr(path_io, 'READ_CHUNK', 7)
+    assert read(tmp_path, d) == expected
+
+
+@pytest.mark.parametrize('kind', [Polygon, ArrayPolygon])
+def test_export_round_trip(tmp_path, kind):
+    polygon = Polygon()
+    for x, y in ((0, 0), (200, 10), (220, 150), (90, 180), (-40, 90)):
+        polygon.add_vertex(x, y)
+    polygon.add_bezier(1, BezierSegment(1, 2, QPoint(260, 40), QPoint(250, 120)))
+    polygon.add_bezier(4, BezierSegment(4, 0, QPoint(-60, 40), QPoint(-30, 10)))
+    if kind is ArrayPolygon:
+        polygon = ArrayPolygon.from_polygon(polygon)
+    path = str(tmp_path / 'outline.svg')
+    export_svg(path, polygon)
+    assert outline(import_svg(path, kind)) == outline(polygon)
+
+
+@pytest.mark.parametrize('d, message', [
+    ('', 'no path data'),
+    ('L 10 10', 'must start with a moveto'),
+    ('h 10 z', 'must start with a moveto'),
+    ('10 20', 'numbers without a command'),
+    ('M 0', "'M' is missing numbers"),
+    ('M 0 0 L 10', "'L' is missing numbers"),
+    ('M 0 0 L 10 20 30', "'L' is missing numbers"),
+    ('M 0 0 C 1 2 3 4 Z', "'C' is missing numbers"),
+    ('M 0 0 l 1 2 3 H 5', "'l' is missing numbers"),
+    ('M x 0 L 1 1', "bad number 'x'"),
+    ('M 0 0 L 10 x', "bad number 'x'"),
+    ('M 0 0 L 1e 10', "bad number '1e'"),
+    ('M 0 0 L 1x 10', "bad number '1x'"),
+    ('M 0 0 H inf', "bad number 'inf'"),
+    ('M 0 0 Q 1 2 3 4', "unsupported path command 'Q'"),
+    ('M 0 0 A 5 5 0 0 1 10 10', "unsupported path command 'A'"),
+    ('M 0 0 L 1e12 0', 'out of range'),
+])
+def test_malformed_path_data(tmp_path, d, message):
+    path = write_svg(tmp_path, d)
+    with pytest.raises(ValueError, match=message) as error:
+        import_svg(path)
+    assert str(error.value).startswith(path + ': ')
+
+
+def test_no_path_element(tmp_path):
+    path = tmp_path / 'empty.svg'
+    path.write_text('<svg xmlns="http://www.w3.org/2000/svg"><rect width="5" height="5"/></svg>')
+    with pytest.raises(ValueError, match='no <path'):
+        import_svg(str(path))
+
+
+def test_file_ends_inside_the_attribute(tmp_path):
+    path = tmp_path / 'cut.svg'
+    path.write_text('<svg><path d="M 0 0 L 10 0 L 10')
+    with pytest.raises(ValueError, match="'L' is missing numbers"):
+        import_svg(str(path))
+    path.write_text('<svg><path d="M 0 0 L 10 0 L 10 10')
+    assert outline(import_svg(str(path))) == ([[0, 0], [10, 0], [10, 10]], [])
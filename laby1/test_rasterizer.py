@@ -0,0 +1,59 @@
+import itertools
+
+import numpy as np
+
+from rasterizer import BLACK, Framebuffer, bresenham_line, bresenham_lines
+
+
+def reference_pixels(starts, ends):
+    """Pixels of every line from the per-pixel loop, in order."""
+    return [p for (x0, y0), (x1, y1) in zip(starts.tolist(), ends.tolist())
+            for p in bresenham_line(x0, y0, x1, y1)]
+
+
+def vectorized_pixels(starts, ends):
+    xs, ys = bresenham_lines(starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1])
+    return list(zip(xs.tolist(), ys.tolist()))
+
+
+def test_every_octant():
+    # Steep and shallow lines in all eight directions, ties on the diagonals included
+    deltas = [(dx, dy) for dx, dy in itertools.product(range(-7, 8), repeat=2) if (dx, dy) != (0, 0)]
+    starts = np.full((len(deltas), 2), 20)
+    ends = starts + np.array(deltas)
+    assert vectorized_pixels(starts, ends) == reference_pixels(starts, ends)
+
+
+def test_long_lines_in_every_octant():
+    rng = np.random.default_rng(0)
+    starts = rng.integers(-500, 500, size=(400, 2))
+    ends = rng.integers(-500, 500, size=(400, 2))
+    assert vectorized_pixels(starts, ends) == reference_pixels(starts, ends)
+
+
+def test_degenerate_lines():
+    starts = np.array([[5, 5], [5, 5], [5, 5], [0, 0], [-3, 7]])
+    ends = np.array([[5, 5], [12, 5], [5, -4], [1, 0], [-3, 7]])  # Points, horizontal, vertical, one step
+    assert vectorized_pixels(starts, ends) == reference_pixels(starts, ends)
+    assert vectorized_pixels(starts[:1], ends[:1]) == [(5, 5)]
+
+
+def test_framebuffer_clips_endpoints_off_screen():
+    width, height = 64, 48
+    rng = np.random.default_rng(1)
+    starts = rng.integers(-40, 110, size=(200, 2))
+    ends = rng.integers(-40, 110, size=(200, 2))
+    framebuffer = Framebuffer(width, height)
+    framebuffer.draw_lines(starts, ends)
+
+    expected = np.zeros((height, width), dtype=np.uint32)
+    for x, y in reference_pixels(starts, ends):
+        if 0 <= x < width and 0 <= y < height:
+            expected[y, x] = BLACK
+    assert np.array_equal(framebuffer.pixels, expected)
+
+
+def test_framebuffer_ignores_lines_entirely_off_screen():
+    framebuffer = Framebuffer(16, 16)
+    framebuffer.draw_lines(np.array([[-10, -10], [20, 3]]), np.array([[-2, -30], [40, 15]]))
+    assert not framebuffer.pixels.any()
@@ -0,0 +1,183 @@
+import os
+
+import pytest
+from PyQt5.QtCore import QPoint, QPointF
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from array_polygon import ArrayPolygon  # noqa: E402
+from canvas_widget import Canvas  # noqa: E402
+from helper_classes import Polygon  # noqa: E402
+from scene import Scene  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def square(x, y, size=40, kind=Polygon):
+    polygon = Polygon()
+    for dx, dy in ((0, 0), (size, 0), (size, size), (0, size)):
+        polygon.add_vertex(x + dx, y + dy)
+    return ArrayPolygon.from_polygon(polygon) if kind is ArrayPolygon else polygon
+
+
+def tiled(kind=Polygon, count=10, step=100):
+    """count x count squares of side 40, `step` apart."""
+    return [square(step * i, step * j, kind=kind) for j in range(count) for i in range(count)]
+
+
+def assert_index_current(scene):
+    """Every shape's cached box matches the shape and sits in the grid or among the large shapes."""
+    for shape_id, polygon in scene.shapes.items():
+        box = scene.measure(polygon, polygon.coordinates())
+        assert scene.boxes[shape_id] == pytest.approx(box)
+        assert scene.outlines[shape_id].tolist() == polygon.coordinates().tolist()
+        if box is None:
+            assert shape_id not in scene.large and shape_id not in scene.grid.item_cells
+        elif scene.is_large(box):
+            assert shape_id in scene.large and shape_id not in scene.grid.item_cells
+        else:
+            assert shape_id not in scene.large
+            assert scene.grid.item_cells[shape_id] == scene.grid.cells_for(*box)
+
+
+def brute_force_at(scene, x, y, radius):
+    found = [shape_id for shape_id, box in scene.boxes.items()
+             if box is not None and box[0] <= x + radius and box[2] >= x - radius
+             and box[1] <= y + radius and box[3] >= y - radius]
+    return sorted(found, reverse=True)
+
+
+@pytest.mark.parametrize('kind', [Polygon, ArrayPolygon])
+def test_find_at_matches_the_boxes(kind):
+    scene = Scene(tiled(kind), cell_size=128)
+    assert_index_current(scene)
+    assert not scene.large
+    for x, y, radius in ((20, 20, 5), (150, 150, 60), (445, 520, 10), (70, 70, 5), (-50, -50, 10), (990, 990, 60)):
+        assert scene.find_at(x, y, radius) == brute_force_at(scene, x, y, radius)
+    # The grid hands out only the shapes near the click, not every shape
+    assert len(scene.grid.query(445, 520, 10)) < 10
+
+
+def test_add_many_indexes_like_add():
+    one_by_one = Scene(tiled(), cell_size=128)
+    bulk = Scene(cell_size=128)
+    bulk.add_many(tiled())
+    assert bulk.boxes == one_by_one.boxes
+    assert bulk.grid.item_cells == one_by_one.grid.item_cells
+    assert_index_current(bulk)
+
+
+def test_overlapping_shapes_topmost_first():
+    scene = Scene([square(0, 0, 100), square(50, 50, 100), square(80, 80, 10)])
+    assert scene.find_at(85, 85, 1) == [2, 1, 0]
+    assert scene.find_at(10, 10, 1) == [0]
+
+
+def test_large_shapes_are_checked_on_every_query():
+    scene = Scene(tiled(count=3) + [square(-5000, -5000, 10000)], cell_size=64)
+    big = len(scene) - 1
+    assert scene.large == {big}
+    assert_index_current(scene)
+    assert scene.find_at(4000, -4000, 1) == [big]
+    assert scene.find_at(120, 20, 1) == [big, 1]
+    assert scene.find_at(6000, 0, 1) == []
+
+
+@pytest.mark.parametrize('kind', [Polygon, ArrayPolygon])
+def test_update_bounds_after_an_edit(kind):
+    scene = Scene(tiled(kind, count=4), cell_size=64)
+    polygon = scene[5]
+    polygon.move_vertex(2, QPoint(700, 40))
+    scene.update_bounds(5)
+    assert_index_current(scene)
+    assert 5 in scene.find_at(690, 40, 5)
+    assert 5 not in scene.find_at(650, 400, 5)
+
+    # Stretched over many cells it moves among the large shapes, and back into the grid
+    polygon.move_vertex(2, QPoint(5000, 5000))
+    scene.update_bounds(5)
+    assert 5 in scene.large
+    assert_index_current(scene)
+    assert 5 in scene.find_at(4000, 4000, 1)
+    polygon.move_vertex(2, QPoint(140, 140))
+    scene.update_bounds(5)
+    assert 5 not in scene.large
+    assert_index_current(scene)
+    assert scene.find_at(4000, 4000, 1) == []
+
+
+@pytest.mark.parametrize('kind', [Polygon, ArrayPolygon])
+def test_translate_keeps_the_grid_current(kind):
+    scene = Scene(tiled(kind, count=4), cell_size=64)
+    scene.translate(0, QPoint(1000, 300))
+    assert_index_current(scene)
+    assert scene.find_at(20, 20, 5) == []
+    assert scene.find_at(1020, 320, 5) == [0]
+    # Small steps within one cell, then back
+    for _ in range(10):
+        scene.translate(0, QPoint(-3, 7))
+    assert_index_current(scene)
+    scene.translate(0, QPoint(-970, -370))
+    assert scene.boxes[0] == (0, 0, 40, 40)
+    assert_index_current(scene)
+
+
+def test_translate_a_large_shape():
+    scene = Scene([square(0, 0, 10000), square(0, 0)], cell_size=64)
+    scene.translate(0, QPoint(-20000, 0))
+    assert scene.large == {0}
+    assert_index_current(scene)
+    assert scene.find_at(-15000, 5000, 1) == [0]
+    assert scene.find_at(20, 20, 1) == [1]
+
+
+def test_remove_clears_the_index():
+    scene = Scene(tiled(count=3) + [square(0, 0, 10000)], cell_size=64)
+    scene.remove(4)
+    scene.remove(9)
+    assert not scene.large
+    assert 4 not in scene.grid.item_cells
+    assert scene.find_at(120, 120, 1) == []
+    assert_index_current(scene)
+
+
+def make_canvas(polygons):
+    canvas = Canvas()
+    canvas.resize(800, 600)
+    canvas.set_scene(Scene(polygons))
+    return canvas
+
+
+def widget_point(canvas, x, y):
+    return canvas.scene_transform().map(QPointF(x, y)).toPoint()
+
+
+def test_click_routes_to_the_shape_under_it(app):
+    canvas = make_canvas(tiled(count=5))
+    assert canvas.shape_id == 0
+    # A vertex of another shape, with the edge ending at it
+    assert canvas.hit_test(widget_point(canvas, 340, 240)) == (13, 1, 2)
+    # Inside an outline, away from its edges and vertices
+    assert canvas.hit_test(widget_point(canvas, 220, 320)) == (17, None, None)
+    # Between the shapes: the active one, with nothing under the cursor
+    assert canvas.hit_test(widget_point(canvas, 270, 270)) == (0, None, None)
+    # An edge of the active shape, after switching to another one
+    canvas.activate_shape(13)
+    assert canvas.hit_test(widget_point(canvas, 320, 200)) == (13, 0, None)
+    assert canvas.hit_test(widget_point(canvas, 20, 0)) == (0, 0, None)
+
+
+def test_click_follows_a_translated_and_edited_shape(app):
+    canvas = make_canvas(tiled(count=5))
+    canvas.scene.translate(12, QPoint(0, 55))
+    assert canvas.hit_test(widget_point(canvas, 220, 220)) == (0, None, None)
+    assert canvas.hit_test(widget_point(canvas, 220, 275)) == (12, None, None)
+
+    polygon = canvas.scene[6]
+    polygon.move_vertex(2, QPoint(180, 180))
+    canvas.scene.update_bounds(6)
+    assert canvas.hit_test(widget_point(canvas, 180, 180)) == (6, 1, 2)
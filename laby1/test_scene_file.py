@@ -0,0 +1,128 @@
+import struct
+
+import numpy as np
+import pytest
+from PyQt5.QtCore import QPoint
+
+from array_polygon import ArrayPolygon
+from helper_classes import BezierSegment, Constraint, Polygon
+from scene_file import HEADER_SIZE, load_scene, save_scene
+
+
+def make_polygon(n=12):
+    """n-gon with constraints, curves and continuity on some of its edges."""
+    polygon = Polygon()
+    for i in range(n):
+        polygon.add_vertex(100 + 10 * i, 50 + (i * 7) % 23)
+    for i in range(0, n, 4):
+        polygon.add_bezier(i, BezierSegment(i, (i + 1) % n, QPoint(3 * i, -5), QPoint(-2, 4 * i)))
+        polygon.vertices[i].continuity = 'G1' if i % 8 else 'C1'
+    polygon.constraints[1] = Constraint('horizontal')
+    polygon.constraints[2] = Constraint('vertical')
+    polygon.constraints[5] = Constraint('length', 42)
+    return polygon
+
+
+def contents(polygon):
+    """Everything a scene file stores, with the pending offset applied, in comparable form."""
+    dx, dy = polygon.offset.x(), polygon.offset.y()
+    return (
+        (polygon.coordinates() + (dx, dy)).tolist(),
+        [v.continuity for v in polygon.vertices],
+        sorted((i, c.type, c.value) for i, c in polygon.constraints.items()),
+        sorted((i, b.control1.x() + dx, b.control1.y() + dy, b.control2.x() + dx, b.control2.y() + dy)
+               for i, b in polygon.bezier_segments.items()),
+    )
+
+
+@pytest.mark.parametrize('kind', [Polygon, ArrayPolygon])
+def test_round_trip(tmp_path, kind):
+    polygon = make_polygon()
+    if kind is ArrayPolygon:
+        polygon = ArrayPolygon.from_polygon(polygon)
+    path = str(tmp_path / 'scene.gksc')
+    save_scene(path, polygon)
+    loaded = load_scene(path)
+    assert contents(loaded) == contents(polygon)
+
+
+@pytest.mark.parametrize('kind', [Polygon, ArrayPolygon])
+def test_round_trip_applies_offset(tmp_path, kind):
+    polygon = make_polygon()
+    if kind is ArrayPolygon:
+        polygon = ArrayPolygon.from_polygon(polygon)
+    polygon.translate(QPoint(-37, 91))
+    path = str(tmp_path / 'scene.gksc')
+    save_scene(path, polygon)
+    loaded = load_scene(path)
+    assert loaded.offset.isNull()
+    assert contents(loaded) == contents(polygon)
+
+
+def test_small_chunks(tmp_path):
+    polygon = make_polygon(50)
+    path = str(tmp_path / 'scene.gksc')
+    save_scene(path, polygon, chunk=7)
+    assert contents(load_scene(path)) == contents(polygon)
+
+
+def test_empty_polygon(tmp_path):
+    path = str(tmp_path / 'empty.gksc')
+    save_scene(path, Polygon())
+    loaded = load_scene(path)
+    assert len(loaded.vertices) == 0
+    assert len(loaded.constraints) == 0 and len(loaded.bezier_segments) == 0
+
+
+def test_save_over_mapped_file(tmp_path):
+    path = str(tmp_path / 'scene.gksc')
+    save_scene(path, make_polygon())
+    loaded = load_scene(path)
+    loaded.move_vertex(0, QPoint(-1, -1))
+    save_scene(path, loaded)
+    assert contents(load_scene(path)) == contents(loaded)
+
+
+def rewrite_header(path, offset, fmt, value):
+    with open(path, 'r+b') as file:
+        file.seek(offset)
+        file.write(struct.pack(fmt, value))
+
+
+def test_bad_magic(tmp_path):
+    path = str(tmp_path / 'scene.gksc')
+    save_scene(path, make_polygon())
+    rewrite_header(path, 0, '4s', b'NOPE')
+    with pytest.raises(ValueError, match='not a scene file'):
+        load_scene(path)
+
+
+def test_unsupported_version(tmp_path):
+    path = str(tmp_path / 'scene.gksc')
+    save_scene(path, make_polygon())
+    rewrite_header(path, 4, '<H', 99)
+    with pytest.raises(ValueError, match='unsupported scene version 99'):
+        load_scene(path)
+
+
+def test_truncated_file(tmp_path):
+    path = str(tmp_path / 'scene.gksc')
+    save_scene(path, make_polygon())
+    with open(path, 'r+b') as file:
+        file.truncate(HEADER_SIZE + 8)
+    with pytest.raises(ValueError, match='truncated'):
+        load_scene(path)
+
+
+def test_too_short_for_a_header(tmp_path):
+    path = tmp_path / 'scene.gksc'
+    path.write_bytes(b'GKSC')
+    with pytest.raises(ValueError, match='not a scene file'):
+        load_scene(str(path))
+
+
+def test_loaded_columns_are_memory_maps(tmp_path):
+    path = str(tmp_path / 'scene.gksc')
+    save_scene(path, make_polygon())
+    loaded = load_scene(path)
+    assert isinstance(loaded.coords, np.memmap)